@@ -0,0 +1,191 @@
+"""Scoring par lots d'un manifeste de passagers, sans interface.
+
+Le manifeste (CSV ou Parquet, de taille quelconque) est lu par blocs, chaque
+bloc est préparé et scoré par un processus du pool avec un modèle du
+registre, et les probabilités sont écrites au fil de l'eau, dans l'ordre du
+manifeste. La mémoire reste bornée par la taille des blocs et le nombre de
+blocs en cours de traitement.
+
+    python main.py score manifest.parquet --model SVC --output scores.csv
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from joblib.externals.loky import get_reusable_executor
+
+from dataset import iter_passenger_chunks
+from registry import list_models, load_model
+from scoring import predict_with_proba
+
+# modèles chargés par chaque processus du pool, une fois par version
+_models = {}
+
+
+def _score_chunk(name: str, version: int, chunk: pd.DataFrame) -> pd.DataFrame:
+    if (name, version) not in _models:
+        _models[name, version] = load_model(name, version)[:2]
+    model, preprocessor = _models[name, version]
+
+    proba, pred = predict_with_proba(model, preprocessor.transform(chunk))
+    return pd.DataFrame(
+        {"Probability": proba, "Prediction": pred},
+        index=chunk.index.rename("PassengerId"),
+    )
+
+
+class _Writer:
+    """appends scored chunks to a CSV or Parquet file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.parquet = path.endswith(".parquet")
+        self._writer = None
+        self._header = True
+
+    def write(self, scores: pd.DataFrame) -> None:
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            # index (PassengerId) stocké comme colonne, même s'il est contigu
+            table = pa.Table.from_pandas(scores, preserve_index=True)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            scores.to_csv(
+                self.path, mode="w" if self._header else "a", header=self._header
+            )
+            self._header = False
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        elif self._header or self.parquet:
+            # manifeste vide : fichier avec les seules colonnes
+            empty = pd.DataFrame(
+                {"Probability": [], "Prediction": []},
+                index=pd.Index([], name="PassengerId"),
+            )
+            if self.parquet:
+                empty.to_parquet(self.path)
+            else:
+                empty.to_csv(self.path)
+
+
+def score_manifest(
+    source: str,
+    name: str,
+    output: str,
+    version: int | None = None,
+    chunksize: int = 100_000,
+    n_jobs: int = -1,
+) -> Iterator[dict]:
+    """scores every passenger of source with a registered model into output
+
+    Yields after each written chunk the number of rows scored so far and the
+    throughput (rows/s). The output (CSV, or Parquet for a .parquet path)
+    only appears once complete: it is written under a temporary name first.
+    With n_jobs=1 the chunks are scored by a thread of the calling process.
+    """
+    # version résolue une fois : tous les processus scorent avec la même
+    _, _, meta = load_model(name, version)
+    version = meta["version"]
+
+    n_workers = os.cpu_count() if n_jobs == -1 else n_jobs
+    if n_workers == 1:
+        # pas de processus à démarrer : le scoring d'un bloc chevauche
+        # seulement la lecture du suivant
+        executor = ThreadPoolExecutor(max_workers=1)
+    else:
+        executor = get_reusable_executor(max_workers=n_workers)
+    # au plus deux blocs en attente par processus : la lecture du manifeste
+    # ne prend pas d'avance illimitée sur le scoring
+    max_pending = 2 * n_workers
+
+    tmp_path = f"{output}.part{os.path.splitext(output)[1]}"
+    writer = _Writer(tmp_path)
+    pending = deque()
+    n_rows = 0
+    start = time.perf_counter()
+
+    def write_next() -> dict:
+        nonlocal n_rows
+        scores = pending.popleft().result()
+        writer.write(scores)
+        n_rows += len(scores)
+        elapsed = time.perf_counter() - start
+        return {"rows": n_rows, "seconds": elapsed, "rows/s": n_rows / elapsed}
+
+    try:
+        for chunk in iter_passenger_chunks(source, chunksize):
+            if chunk.empty:
+                continue
+            pending.append(executor.submit(_score_chunk, name, version, chunk))
+            if len(pending) >= max_pending:
+                yield write_next()
+        while pending:
+            yield write_next()
+    except BaseException:
+        for future in pending:
+            future.cancel()
+        writer.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        if isinstance(executor, ThreadPoolExecutor):
+            executor.shutdown()
+
+    writer.close()
+    os.replace(tmp_path, output)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="main.py score",
+        description="Score a CSV or Parquet manifest with a registered model.",
+    )
+    parser.add_argument("source", help="CSV or Parquet manifest of passengers")
+    parser.add_argument("--model", required=True, help="registered model name")
+    parser.add_argument("--version", type=int, help="model version (latest)")
+    parser.add_argument(
+        "--output", required=True, help="output file (.csv or .parquet)"
+    )
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    args = parser.parse_args(argv)
+
+    registered = [meta["name"] for meta in list_models()]
+    if args.model not in registered:
+        parser.error(f"unknown model {args.model!r} (registered: {registered})")
+
+    progress = None
+    for progress in score_manifest(
+        args.source,
+        args.model,
+        args.output,
+        version=args.version,
+        chunksize=args.chunksize,
+        n_jobs=args.n_jobs,
+    ):
+        print(
+            f"{progress['rows']} rows - {progress['rows/s']:.0f} rows/s",
+            file=sys.stderr,
+        )
+    if progress is not None:
+        print(
+            f"{progress['rows']} rows scored in {progress['seconds']:.1f} s "
+            f"({progress['rows/s']:.0f} rows/s) -> {args.output}"
+        )
+
+
+if __name__ == "__main__":
+    main()
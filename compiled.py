@@ -0,0 +1,275 @@
+"""Prédicteurs NumPy compilés à partir des modèles optimisés.
+
+predict_proba de Scikit-learn a un coût fixe (validation des entrées,
+conversion du DataFrame, appel de chaque arbre d'un ensemble) qui domine la
+latence d'une prédiction unitaire. Chaque famille de modèles de la page
+Optimisation est donc compilée en un évaluateur compact, uniquement fait de
+tableaux NumPy : coefficients, vecteurs de support ou arbres aplatis en
+tableaux de nœuds. Les probabilités sont numériquement équivalentes à celles du
+modèle d'origine (voir check_parity).
+
+Les k plus proches voisins ne sont pas compilés : entre voisins à égale
+distance (lignes en double, âges et tarifs répétés), le choix dépend de l'ordre
+de parcours de l'arbre de recherche de Scikit-learn, que seul le modèle
+d'origine reproduit.
+
+    python main.py check-compiled    # parité et latence des modèles du registre
+"""
+
+import time
+from abc import ABC, abstractmethod
+
+import numpy as np
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.svm import SVC
+
+
+def _as_array(X) -> np.ndarray:
+    X = X.to_numpy(dtype=float) if hasattr(X, "to_numpy") else X
+    return np.atleast_2d(np.asarray(X, dtype=float))
+
+
+def _expit(z: np.ndarray) -> np.ndarray:
+    return 1 / (1 + np.exp(-z))
+
+
+class CompiledModel(ABC):
+    """array-backed binary classifier with the predict_proba interface"""
+
+    def __init__(self, classes: np.ndarray):
+        self.classes_ = np.asarray(classes)
+
+    @abstractmethod
+    def positive_proba(self, X: np.ndarray) -> np.ndarray:
+        """returns P(classes_[1]) for each row of the float array X"""
+
+    def predict_proba(self, X) -> np.ndarray:
+        p = self.positive_proba(_as_array(X))
+        return np.column_stack([1 - p, p])
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[(self.predict_proba(X)[:, 1] > 0.5).astype(int)]
+
+
+class CompiledLinear(CompiledModel):
+    def __init__(self, model: LogisticRegression):
+        super().__init__(model.classes_)
+        self.coef = model.coef_[0].copy()
+        self.intercept = float(model.intercept_[0])
+
+    def positive_proba(self, X: np.ndarray) -> np.ndarray:
+        return _expit(X @ self.coef + self.intercept)
+
+
+class CompiledSVC(CompiledModel):
+    def __init__(self, model: SVC):
+        if not model.probability:
+            raise ValueError("SVC must be fitted with probability=True")
+        super().__init__(model.classes_)
+        self.support_vectors = model.support_vectors_.copy()
+        self.sv_sq_norms = (self.support_vectors**2).sum(axis=1)
+        # coefficients internes de libsvm (décision de signe opposé à
+        # decision_function en binaire)
+        self.dual_coef = model._dual_coef_[0].copy()
+        self.intercept = float(model._intercept_[0])
+        self.kernel = model.kernel
+        self.gamma = float(model._gamma)
+        self.coef0 = float(model.coef0)
+        self.degree = model.degree
+        self.prob_a = float(model.probA_[0])
+        self.prob_b = float(model.probB_[0])
+        if self.kernel not in ("linear", "rbf", "poly", "sigmoid"):
+            raise ValueError(f"unsupported kernel {self.kernel!r}")
+
+    def _kernel(self, X: np.ndarray) -> np.ndarray:
+        dot = X @ self.support_vectors.T
+        if self.kernel == "linear":
+            return dot
+        if self.kernel == "rbf":
+            d2 = (X**2).sum(axis=1)[:, None] - 2 * dot + self.sv_sq_norms
+            return np.exp(-self.gamma * np.maximum(d2, 0))
+        if self.kernel == "poly":
+            return (self.gamma * dot + self.coef0) ** self.degree
+        return np.tanh(self.gamma * dot + self.coef0)
+
+    def positive_proba(self, X: np.ndarray) -> np.ndarray:
+        decision = self._kernel(X) @ self.dual_coef + self.intercept
+        # calibration de Platt de libsvm : probabilité de la première classe
+        # face à la seconde, bornée comme dans libsvm
+        f = decision * self.prob_a + self.prob_b
+        with np.errstate(over="ignore"):
+            r = np.where(f >= 0, np.exp(-f) / (1 + np.exp(-f)), 1 / (1 + np.exp(f)))
+        r = np.clip(r, 1e-7, 1 - 1e-7)
+        return _pairwise_coupling(r)[1]
+
+
+def _pairwise_coupling(r: np.ndarray) -> np.ndarray:
+    """returns the (2, n_samples) class probabilities from libsvm's coupling
+
+    libsvm (as bundled with Scikit-learn) solves the multiclass coupling
+    problem iteratively even with two classes, stopping at a tolerance: the
+    same iterations are replayed here, for all samples at once, so that the
+    probabilities match predict_proba rather than the exact r, 1 - r.
+    """
+    k, eps = 2, 0.005 / 2
+    Q = np.array([[(1 - r) ** 2, -r * (1 - r)], [-r * (1 - r), r**2]])
+    p = np.full((k, len(r)), 1 / k)
+    active = np.ones(len(r), dtype=bool)
+    for _ in range(100):
+        Qp = np.einsum("tjn,jn->tn", Q, p)
+        pQp = (p * Qp).sum(axis=0)
+        # chaque passager s'arrête à sa propre convergence, comme dans libsvm
+        active &= np.abs(Qp - pQp).max(axis=0) >= eps
+        if not active.any():
+            break
+        for t in range(k):
+            diff = np.where(active, (-Qp[t] + pQp) / Q[t, t], 0.0)
+            p[t] += diff
+            pQp = (pQp + diff * (diff * Q[t, t] + 2 * Qp[t])) / (1 + diff) / (1 + diff)
+            Qp = (Qp + diff * Q[t]) / (1 + diff)
+            p /= 1 + diff
+    return p
+
+
+class _Forest:
+    """decision trees flattened into shared node arrays"""
+
+    def __init__(self, trees: list, values: list[np.ndarray]):
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+        self.roots = offsets[:-1]
+        self.feature = np.concatenate([tree.feature for tree in trees])
+        self.threshold = np.concatenate([tree.threshold for tree in trees])
+        # nœuds suivants en indices globaux ; une feuille pointe sur elle-même
+        nodes = np.arange(offsets[-1])
+        left = np.concatenate(
+            [tree.children_left + offset for tree, offset in zip(trees, offsets)]
+        )
+        right = np.concatenate(
+            [tree.children_right + offset for tree, offset in zip(trees, offsets)]
+        )
+        leaf = np.concatenate([tree.children_left == -1 for tree in trees])
+        self.left = np.where(leaf, nodes, left)
+        self.right = np.where(leaf, nodes, right)
+        self.feature[leaf] = 0
+        self.value = np.concatenate(values)
+        self.depth = max(tree.max_depth for tree in trees)
+
+    def leaf_values(self, X: np.ndarray) -> np.ndarray:
+        """returns the (n_samples, n_trees) values of the leaves reached by X"""
+        # comparaisons en float32, comme les arbres de Scikit-learn
+        X = X.astype(np.float32)
+        rows = np.arange(len(X))[:, None]
+        nodes = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        for _ in range(self.depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return self.value[nodes]
+
+
+class CompiledForest(CompiledModel):
+    def __init__(self, model: RandomForestClassifier):
+        super().__init__(model.classes_)
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        # proportion de la classe positive dans chaque feuille
+        values = [
+            tree.value[:, 0, 1] / tree.value[:, 0, :].sum(axis=1) for tree in trees
+        ]
+        self.forest = _Forest(trees, values)
+
+    def positive_proba(self, X: np.ndarray) -> np.ndarray:
+        return self.forest.leaf_values(X).mean(axis=1)
+
+
+class CompiledBoosting(CompiledModel):
+    def __init__(self, model: GradientBoostingClassifier):
+        if model.loss != "log_loss" or model.n_trees_per_iteration_ != 1:
+            raise ValueError("only binary log-loss gradient boosting")
+        super().__init__(model.classes_)
+        trees = [estimator.tree_ for estimator in model.estimators_[:, 0]]
+        self.forest = _Forest(trees, [tree.value[:, 0, 0] for tree in trees])
+        self.learning_rate = model.learning_rate
+        # prédiction initiale (log-odds de la classe positive) constante
+        self.init = float(
+            model._raw_predict_init(np.zeros((1, model.n_features_in_)))[0, 0]
+        )
+
+    def positive_proba(self, X: np.ndarray) -> np.ndarray:
+        raw = self.init + self.learning_rate * self.forest.leaf_values(X).sum(axis=1)
+        return _expit(raw)
+
+
+compilers = {
+    LogisticRegression: CompiledLinear,
+    SVC: CompiledSVC,
+    RandomForestClassifier: CompiledForest,
+    GradientBoostingClassifier: CompiledBoosting,
+}
+
+
+def compile_model(model) -> CompiledModel:
+    """returns the NumPy evaluator of a fitted binary model
+
+    Raises ValueError for an unsupported model family or configuration.
+    """
+    compiler = compilers.get(type(model))
+    if compiler is None:
+        raise ValueError(f"no compiled predictor for {type(model).__name__}")
+    if len(model.classes_) != 2:
+        raise ValueError("only binary classifiers")
+    return compiler(model)
+
+
+def check_parity(model, X, n_timings: int = 200) -> dict:
+    """compares a model with its compiled predictor on X
+
+    Returns the largest probability difference and the single-row latency
+    (median, in µs) of both predict_proba.
+    """
+    compiled = compile_model(model)
+    X = _as_array(X)
+    expected = model.predict_proba(X)[:, 1]
+    actual = compiled.predict_proba(X)[:, 1]
+
+    def latency(predict, row) -> float:
+        timings = []
+        for _ in range(n_timings):
+            start = time.perf_counter()
+            predict(row)
+            timings.append(time.perf_counter() - start)
+        return 1e6 * float(np.median(timings))
+
+    return {
+        "Max abs diff": float(np.abs(expected - actual).max()),
+        "Same predictions": bool(np.array_equal(expected > 0.5, actual > 0.5)),
+        "sklearn (µs/row)": round(latency(model.predict_proba, X[:1]), 1),
+        "compiled (µs/row)": round(latency(compiled.predict_proba, X[:1]), 1),
+    }
+
+
+def main() -> None:
+    # modèles du registre, comparés sur tous les passagers du jeu de données
+    import pandas as pd
+
+    from dataset import read_passengers, to_compact
+    from registry import list_models, load_model
+
+    rows = []
+    for meta in list_models():
+        model, preprocessor, _ = load_model(meta["name"])
+        if type(model) not in compilers:
+            # scoré par le modèle d'origine : rien à comparer
+            print(f"{meta['name']}: no compiled predictor")
+            continue
+        X = preprocessor.transform(to_compact(read_passengers()))
+        rows.append({"Model": meta["name"], **check_parity(model, X)})
+    if not rows:
+        return
+    report = pd.DataFrame(rows).set_index("Model")
+    print(report.to_string())
+    if (report["Max abs diff"] > 1e-9).any() or not report["Same predictions"].all():
+        raise SystemExit("compiled predictors differ from the models")
+
+
+if __name__ == "__main__":
+    main()
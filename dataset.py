@@ -0,0 +1,132 @@
+"""Cache local du jeu de données Titanic au format Parquet.
+
+Le CSV source n'est téléchargé qu'une seule fois (ou sur demande explicite avec
+``python main.py refresh-data``) puis conservé dans ``data/cache`` sous un nom
+dérivé de son empreinte SHA-256. Les lectures suivantes sont de simples lectures
+Parquet locales, sans accès réseau.
+"""
+
+import hashlib
+import io
+import os
+import time
+from collections.abc import Iterator
+from urllib.request import urlopen
+
+import pandas as pd
+
+from store import atomic_write, cache_dir, read_json, write_json
+
+csv_url = (
+    "https://raw.githubusercontent.com/datasciencedojo/datasets/master/titanic.csv"
+)
+
+manifest_path = os.path.join(cache_dir, "manifest.json")
+
+# schéma compact : catégories pour les colonnes à faible cardinalité, entiers
+# 8 bits pour les petits effectifs, float32 pour l'âge et le tarif et chaînes
+# Arrow pour les colonnes textuelles. Les catégories sont fixées : tous les
+# blocs d'un manifeste ont le même dtype, quelles que soient leurs valeurs.
+compact_dtypes = {
+    "Survived": "int8",
+    "Pclass": "int8",
+    "Name": pd.StringDtype("pyarrow"),
+    "Sex": pd.CategoricalDtype(["female", "male"]),
+    "Age": "float32",
+    "SibSp": "int8",
+    "Parch": "int8",
+    "Ticket": pd.StringDtype("pyarrow"),
+    "Fare": "float32",
+    "Cabin": pd.StringDtype("pyarrow"),
+    "Embarked": pd.CategoricalDtype(["C", "Q", "S"]),
+}
+
+
+def content_hash(raw: bytes) -> str:
+    """returns a short SHA-256 fingerprint of the raw CSV content"""
+    return hashlib.sha256(raw).hexdigest()[:16]
+
+
+def _parquet_path(digest: str) -> str:
+    return os.path.join(cache_dir, f"titanic-{digest}.parquet")
+
+
+def refresh_cache(url: str = csv_url) -> str:
+    """downloads the CSV, stores it as Parquet and returns its content hash"""
+    with urlopen(url) as response:
+        raw = response.read()
+
+    digest = content_hash(raw)
+    path = _parquet_path(digest)
+
+    # contenu identique = fichier Parquet déjà présent, rien à réécrire
+    if not os.path.exists(path):
+        df = pd.read_csv(io.BytesIO(raw), index_col="PassengerId")
+        atomic_write(path, lambda tmp: df.to_parquet(tmp))
+
+    manifest = {"url": url, "hash": digest, "fetched_at": int(time.time())}
+    write_json(manifest_path, manifest)
+    return digest
+
+
+def dataset_hash() -> str:
+    """returns the hash of the cached dataset, downloading it if needed"""
+    manifest = read_json(manifest_path)
+    if manifest is None or not os.path.exists(_parquet_path(manifest["hash"])):
+        return refresh_cache()
+    return manifest["hash"]
+
+
+def read_passengers(digest: str | None = None) -> pd.DataFrame:
+    """reads the cached passenger table (PassengerId as index)"""
+    if digest is None:
+        digest = dataset_hash()
+    return pd.read_parquet(_parquet_path(digest))
+
+
+def iter_passenger_chunks(
+    source: str, chunksize: int = 100_000, compact: bool = True
+) -> Iterator[pd.DataFrame]:
+    """yields the passengers of a CSV or Parquet manifest chunk by chunk
+
+    Passengers are indexed by PassengerId, or numbered from 1 in the order of
+    the manifest when it has no such column.
+    """
+    if source.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        batches = pq.ParquetFile(source).iter_batches(batch_size=chunksize)
+        chunks = (batch.to_pandas() for batch in batches)
+    else:
+        chunks = pd.read_csv(source, chunksize=chunksize)
+
+    offset = 0
+    for chunk in chunks:
+        if "PassengerId" in chunk.columns:
+            chunk = chunk.set_index("PassengerId")
+        elif chunk.index.name != "PassengerId":
+            # pas d'identifiant dans le fichier (ou RangeIndex non stocké dans
+            # le Parquet) : position dans le manifeste
+            chunk.index = pd.RangeIndex(offset + 1, offset + len(chunk) + 1)
+        offset += len(chunk)
+        yield to_compact(chunk) if compact else chunk
+
+
+def to_compact(df: pd.DataFrame) -> pd.DataFrame:
+    """returns a copy of df using the compact passenger schema"""
+    return df.astype({k: v for k, v in compact_dtypes.items() if k in df.columns})
+
+
+def memory_report(frames: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """returns rows, columns and deep memory usage (KiB) of each frame"""
+    return pd.DataFrame(
+        [
+            {
+                "Frame": name,
+                "Rows": len(frame),
+                "Columns": frame.shape[1],
+                "Memory (KiB)": round(frame.memory_usage(deep=True).sum() / 1024, 1),
+            }
+            for name, frame in frames.items()
+        ]
+    ).set_index("Frame")
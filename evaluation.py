@@ -0,0 +1,628 @@
+"""Evaluation parallèle du zoo de classifieurs Scikit-learn.
+
+Chaque couple (estimateur, fold) est exécuté dans son propre processus : le
+modèle n'est ajusté qu'une fois par fold et les trois métriques sont calculées
+à partir des mêmes prédictions. Chaque estimateur dispose d'un budget de temps
+et de mémoire (RSS) ; au-delà, ses processus sont tués. Les résultats d'un
+estimateur sont renvoyés dès que tous ses folds sont terminés.
+"""
+
+import inspect
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from collections.abc import Iterator
+from multiprocessing.connection import wait
+
+import numpy as np
+import pandas as pd
+import sklearn
+from joblib.externals.loky.backend.context import get_context
+from sklearn.metrics import (
+    balanced_accuracy_score,
+    classification_report,
+    confusion_matrix,
+    f1_score,
+    roc_auc_score,
+)
+
+from folds import FoldStore, data_fingerprint
+from store import cache_dir, make_key, read_json, write_json
+
+# colonnes du classement, calculées à partir des prédictions de chaque fold
+metrics = ["Balanced Accuracy (%)", "ROC AUC", "f1-score"]
+
+# résultats déjà calculés, un fichier JSON par estimateur
+results_dir = os.path.join(cache_dir, "evaluation")
+
+# index des capacités des classifieurs, un fichier par version de Scikit-learn
+capabilities_path = os.path.join(
+    cache_dir, f"capabilities-sklearn-{sklearn.__version__}.json"
+)
+# lecture-modification-écriture de l'index par les sessions (threads) du serveur
+_capabilities_lock = threading.Lock()
+
+
+class Leaderboard:
+    """leaderboard kept sorted as results stream in
+
+    Rows are ordered by the sort_by columns, in decreasing order; a new row
+    is placed by binary search (O(log n) comparisons) then inserted into the
+    list (O(n) element shifts) instead of re-sorting the whole table, and a
+    row with the same Model replaces the previous one.
+    """
+
+    def __init__(self, sort_by: list[str]):
+        self.sort_by = sort_by
+        self._keys = []  # clés croissantes : valeurs opposées, puis le nom
+        self._rows = []
+        self._key_of = {}  # clé actuelle de chaque modèle
+
+    def _key(self, row: dict) -> tuple:
+        return tuple(-row[column] for column in self.sort_by) + (row["Model"],)
+
+    def add(self, row: dict) -> int:
+        """inserts row in O(n) and returns its rank (0 = best)"""
+        previous = self._key_of.pop(row["Model"], None)
+        if previous is not None:
+            i = bisect_left(self._keys, previous)
+            del self._keys[i], self._rows[i]
+
+        key = self._key(row)
+        i = bisect_left(self._keys, key)
+        self._keys.insert(i, key)
+        self._rows.insert(i, row)
+        self._key_of[row["Model"]] = key
+        return i
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def rows(self) -> list[dict]:
+        return list(self._rows)
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self._rows)
+
+    def to_csv(self) -> bytes:
+        return self.to_frame().to_csv(index=False).encode("utf-8")
+
+
+def _positive_scores(clf, X: np.ndarray) -> np.ndarray:
+    # même ordre de préférence que le scorer "roc_auc" de Scikit-learn
+    if hasattr(clf, "decision_function"):
+        return clf.decision_function(X)
+    return clf.predict_proba(X)[:, 1]
+
+
+def _evaluate_fold(
+    name: str, ClfClass, block: tuple
+) -> tuple[str, dict | None, dict, Exception | None]:
+    """fits one fold once and computes every metric from its predictions"""
+    # les exceptions sont renvoyées et non levées : un estimateur en échec
+    # n'interrompt pas les autres tâches
+    X_train, y_train, X_test, y_test = block
+    timings = {"fit": 0.0, "score": 0.0}
+    try:
+        clf = ClfClass()
+        start_time = time.time()
+        clf.fit(X_train, y_train)
+        timings["fit"] = time.time() - start_time
+
+        start_time = time.time()
+        y_pred = clf.predict(X_test)
+        scores = {
+            "Balanced Accuracy (%)": balanced_accuracy_score(y_test, y_pred),
+            "ROC AUC": roc_auc_score(y_test, _positive_scores(clf, X_test)),
+            "f1-score": f1_score(y_test, y_pred),
+        }
+        timings["score"] = time.time() - start_time
+        return name, scores, timings, None
+    except Exception as e:
+        return name, None, timings, e
+
+
+def _summarize(name: str, fold_scores: list[dict], fold_timings: list[dict]) -> dict:
+    means = {
+        column: float(np.mean([scores[column] for scores in fold_scores]))
+        for column in metrics
+    }
+    if any(pd.isna(mean) for mean in means.values()):
+        raise ValueError("Scores invalides (nan)")
+
+    means["Balanced Accuracy (%)"] = round(100 * means["Balanced Accuracy (%)"], 2)
+    fit_ms = int(1000 * sum(timings["fit"] for timings in fold_timings))
+    score_ms = int(1000 * sum(timings["score"] for timings in fold_timings))
+    return {
+        "Model": name,
+        **means,
+        "Time (ms)": fit_ms + score_ms,
+        "Fit (ms)": fit_ms,
+        "Score (ms)": score_ms,
+    }
+
+
+class _Worker:
+    """long-lived evaluation process that can be killed at any time"""
+
+    def __init__(self, ctx, folds: FoldStore):
+        self.conn, child_conn = ctx.Pipe()
+        # les données ne sont envoyées qu'une fois, au démarrage du processus
+        self.process = ctx.Process(target=_serve, args=(child_conn, folds), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.ready = False  # devient True quand le processus a démarré
+        self.task = None  # (estimateur, début) de la tâche en cours
+
+    def submit(self, name: str, ClfClass, fold_index: int) -> None:
+        self.conn.send((name, ClfClass, fold_index))
+        self.task = (name, time.time())
+
+    def close(self, kill: bool = False) -> None:
+        if kill:
+            # SIGTERM (le Popen de loky n'expose pas kill)
+            self.process.terminate()
+        else:
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass
+        self.process.join()
+        self.conn.close()
+
+
+def _serve(conn, folds: FoldStore) -> None:
+    # le temps de démarrage (imports) n'est pas décompté du budget des tâches
+    conn.send("ready")
+    while (task := conn.recv()) is not None:
+        name, ClfClass, fold_index = task
+        result = _evaluate_fold(name, ClfClass, folds.blocks[fold_index])
+        try:
+            conn.send(result)
+        except Exception as e:  # exception non sérialisable
+            conn.send((name, None, result[2], RuntimeError(repr(e))))
+
+
+def _rss(pid: int) -> int | None:
+    """returns the resident memory of a process in bytes (Linux only)"""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def evaluate_zoo(
+    estimators: list[tuple[str, type]],
+    folds: FoldStore,
+    n_jobs: int = -1,
+    time_limit: float | None = 60.0,
+    memory_limit: int | None = 1024,
+    total_budget: float | None = None,
+) -> Iterator[dict]:
+    """evaluates every estimator on the folds of the store, on all cores
+
+    Folds run in a pool of isolated worker processes. An estimator whose
+    cumulated fold time exceeds time_limit (s) or whose worker uses more than
+    memory_limit (MiB of RSS) is stopped by killing its workers, which are
+    then replaced; once total_budget (s) is spent, the remaining estimators
+    are not run.
+
+    Yields one dict per estimator as soon as it is done: the leaderboard row
+    (mean scores, cumulated fit and score times), {"Model": name, "Error": e}
+    or {"Model": name, "Timeout": reason}.
+    """
+    n_splits = folds.n_splits
+    n_workers = (os.cpu_count() or 1) if n_jobs == -1 else n_jobs
+    n_workers = min(n_workers, len(estimators) * n_splits)
+
+    # contexte loky (joblib) : processus neufs qui, contrairement à spawn et
+    # forkserver, ne réexécutent pas le __main__ (ici le script de la page)
+    ctx = get_context("loky")
+    workers = [_Worker(ctx, folds) for _ in range(n_workers)]
+
+    queue = deque(
+        (name, ClfClass, fold_index)
+        for name, ClfClass in estimators
+        for fold_index in range(n_splits)
+    )
+    fold_scores = {name: [] for name, _ in estimators}
+    fold_timings = {name: [] for name, _ in estimators}
+    used = {name: 0.0 for name, _ in estimators}  # temps des folds terminés
+    finished = set()
+    start_total_time = time.time()
+
+    def replace(worker: _Worker) -> None:
+        workers[workers.index(worker)] = _Worker(ctx, folds)
+        worker.close(kill=True)
+
+    def stop(name: str) -> None:
+        # tue les workers occupés par l'estimateur, les tâches suivantes de
+        # cet estimateur sont ignorées
+        finished.add(name)
+        for worker in list(workers):
+            if worker.task is not None and worker.task[0] == name:
+                replace(worker)
+
+    try:
+        while True:
+            for worker in workers:
+                while worker.ready and worker.task is None and queue:
+                    name, ClfClass, fold_index = queue.popleft()
+                    if name not in finished:
+                        worker.submit(name, ClfClass, fold_index)
+
+            if not queue and not any(worker.task for worker in workers):
+                break
+
+            if (
+                total_budget is not None
+                and time.time() - start_total_time > total_budget
+            ):
+                for name, _ in estimators:
+                    if name not in finished:
+                        stop(name)
+                        yield {"Model": name, "Timeout": "budget global épuisé"}
+                return
+
+            waiting = {
+                worker.conn: worker
+                for worker in workers
+                if worker.task is not None or not worker.ready
+            }
+            for conn in wait(list(waiting), timeout=0.1):
+                worker = waiting[conn]
+                if worker not in workers:
+                    # remplacé (et son tube fermé) par un stop() ou replace()
+                    # traité plus tôt dans cette même boucle
+                    continue
+                if not worker.ready:
+                    try:
+                        conn.recv()
+                    except (EOFError, OSError):
+                        raise RuntimeError(
+                            "Impossible de démarrer un processus d'évaluation"
+                        )
+                    worker.ready = True
+                    continue
+
+                name, started = worker.task
+                try:
+                    _, scores, timings, error = conn.recv()
+                    worker.task = None
+                except (EOFError, OSError):
+                    # processus mort (signal, crash natif) : on le remplace
+                    scores, timings = None, None
+                    worker.process.join(timeout=1)
+                    error = ChildProcessError(
+                        f"Processus interrompu (code {worker.process.exitcode})"
+                    )
+                    replace(worker)
+                used[name] += time.time() - started
+                if name in finished:
+                    continue
+
+                if error is not None:
+                    stop(name)
+                    yield {"Model": name, "Error": error}
+                    continue
+
+                fold_scores[name].append(scores)
+                fold_timings[name].append(timings)
+                if len(fold_scores[name]) == n_splits:
+                    finished.add(name)
+                    try:
+                        result = _summarize(name, fold_scores[name], fold_timings[name])
+                    except Exception as e:
+                        result = {"Model": name, "Error": e}
+                    yield result
+
+            # budgets par estimateur : temps cumulé de ses folds et RSS
+            now = time.time()
+            for worker in list(workers):
+                if worker.task is None or worker.task[0] in finished:
+                    continue
+                name = worker.task[0]
+                elapsed = used[name] + sum(
+                    now - other.task[1]
+                    for other in workers
+                    if other.task is not None and other.task[0] == name
+                )
+                rss = _rss(worker.process.pid) if memory_limit is not None else None
+                if time_limit is not None and elapsed > time_limit:
+                    stop(name)
+                    yield {"Model": name, "Timeout": f"> {time_limit:g} s"}
+                elif rss is not None and rss > memory_limit * 2**20:
+                    stop(name)
+                    yield {
+                        "Model": name,
+                        "Error": MemoryError(f"RSS > {memory_limit} Mo"),
+                    }
+    finally:
+        # fin normale ou page interrompue (rerun, navigation) : aucun processus
+        # orphelin, les workers occupés ou en démarrage sont tués
+        for worker in workers:
+            worker.close(kill=worker.task is not None or not worker.ready)
+
+
+def _default_params(ClfClass) -> str | None:
+    try:
+        return repr(sorted(ClfClass().get_params().items()))
+    except Exception:  # estimateur sans constructeur par défaut
+        return None
+
+
+def _serializable(result: dict) -> dict:
+    if "Error" in result:
+        e = result["Error"]
+        return {"Model": result["Model"], "Error": f"{type(e).__name__}: {e}"}
+    return result
+
+
+def host_dependent(result: dict) -> bool:
+    """tells whether an evaluate_zoo result depends on the host, not the model
+
+    Time or memory budget exceeded, or worker process killed: such a result
+    is not cached, and may differ when run again.
+    """
+    return "Timeout" in result or (
+        "Error" in result
+        and isinstance(result["Error"], (MemoryError, ChildProcessError))
+    )
+
+
+def _inspect(ClfClass) -> dict:
+    signature = inspect.signature(ClfClass.__init__)
+    required = [
+        p.name
+        for p in list(signature.parameters.values())[1:]
+        if p.default is p.empty and p.kind not in (p.VAR_POSITIONAL, p.VAR_KEYWORD)
+    ]
+    capabilities = {
+        "required_args": required,
+        "proba": False,
+        "decision": False,
+        "failure": None,
+    }
+    if required:
+        return capabilities
+    try:
+        clf = ClfClass()
+    except Exception as e:
+        capabilities["failure"] = f"{type(e).__name__}: {e}"
+        return capabilities
+    # hasattr suffit : les méthodes conditionnelles (available_if) sont
+    # évaluées avec les paramètres par défaut
+    capabilities["proba"] = hasattr(clf, "predict_proba")
+    capabilities["decision"] = hasattr(clf, "decision_function")
+    return capabilities
+
+
+def capability_index(estimators: list[tuple[str, type]]) -> dict[str, dict]:
+    """returns the capabilities of each estimator for this scikit-learn version
+
+    Required constructor args, predict_proba / decision_function support and
+    construction failures are inspected without fitting anything and stored
+    on disk, new estimators being added on demand. Only data-independent
+    failures are kept here: an estimator failing on some data has its error
+    in the results cache of evaluate_zoo_cached, keyed by those folds.
+    """
+    with _capabilities_lock:
+        index = read_json(capabilities_path) or {}
+        missing = [(name, Clf) for name, Clf in estimators if name not in index]
+        for name, ClfClass in missing:
+            index[name] = _inspect(ClfClass)
+        if missing:
+            write_json(capabilities_path, index)
+    return index
+
+
+def reset_failures() -> None:
+    """forgets the known failures (e.g. after a change of the features)"""
+    # index réinspecté à la demande
+    with _capabilities_lock:
+        if os.path.exists(capabilities_path):
+            os.remove(capabilities_path)
+
+    # les erreurs conservées dans le cache des résultats sont aussi oubliées
+    if os.path.isdir(results_dir):
+        for entry in os.scandir(results_dir):
+            if "Error" in (read_json(entry.path) or {}):
+                os.remove(entry.path)
+
+
+def runnable(
+    estimators: list[tuple[str, type]],
+) -> tuple[list[tuple[str, type]], list[dict]]:
+    """splits estimators into those worth evaluating and those skipped
+
+    Skipped ones come as {"Model": name, "Reason": reason} dicts.
+    """
+    index = capability_index(estimators)
+    kept, skipped = [], []
+    for name, ClfClass in estimators:
+        capabilities = index[name]
+        if capabilities["required_args"]:
+            reason = "Arguments requis : " + ", ".join(capabilities["required_args"])
+        elif capabilities["failure"]:
+            reason = capabilities["failure"]
+        elif capabilities["proba"] is False and capabilities["decision"] is False:
+            reason = "Ni predict_proba ni decision_function (ROC AUC impossible)"
+        else:
+            kept.append((name, ClfClass))
+            continue
+        skipped.append({"Model": name, "Reason": reason})
+    return kept, skipped
+
+
+def evaluate_zoo_cached(
+    estimators: list[tuple[str, type]], folds: FoldStore, **kwargs
+) -> Iterator[dict]:
+    """evaluate_zoo backed by an on-disk store of the results
+
+    Results are keyed by the fold store (data, seed and number of folds),
+    the estimator name and default params and the scikit-learn version:
+    cached results are yielded first, then only the missing estimators are
+    evaluated. Timeouts, exceeded memory budgets and killed workers depend
+    on the host and are not stored.
+    """
+    paths = {
+        name: os.path.join(
+            results_dir,
+            make_key(
+                folds.key,
+                name,
+                _default_params(ClfClass),
+                sklearn.__version__,
+            )
+            + ".json",
+        )
+        for name, ClfClass in estimators
+    }
+
+    missing = []
+    for name, ClfClass in estimators:
+        cached = read_json(paths[name])
+        if cached is None:
+            missing.append((name, ClfClass))
+        else:
+            yield cached
+
+    if not missing:
+        return
+
+    for result in evaluate_zoo(missing, folds, **kwargs):
+        if not host_dependent(result):
+            write_json(paths[result["Model"]], _serializable(result))
+        yield result
+
+
+def holdout_report(
+    name: str,
+    ClfClass,
+    X_train: pd.DataFrame,
+    y_train: pd.Series,
+    X_test: pd.DataFrame,
+    y_test: pd.Series,
+) -> dict:
+    """fits on the training set and evaluates on the hold-out test set
+
+    The report (balanced accuracy, classification report, confusion matrix)
+    is stored on disk with the same kind of key as the leaderboard.
+    """
+    path = os.path.join(
+        results_dir,
+        "holdout-"
+        + make_key(
+            data_fingerprint(X_train, y_train, X_test, y_test),
+            name,
+            _default_params(ClfClass),
+            sklearn.__version__,
+        )
+        + ".json",
+    )
+    report = read_json(path)
+    if report is not None:
+        return report
+
+    model = ClfClass()
+    model.fit(X_train, y_train)
+    y_pred = model.predict(X_test)
+    report = {
+        "balanced_accuracy": balanced_accuracy_score(y_test, y_pred),
+        "classification_report": classification_report(
+            y_test, y_pred, output_dict=True
+        ),
+        "confusion_matrix": confusion_matrix(y_test, y_pred).tolist(),
+    }
+    write_json(path, report)
+    return report
+
+
+def racing_plan(
+    n_estimators: int, n_splits: int = 5, eta: int = 3, n_rungs: int = 3
+) -> list[dict]:
+    """returns the rungs of a successive-halving race
+
+    Each rung gives the number of candidates, the fraction of the training
+    data and the number of folds; only the best 1/eta candidates of a rung go
+    to the next one and the last rung is the full k-fold CV. "Cost" is the
+    cumulated size of the fits relative to a full CV of every estimator.
+    """
+    plan = []
+    n_candidates = n_estimators
+    folds = np.linspace(2, n_splits, n_rungs).round().astype(int)
+    for rung in range(n_rungs):
+        fraction = float(eta) ** (rung - n_rungs + 1)
+        n_folds = int(folds[rung])
+        cost = n_candidates * fraction * n_folds / (n_estimators * n_splits)
+        plan.append(
+            {
+                "Rung": rung + 1,
+                "Candidates": n_candidates,
+                "Data (%)": round(100 * fraction, 1),
+                "Folds": n_folds,
+                "Cost (%)": round(100 * cost, 1),
+                "fraction": fraction,
+            }
+        )
+        n_candidates = max(1, -(-n_candidates // eta))
+    return plan
+
+
+def race_zoo(
+    estimators: list[tuple[str, type]],
+    folds: FoldStore,
+    eta: int = 3,
+    n_rungs: int = 3,
+    total_budget: float | None = None,
+    **kwargs,
+) -> Iterator[dict]:
+    """ranks the zoo by successive halving ("racing")
+
+    Every estimator is first scored on a small stratified subsample with few
+    folds; at each rung only the best 1/eta (by balanced accuracy) are kept
+    and get more data and folds, up to the full k-fold CV of the last rung.
+    Rungs go through evaluate_zoo_cached, so the last one shares its results
+    with the full evaluation.
+
+    Yields the same dicts as evaluate_zoo with the rung, data fraction and
+    number of folds they were computed with; a model promoted to the next
+    rung is yielded again with its new scores.
+    """
+    start_total_time = time.time()
+    plan = racing_plan(len(estimators), folds.n_splits, eta, n_rungs)
+    candidates = list(estimators)
+
+    for step in plan:
+        last = step["Rung"] == n_rungs
+        # sous-échantillon stratifié, identique d'une exécution à l'autre pour
+        # une même seed (et donc réutilisable depuis le cache)
+        rung_folds = folds if last else folds.subsample(step["fraction"], step["Folds"])
+
+        budget = None
+        if total_budget is not None:
+            budget = max(0.0, total_budget - (time.time() - start_total_time))
+
+        rung_info = {k: step[k] for k in ("Rung", "Data (%)", "Folds")}
+        scored = []
+        for result in evaluate_zoo_cached(
+            candidates, rung_folds, total_budget=budget, **kwargs
+        ):
+            result = {**result, **rung_info}
+            if "Error" not in result and "Timeout" not in result:
+                scored.append(result)
+            yield result
+
+        if last:
+            return
+
+        # les meilleurs passent au tour suivant
+        n_keep = max(1, -(-len(candidates) // eta))
+        scored.sort(key=lambda row: row["Balanced Accuracy (%)"], reverse=True)
+        keep = {row["Model"] for row in scored[:n_keep]}
+        candidates = [(name, Clf) for name, Clf in candidates if name in keep]
+        if not candidates:
+            return
@@ -0,0 +1,85 @@
+"""Folds de Cross Validation partagés par les pages Evaluation et Optimisation.
+
+Les indices des folds et les blocs de features correspondants sont calculés une
+seule fois par (jeu de données, seed) puis réutilisés par tous les estimateurs
+et tous les points de grille, ce qui rend aussi leurs scores comparables.
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import StratifiedKFold, train_test_split
+
+from store import make_key
+
+
+def data_fingerprint(*frames: pd.DataFrame | pd.Series) -> str:
+    """returns a short hash of the content (values and index) of the frames"""
+    return make_key(
+        *(pd.util.hash_pandas_object(frame).sum().item() for frame in frames)
+    )
+
+
+class FoldStore:
+    """Materialized stratified k-fold of a training set.
+
+    Holds the features as one contiguous float64 array, the fold index arrays
+    and, for each fold, contiguous read-only (X_train, y_train, X_test, y_test)
+    blocks: consumers index nothing themselves. Also usable as the cv
+    argument of Scikit-learn (split / get_n_splits).
+    """
+
+    def __init__(
+        self,
+        X: pd.DataFrame,
+        y: pd.Series,
+        n_splits: int = 5,
+        seed: int | None = None,
+    ):
+        self.n_splits = n_splits
+        self.seed = seed
+        self.columns = list(X.columns)
+        self.key = make_key(data_fingerprint(X, y), self.columns, n_splits, seed)
+
+        self.X = _read_only(np.ascontiguousarray(X.to_numpy(dtype=np.float64)))
+        self.y = _read_only(np.ascontiguousarray(y.to_numpy()))
+
+        skf = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=seed)
+        self.folds = [
+            (_read_only(train), _read_only(test))
+            for train, test in skf.split(self.X, self.y)
+        ]
+        # l'indexation avancée renvoie des copies contiguës, faites une fois
+        self.blocks = [
+            tuple(
+                _read_only(array)
+                for array in (self.X[train], self.y[train], self.X[test], self.y[test])
+            )
+            for train, test in self.folds
+        ]
+
+    def split(self, X=None, y=None, groups=None):
+        yield from self.folds
+
+    def get_n_splits(self, X=None, y=None, groups=None) -> int:
+        return self.n_splits
+
+    def subsample(self, fraction: float, n_splits: int) -> "FoldStore":
+        """returns the fold store of a stratified subsample (same seed)"""
+        index, _ = train_test_split(
+            np.arange(len(self.y)),
+            train_size=fraction,
+            stratify=self.y,
+            random_state=self.seed,
+        )
+        return FoldStore(
+            pd.DataFrame(self.X[index], columns=self.columns),
+            pd.Series(self.y[index]),
+            n_splits,
+            self.seed,
+        )
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    # blocs partagés entre estimateurs : aucune écriture accidentelle
+    array.setflags(write=False)
+    return array
@@ -0,0 +1,378 @@
+"""Entraînements longs exécutés en arrière-plan, hors des exécutions Streamlit.
+
+Les pages Evaluation et Optimisation soumettent un job (type + paramètres)
+puis se contentent d'afficher son état. Un job est identifié par ses entrées :
+une nouvelle soumission avec les mêmes entrées se rattache au job en attente,
+en cours ou terminé au lieu d'en relancer un. L'état de chaque job (statut,
+progression, résultats partiels puis finaux) est un fichier JSON de
+``data/cache/jobs``, écrit par le processus du job et relu par les pages.
+
+Un thread répartiteur par processus serveur démarre les jobs en attente, au
+plus max_running à la fois, chacun dans son propre processus.
+"""
+
+import json
+import os
+import threading
+import time
+import traceback
+from collections.abc import Callable
+
+import numpy as np
+import pandas as pd
+from joblib.externals.loky.backend.context import get_context
+from sklearn.metrics import balanced_accuracy_score
+from sklearn.model_selection import ParameterGrid
+from sklearn.utils import all_estimators
+
+from dataset import read_passengers, to_compact
+from evaluation import (
+    Leaderboard,
+    evaluate_zoo_cached,
+    holdout_report,
+    host_dependent,
+    race_zoo,
+    racing_plan,
+)
+from folds import FoldStore
+from preprocessing import PassengerPreprocessor, remove_outliers, split_data
+from registry import register
+from store import cache_dir, make_key, read_json, write_json
+from tuning import BudgetedSearch, param_grids, tune_all, tuned_models
+
+jobs_dir = os.path.join(cache_dir, "jobs")
+
+# chaque job occupe déjà tous les cœurs : un seul à la fois par défaut
+max_running = 1
+
+# délai au-delà duquel un job démarré sans signe de vie est considéré perdu
+start_timeout = 120
+
+
+def _path(job_id: str) -> str:
+    return os.path.join(jobs_dir, f"{job_id}.json")
+
+
+def read_job(job_id: str) -> dict | None:
+    """returns the current state of a job"""
+    return read_json(_path(job_id))
+
+
+def _alive(job: dict) -> bool:
+    if job["status"] == "starting":
+        return time.time() - job["started_at"] < start_timeout
+    if job["status"] != "running":
+        return False
+    try:
+        os.kill(job["pid"], 0)
+    except OSError:
+        return False
+    return True
+
+
+def submit(kind: str, params: dict, retry: bool = False) -> str:
+    """returns the id of the job running kind with params, queueing it if needed
+
+    A job with the same inputs that is queued or running is reused, as is a
+    done or failed one unless retry is set (e.g. a done evaluation with
+    host_failures); a lost one (process gone without recording its end) is
+    queued again.
+    """
+    job_id = make_key(kind, params)
+    job = read_job(job_id)
+    if job is not None and (
+        job["status"] == "queued"
+        or (job["status"] in ("done", "failed") and not retry)
+        or _alive(job)
+    ):
+        _ensure_dispatcher()
+        return job_id
+
+    claim = _path(job_id) + ".claim"
+    if os.path.exists(claim):
+        os.remove(claim)
+    write_json(
+        _path(job_id),
+        {
+            "id": job_id,
+            "kind": kind,
+            "params": params,
+            "status": "queued",
+            "submitted_at": time.time(),
+            "state": None,
+        },
+    )
+    _ensure_dispatcher()
+    return job_id
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def _ensure_dispatcher() -> None:
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None or not _dispatcher.is_alive():
+            _dispatcher = threading.Thread(
+                target=_dispatch, name="jobs-dispatcher", daemon=True
+            )
+            _dispatcher.start()
+
+
+def _dispatch() -> None:
+    # contexte loky : le __main__ (script Streamlit) n'est pas réexécuté
+    ctx = get_context("loky")
+    processes = {}  # jobs démarrés par ce processus serveur
+
+    while True:
+        # processus terminés : récupérés, et marqués en échec s'ils n'ont pas
+        # pu enregistrer leur fin (crash, signal)
+        for job_id, process in list(processes.items()):
+            if process.is_alive():
+                continue
+            process.join()
+            del processes[job_id]
+            job = read_job(job_id)
+            if job is not None and job["status"] in ("starting", "running"):
+                job.update(
+                    status="failed",
+                    error=f"Processus interrompu (code {process.exitcode})",
+                    finished_at=time.time(),
+                )
+                write_json(_path(job_id), job)
+
+        jobs = []
+        if os.path.isdir(jobs_dir):
+            for entry in os.scandir(jobs_dir):
+                if entry.name.endswith(".json"):
+                    job = read_json(entry.path)
+                    if job is not None:
+                        jobs.append(job)
+
+        n_active = sum(_alive(job) for job in jobs)
+        queued = sorted(
+            (job for job in jobs if job["status"] == "queued"),
+            key=lambda job: job["submitted_at"],
+        )
+        for job in queued[: max(0, max_running - n_active)]:
+            # réservation exclusive : plusieurs processus serveurs peuvent
+            # partager le même dossier de jobs
+            try:
+                os.close(os.open(_path(job["id"]) + ".claim", os.O_CREAT | os.O_EXCL))
+            except FileExistsError:
+                continue
+            job.update(status="starting", started_at=time.time())
+            write_json(_path(job["id"]), job)
+            process = ctx.Process(target=_run_job, args=(job["id"],))
+            process.start()
+            processes[job["id"]] = process
+
+        time.sleep(0.5)
+
+
+class _Reporter:
+    """writes the state of the running job, at most every interval seconds"""
+
+    def __init__(self, job: dict, interval: float = 0.5):
+        self.job = job
+        self.interval = interval
+        self.last_write = 0.0
+
+    def __call__(self, state: dict, force: bool = False) -> None:
+        self.job["state"] = state
+        if force or time.time() - self.last_write > self.interval:
+            write_json(_path(self.job["id"]), self.job)
+            self.last_write = time.time()
+
+
+def _run_job(job_id: str) -> None:
+    job = read_job(job_id)
+    job.update(status="running", pid=os.getpid(), started_at=time.time())
+    write_json(_path(job_id), job)
+    report = _Reporter(job)
+    try:
+        state = job_kinds[job["kind"]](job["params"], report)
+        job.update(status="done", state=state)
+    except Exception:
+        job.update(status="failed", error=traceback.format_exc())
+    job["finished_at"] = time.time()
+    write_json(_path(job_id), job)
+
+
+def _training_data(digest: str, seed: int | None):
+    # même lecture que utils.load_csv (sans valeurs aberrantes, schéma
+    # compact) et découpage 80/20 par la seed : les folds et les caches de
+    # résultats ne dépendent que du jeu de données et de la seed
+    df = read_passengers(digest)
+    df.index.name = "#"
+    df = to_compact(remove_outliers(df))
+    X_train, X_test, y_train, y_test = split_data(df, split=True, seed=seed)
+    preprocessor = PassengerPreprocessor().fit(X_train)
+    return (
+        preprocessor,
+        preprocessor.transform(X_train),
+        preprocessor.transform(X_test),
+        y_train,
+        y_test,
+    )
+
+
+def evaluation_job(params: dict, report: Callable) -> dict:
+    """evaluates the classifier zoo (full CV or racing) and its best model
+
+    params: dataset, seed, models (names of the runnable classifiers),
+    racing, eta, time_limit, memory_limit and total_budget.
+    """
+    seed = params["seed"]
+    _, X_train, X_test, y_train, y_test = _training_data(params["dataset"], seed)
+    folds = FoldStore(X_train, y_train, 5, seed)
+
+    names = set(params["models"])
+    estimators = [
+        (name, Clf)
+        for name, Clf in all_estimators(type_filter="classifier")
+        if name in names
+    ]
+    budgets = {
+        "time_limit": params["time_limit"],
+        "memory_limit": params["memory_limit"],
+        "total_budget": params["total_budget"],
+    }
+    if params["racing"]:
+        plan = racing_plan(len(estimators), eta=params["eta"])
+        total = sum(step["Candidates"] for step in plan)
+        zoo = race_zoo(estimators, folds, eta=params["eta"], **budgets)
+        leaderboard = Leaderboard(["Rung", "Balanced Accuracy (%)"])
+    else:
+        total = len(estimators)
+        zoo = evaluate_zoo_cached(estimators, folds, **budgets)
+        leaderboard = Leaderboard(["Balanced Accuracy (%)"])
+
+    state = {
+        "total": total,
+        "done": 0,
+        "current": None,
+        "results": [],
+        "errors": [],
+        "timeouts": [],
+        # aucun meilleur modèle si tous ont échoué ou ont été interrompus
+        "best_model": None,
+        "holdout": None,
+        # modèles interrompus par l'hôte (temps, mémoire, processus tué) : un
+        # nouveau job pourrait les évaluer
+        "host_failures": 0,
+    }
+    for result in zoo:
+        state["done"] += 1
+        state["current"] = result["Model"]
+        state["host_failures"] += host_dependent(result)
+        if "Error" in result:
+            e = result["Error"]
+            if not isinstance(e, str):
+                e = f"{type(e).__name__}: {e}"
+            state["errors"].append({"Model": result["Model"], "Error": e})
+        elif "Timeout" in result:
+            state["timeouts"].append(result)
+        else:
+            leaderboard.add(result)
+            state["results"] = leaderboard.rows()
+        report(state)
+
+    if state["results"]:
+        best_name = state["results"][0]["Model"]
+        state["best_model"] = best_name
+        state["holdout"] = holdout_report(
+            best_name, dict(estimators)[best_name], X_train, y_train, X_test, y_test
+        )
+    return state
+
+
+def tuning_job(params: dict, report: Callable) -> dict:
+    """tunes the models of the Optimisation page and registers the best ones
+
+    params: dataset, seed, strategy and max_fits (shared by the models in
+    proportion to their grid size).
+    """
+    digest, seed = params["dataset"], params["seed"]
+    preprocessor, X_train, X_test, y_train, y_test = _training_data(digest, seed)
+    folds = FoldStore(X_train, y_train, 5, seed)
+
+    models = tuned_models()
+    strategy = params["strategy"]
+    grid_fits = {
+        name: len(ParameterGrid(param_grids[name])) * folds.n_splits for name in models
+    }
+    searches = {
+        name: BudgetedSearch(
+            models[name],
+            param_grids[name],
+            cv=folds,
+            strategy=strategy,
+            n_candidates=5 if strategy == "random" else None,
+            # au moins un fit : une part arrondie à 0 ne laisserait aucun score
+            max_fits=max(
+                1, params["max_fits"] * grid_fits[name] // sum(grid_fits.values())
+            ),
+            scoring="balanced_accuracy",
+            random_state=seed,
+        )
+        for name in models
+    }
+
+    state = {
+        "progress": {
+            name: {
+                "Fits": 0,
+                "Max fits": grid_fits[name],
+                "Grid fits": grid_fits[name],
+                "Done": False,
+            }
+            for name in models
+        },
+        "results": {},
+    }
+    for event in tune_all(searches, X_train, y_train):
+        name = event["Model"]
+        state["progress"][name] = {
+            "Fits": event["Fits"],
+            "Max fits": event["Max fits"],
+            "Grid fits": grid_fits[name],
+            "Done": event["Done"],
+        }
+        if event["Done"]:
+            search = searches[name]
+            best_model = search.best_estimator_
+            # modèle ajusté sur le tableau NumPy des features (voir tuning)
+            y_pred = best_model.predict(X_test.to_numpy(dtype=np.float64))
+            bal_acc = round(100 * balanced_accuracy_score(y_test, y_pred), 2)
+            cv_score = round(100 * search.best_score_, 2)
+            # modèle enregistré sur disque avec son preprocessing : la page
+            # Prédictions le retrouve depuis n'importe quelle session
+            register(
+                name,
+                best_model,
+                preprocessor,
+                metrics={
+                    "Balanced Accuracy": bal_acc,
+                    "CV Balanced Accuracy": cv_score,
+                },
+                params=search.best_params_,
+                seed=seed,
+                dataset=digest,
+            )
+            state["results"][name] = {
+                "Best Params": search.best_params_,
+                "CV Balanced Accuracy": cv_score,
+                "Balanced Accuracy": bal_acc,
+                "Fits": search.n_fits_,
+                "Cached": search.n_cached_,
+                "cv_results": json.loads(
+                    pd.DataFrame(search.cv_results_).to_json(orient="records")
+                ),
+            }
+        report(state, force=event["Done"])
+    return state
+
+
+job_kinds = {"evaluation": evaluation_job, "tuning": tuning_job}
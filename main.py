@@ -1,7 +1,29 @@
 import os
+import sys
 from streamlit.web import cli
 
 dir_path = os.path.dirname(os.path.realpath(__file__))
 
 if __name__ == "__main__":
-    cli.main_run([os.path.join(dir_path, "streamlit_app.py")])
+    if sys.argv[1:] == ["refresh-data"]:
+        # re-télécharge le CSV et met à jour le cache Parquet local
+        from dataset import refresh_cache
+
+        print(f"dataset hash = {refresh_cache()}")
+    elif sys.argv[1:2] == ["score"]:
+        # scoring par lots d'un manifeste, sans interface (voir batch.py)
+        from batch import main
+
+        main(sys.argv[2:])
+    elif sys.argv[1:2] in (["serve"], ["serve-bench"]):
+        # service HTTP local de prédiction et son banc de charge (serving.py)
+        from serving import main
+
+        main(sys.argv[2:], command=sys.argv[1])
+    elif sys.argv[1:] == ["check-compiled"]:
+        # parité et latence des prédicteurs compilés (compiled.py)
+        from compiled import main
+
+        main()
+    else:
+        cli.main_run([os.path.join(dir_path, "streamlit_app.py")])
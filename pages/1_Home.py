@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 import streamlit as st
 from utils import load_csv, to_display, translate_text
+from dataset import memory_report
+from resources import resources
 import pandas as pd
 import streamlit.components.v1 as components
 
@@ -115,6 +117,27 @@ with st.expander(
     missing = missing.sort_values("Nombre", ascending=False)
     st.dataframe(missing, width=300, use_container_width=False)
 
+with st.expander(
+    "Afficher l'empreinte mémoire"
+    if st.session_state.lang.startswith("fr")
+    else "Display memory footprint"
+):
+    # comparaison du schéma pandas par défaut et du schéma compact
+    st.dataframe(
+        memory_report(
+            {
+                "default": df,
+                "compact": load_csv(drop_outliers=False, compact=True),
+                "display": df_display,
+            }
+        )
+    )
+    # ressources partagées par toutes les sessions du processus
+    st.dataframe(resources.report(), hide_index=True)
+    st.caption(
+        f"{resources.total_bytes() / 2**20:.1f} / {resources.max_bytes / 2**20:.0f} Mo"
+    )
+
 
 st.markdown(
     ("Source des données" if st.session_state.lang.startswith("fr") else "Data source")
@@ -1,15 +1,10 @@
 import streamlit as st
 from sklearn.utils import all_estimators
-from utils import set_seed, load_csv, preprocess_data
+from utils import set_seed
 import pandas as pd
-import time
-from sklearn.model_selection import StratifiedKFold
-from sklearn.model_selection import cross_val_score
-from sklearn.metrics import (
-    balanced_accuracy_score,
-    classification_report,
-    confusion_matrix,
-)
+from dataset import dataset_hash
+from evaluation import Leaderboard, racing_plan, reset_failures, runnable
+from jobs import read_job, submit
 
 st.markdown(
     "<h2 style='text-align: center; color: #0366d6;'>📝 Evaluation</h2>",
@@ -37,88 +32,128 @@ st.write(
     else "The various Machine Learning models from the Scikit-learn library are trained with their default parameters, then ranked based on three different scoring metrics (balanced accuracy, ROC AUC, and F1-score). Their evaluation is computed using 5-fold cross-validation on a training set composed of 80% of the available data."
 )
 
-df = load_csv(drop_outliers=True)
-
-X_train, X_test, y_train, y_test = preprocess_data(df, split=True)
-
-
 # Récupérer tous les classifiers
 all_classifiers = all_estimators(type_filter="classifier")
 
+# modèles voués à l'échec (arguments requis, pas de score pour la ROC AUC,
+# échec à la construction avec cette version de Scikit-learn) écartés avant
+# tout calcul ; les échecs liés aux données sont dans le cache des résultats
+all_classifiers, skipped = runnable(all_classifiers)
 
-results = []
-errors = []
-df_results = pd.DataFrame()
-
-progress_bar = st.progress(0)
-status = st.empty()
-results_placeholder = st.empty()
-spinner_placeholder = st.empty()
-
-container = st.container()
-
-total = len(all_classifiers)
-
-
-start_total_time = time.time()
-
-skf = StratifiedKFold(n_splits=5, shuffle=True)
-
-for i, (name, ClfClass) in enumerate(all_classifiers):
-
-    with spinner_placeholder:
-        with st.spinner(f"Training {name}", show_time=True):
-
-            progress_bar.progress((i + 1) / total)
-            status.text(f"{i+1}/{total} - {name}")
-
-            try:
-                clf = ClfClass()
-                start_time = time.time()
-
-                bal_acc_scores = cross_val_score(
-                    clf, X_train, y_train, cv=skf, scoring="balanced_accuracy"
-                )
-
-                roc_auc_scores = f1_scores = cross_val_score(
-                    clf, X_train, y_train, cv=skf, scoring="roc_auc"
-                )
-
-                f1_scores = cross_val_score(clf, X_train, y_train, cv=skf, scoring="f1")
-
-                bal_acc_mean = bal_acc_scores.mean()
-                roc_auc_mean = roc_auc_scores.mean()
-                f1_mean = f1_scores.mean()
+# mode course (successive halving) : tous les modèles sur un petit budget, puis
+# seuls les meilleurs reçoivent plus de données et de folds
+racing = st.toggle(
+    "Mode course (successive halving)"
+    if st.session_state.lang.startswith("fr")
+    else "Racing mode (successive halving)"
+)
+if racing:
+    eta = st.select_slider(
+        (
+            "Facteur d'élimination (1/η des modèles conservés à chaque tour)"
+            if st.session_state.lang.startswith("fr")
+            else "Elimination factor (1/η of the models kept at each rung)"
+        ),
+        options=[2, 3, 4],
+        value=3,
+    )
+    plan = racing_plan(len(all_classifiers), eta=eta)
+    st.dataframe(pd.DataFrame(plan).drop(columns="fraction"), hide_index=True)
+    st.caption(
+        (
+            f"Coût estimé : {sum(step['Cost (%)'] for step in plan):.0f} % d'une Cross Validation complète de tous les modèles. Un η plus grand coûte moins cher mais risque d'éliminer trop tôt un bon modèle."
+            if st.session_state.lang.startswith("fr")
+            else f"Estimated cost: {sum(step['Cost (%)'] for step in plan):.0f} % of a full cross-validation of every model. A larger η is cheaper but may drop a good model too early."
+        )
+    )
 
-                end_time = time.time()
-                duration = int((end_time - start_time) * 1000)
+# budgets : un estimateur trop lent ou trop gourmand est interrompu sans
+# bloquer le classement, et la durée totale de l'évaluation est bornée
+time_limit = 60  # s, cumulé sur les folds d'un estimateur
+memory_limit = 1024  # Mo de RSS par processus
+total_budget = 600  # s pour l'ensemble du zoo
+
+# l'évaluation tourne dans un job d'arrière-plan : elle survit à la fermeture
+# de l'onglet, et une autre session avec les mêmes entrées (données, seed,
+# modèles, mode) se rattache au même job au lieu d'en relancer un
+job_params = {
+    "dataset": dataset_hash(),
+    "seed": st.session_state.seed,
+    "models": [name for name, _ in all_classifiers],
+    "racing": racing,
+    "eta": eta if racing else None,
+    "time_limit": time_limit,
+    "memory_limit": memory_limit,
+    "total_budget": total_budget,
+}
+job_id = submit("evaluation", job_params)
+
+# état du job relu toutes les refresh_every s, sans réexécuter la page
+refresh_every = 1.0
+
+
+@st.fragment(run_every=refresh_every)
+def job_progress():
+    job = read_job(job_id)
+    if job["status"] in ("done", "failed"):
+        st.rerun()
+
+    state = job["state"]
+    if state is None:
+        st.info(
+            "Évaluation en attente de démarrage..."
+            if st.session_state.lang.startswith("fr")
+            else "Evaluation waiting to start...",
+            icon="⏳",
+        )
+        return
 
-                if pd.isna(bal_acc_mean) or pd.isna(roc_auc_mean) or pd.isna(f1_mean):
-                    raise ValueError("Scores invalides (nan)")
+    st.progress(
+        min(1.0, state["done"] / state["total"]),
+        text=f"{state['done']}/{state['total']} - {state['current'] or ''}",
+    )
+    # classement partiel, déjà trié par le job
+    st.dataframe(pd.DataFrame(state["results"]))
 
-                results.append(
-                    {
-                        "Model": name,
-                        "Balanced Accuracy (%)": round(100 * bal_acc_mean, 2),
-                        "ROC AUC": roc_auc_mean,
-                        "f1-score": f1_mean,
-                        "Time (ms)": duration,
-                    }
-                )
-            except Exception as e:
-                errors.append({"Model": name, "Error": e})
 
-            # Afficher sous forme de DataFrame triée par Accuracy décroissante
-            df_results = pd.DataFrame(results)
-            df_results = df_results.sort_values(
-                by="Balanced Accuracy (%)", ascending=False
-            ).reset_index(drop=True)
+job = read_job(job_id)
+if job["status"] == "failed":
+    st.error(
+        "L'évaluation a échoué"
+        if st.session_state.lang.startswith("fr")
+        else "The evaluation failed",
+        icon="🚨",
+    )
+    st.code(job["error"])
+    if st.button(
+        "Relancer l'évaluation"
+        if st.session_state.lang.startswith("fr")
+        else "Run the evaluation again"
+    ):
+        submit("evaluation", job_params, retry=True)
+        st.rerun()
+    st.stop()
+
+if job["status"] != "done":
+    with st.spinner("Training", show_time=True):
+        job_progress()
+    st.stop()
+
+state = job["state"]
+results = Leaderboard(
+    ["Rung", "Balanced Accuracy (%)"] if racing else ["Balanced Accuracy (%)"]
+)
+for row in state["results"]:
+    results.add(row)
+errors = state["errors"]
+timeouts = state["timeouts"]
 
-            results_placeholder.dataframe(df_results)
+df_results = results.to_frame()
+st.dataframe(df_results)
 
-duration = round(time.time() - start_total_time, 1)
+container = st.container()
 
-status.text("")
+duration = round(job["finished_at"] - job["started_at"], 1)
 
 container.success(
     f"{len(results)} "
@@ -141,6 +176,17 @@ container.warning(
     icon="ℹ️",
 )
 
+if timeouts:
+    container.warning(
+        f"{len(timeouts)} "
+        + (
+            "modèles ont été interrompus (budget de temps dépassé)"
+            if st.session_state.lang.startswith("fr")
+            else "models were stopped (time budget exceeded)"
+        ),
+        icon="⏱️",
+    )
+
 st.caption(
     (
         "seed de la session = "
@@ -150,56 +196,104 @@ st.caption(
     + f"{st.session_state.seed}"
 )
 
+st.download_button(
+    (
+        "Exporter le classement (CSV)"
+        if st.session_state.lang.startswith("fr")
+        else "Export the leaderboard (CSV)"
+    ),
+    data=results.to_csv(),
+    file_name=f"leaderboard-seed-{st.session_state.seed}.csv",
+    mime="text/csv",
+)
+
 with st.expander(
     "Afficher les erreurs"
     if st.session_state.lang.startswith("fr")
     else "Display errors"
 ):
-    st.dataframe(errors)
-
+    st.dataframe(pd.DataFrame(errors, columns=["Model", "Error"]))
+    if errors and st.button(
+        "Réessayer les modèles en échec"
+        if st.session_state.lang.startswith("fr")
+        else "Retry failed models"
+    ):
+        # erreurs oubliées puis évaluation relancée : les autres modèles
+        # sont relus depuis le cache des résultats
+        reset_failures()
+        submit("evaluation", job_params, retry=True)
+        st.rerun()
+
+if skipped:
+    with st.expander(
+        f"{len(skipped)} "
+        + (
+            "modèles écartés avant l'entraînement"
+            if st.session_state.lang.startswith("fr")
+            else "models skipped before training"
+        )
+    ):
+        st.dataframe(skipped)
 
-best_model_name = df_results.iloc[0, 0]
+if timeouts:
+    with st.expander(
+        "Afficher les modèles interrompus"
+        if st.session_state.lang.startswith("fr")
+        else "Display stopped models"
+    ):
+        st.dataframe(timeouts)
+
+# interruptions liées à la charge de l'hôte (temps, mémoire, processus tué) :
+# absentes du cache des résultats, elles seules sont recalculées par un
+# nouveau job
+if state.get("host_failures") and st.button(
+    "Relancer les modèles interrompus"
+    if st.session_state.lang.startswith("fr")
+    else "Run the stopped models again"
+):
+    submit("evaluation", job_params, retry=True)
+    st.rerun()
 
-st.subheader(":blue[Evaluation]", divider=True)
 
-st.write(f"🏆 {best_model_name}")
+best_model_name = state["best_model"]
 
-st.write(
-    f"Le modèle ayant obtenu les meilleures performances durant l'entraînement (phase d'ajustement des paramètres) est {best_model_name}. Son évaluation finale est réalisée sur un ensemble de test constitué des 20 % de données non utilisées lors de l'ajustement du modèle (hold-out)."
-    if st.session_state.lang.startswith("fr")
-    else f"The best-performing model during training (parameters fitting phase) was {best_model_name}. Its performance is evaluated on a hold-out test set comprising 20% of the data that was not used during model fitting."
-)
+st.subheader(":blue[Evaluation]", divider=True)
 
-for name, Clf in all_classifiers:
-    if name == best_model_name:
-        best_model = Clf()
-        break
+if best_model_name is None:
+    # tous les modèles ont échoué ou ont été interrompus
+    st.warning(
+        "Aucun modèle n'a pu être évalué : pas d'évaluation sur l'ensemble de test."
+        if st.session_state.lang.startswith("fr")
+        else "No model could be evaluated: no hold-out evaluation.",
+        icon="⚠️",
+    )
 else:
-    raise ValueError(f"Impossible de trouver {best_model_name} dans all_classifiers")
-
-assert best_model is not None, f"best_model_name {best_model_name} non trouvé"
-
-best_model.fit(X_train, y_train)
-y_pred = best_model.predict(X_test)
+    st.write(f"🏆 {best_model_name}")
 
-assert y_test is not None
-# y_test is not none with preprocess_data(df, split=True)
+    st.write(
+        f"Le modèle ayant obtenu les meilleures performances durant l'entraînement (phase d'ajustement des paramètres) est {best_model_name}. Son évaluation finale est réalisée sur un ensemble de test constitué des 20 % de données non utilisées lors de l'ajustement du modèle (hold-out)."
+        if st.session_state.lang.startswith("fr")
+        else f"The best-performing model during training (parameters fitting phase) was {best_model_name}. Its performance is evaluated on a hold-out test set comprising 20% of the data that was not used during model fitting."
+    )
 
-balanced_acc = round(100 * balanced_accuracy_score(y_test, y_pred), 2)
-st.write(f"- Balanced accuracy = **{balanced_acc} %**")
+    # rapport hold-out calculé par le job
+    report = state["holdout"]
 
+    balanced_acc = round(100 * report["balanced_accuracy"], 2)
+    st.write(f"- Balanced accuracy = **{balanced_acc} %**")
 
-# Afficher classification_report sous forme de DataFrame
-report_dict = classification_report(y_test, y_pred, output_dict=True)
-df_report = pd.DataFrame(report_dict).transpose()
-st.write("- Classification Report")
-st.dataframe(df_report)
+    # Afficher classification_report sous forme de DataFrame
+    df_report = pd.DataFrame(report["classification_report"]).transpose()
+    st.write("- Classification Report")
+    st.dataframe(df_report)
 
-# Afficher la matrice de confusion
-cm = confusion_matrix(y_test, y_pred)
-df_cm = pd.DataFrame(cm, index=["Actual 0", "Actual 1"], columns=["Pred 0", "Pred 1"])
-st.write("- Confusion Matrix")
-st.dataframe(df_cm)
+    # Afficher la matrice de confusion
+    cm = report["confusion_matrix"]
+    df_cm = pd.DataFrame(
+        cm, index=["Actual 0", "Actual 1"], columns=["Pred 0", "Pred 1"]
+    )
+    st.write("- Confusion Matrix")
+    st.dataframe(df_cm)
 
 
 _, col, _ = st.columns(3)
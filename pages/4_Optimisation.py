@@ -1,12 +1,8 @@
 import streamlit as st
-import time
-from utils import set_seed, load_csv, preprocess_data
-from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
-from sklearn.svm import SVC
-from sklearn.neighbors import KNeighborsClassifier
-from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import GridSearchCV
-from sklearn.metrics import balanced_accuracy_score
+from utils import set_seed
+from dataset import dataset_hash
+from jobs import read_job, submit
+from tuning import param_grids
 import pandas as pd
 
 st.markdown(
@@ -17,140 +13,151 @@ st.markdown(
 
 st.subheader("🔧 :blue[Fine tuning]", divider=True)
 st.write(
-    "L'optimisation des hyperparamètres de 5 modèles est réalisée par Grid Search Cross Validation sur l'ensemble d'entraînement (80% des données) :"
+    "L'optimisation des hyperparamètres de 5 modèles est réalisée par Cross Validation sur l'ensemble d'entraînement (80% des données), en explorant une grille de paramètres :"
     if st.session_state.lang.startswith("fr")
-    else "Hyperparameter tuning of 5 models using Grid Search Cross Validation on the training set (80% of the data) :"
+    else "Hyperparameter tuning of 5 models using Cross Validation on the training set (80% of the data), exploring a parameter grid :"
 )
 
-models = {
-    "Logistic Regression": LogisticRegression(),
-    "K-Neighbors": KNeighborsClassifier(),
-    "SVC": SVC(probability=True),
-    "Random Forest": RandomForestClassifier(),
-    "Gradient Boosting": GradientBoostingClassifier(),
-}
-
-for model_name in models:
+for model_name in param_grids:
     st.write(f"- {model_name}")
 
 set_seed()
-df = load_csv(drop_outliers=True)
-
-X_train, X_test, y_train, y_test = preprocess_data(df, split=True)
-
-# memorize les colonnes pour pouvoir réindexer le X custom qui n'aura pas toutes les colones OH
-if "columns" not in st.session_state:
-    st.session_state.columns = X_train.columns
-
-params = {
-    "Logistic Regression": {
-        "C": [0.01, 0.1, 1, 10],
-        "penalty": ["l2"],
-        "solver": ["lbfgs"],
-    },
-    "K-Neighbors": {
-        "n_neighbors": [3, 5, 7],
-        "weights": ["uniform", "distance"],
-    },
-    "SVC": {
-        "C": [0.1, 1, 10],
-        "kernel": ["linear", "rbf"],
-        "gamma": ["scale", "auto"],
-    },
-    "Random Forest": {
-        "n_estimators": [50, 100],
-        "max_depth": [None, 5, 10],
-        "min_samples_split": [2, 5],
-    },
-    "Gradient Boosting": {
-        "n_estimators": [50, 100],
-        "learning_rate": [0.01, 0.1],
-        "max_depth": [3, 5],
-    },
-}
 
 with st.expander("Afficher les paramètres de la grille de recherche"):
-    st.json(params)
-
-progress_bar = st.progress(0)
-status_placeholder = st.empty()
-status_placeholder.text(f"0/{len(models)}")
-success_placeholder = st.empty()
-
-
-start_total_time = time.time()
-
-
-best_models = {}
-results = []
-
-
-for idx, name in enumerate(models):
+    st.json(param_grids)
 
-    with st.spinner(f"Optimizing {name}", show_time=True):
-
-        progress_bar.progress((idx) / len(models))
-        status_placeholder.text(f"{idx+1}/{len(models)} - optimizing {name}")
-
-        grid = GridSearchCV(
-            models[name], params[name], cv=5, n_jobs=-1, scoring="balanced_accuracy"
-        )
-        grid.fit(X_train, y_train)
+# stratégie de recherche : grille complète, échantillon aléatoire de la grille
+# ou successive halving (les folds servent de ressource)
+strategy = st.segmented_control(
+    (
+        "Stratégie de recherche"
+        if st.session_state.lang.startswith("fr")
+        else "Search strategy"
+    ),
+    options=["halving", "random", "grid"],
+    format_func={
+        "halving": "Successive halving",
+        "random": "Random search",
+        "grid": "Grid search",
+    }.get,
+    default="halving",
+)
+strategy = strategy or "halving"
+
+# budget global en nombre de fits de Cross Validation, réparti entre les 5
+# modèles au prorata de leur grille (la grille complète en demande 210)
+max_fits = 250
+
+# l'optimisation tourne dans un job d'arrière-plan : elle survit à la
+# fermeture de l'onglet, et une autre session avec les mêmes entrées s'y
+# rattache au lieu de la relancer
+job_params = {
+    "dataset": dataset_hash(),
+    "seed": st.session_state.seed,
+    "strategy": strategy,
+    "max_fits": max_fits,
+}
+job_id = submit("tuning", job_params)
 
-        best_model = grid.best_estimator_
 
-        st.session_state[name] = best_model
+def show_model(name: str, state: dict, with_details: bool):
+    progress = state["progress"][name]
+    st.progress(
+        1.0 if progress["Done"] else progress["Fits"] / progress["Max fits"],
+        text=f"{name} - {progress['Fits']} fits",
+    )
+    result = state["results"].get(name)
+    if result is None:
+        return
+    st.markdown(
+        f"""
+    - **{name}**  
+        Best Params : {result['Best Params']}  
+        Best Mean Balanced Accuracy : **{result['CV Balanced Accuracy']} %**  
+        Fits : {result['Fits']} / {progress['Grid fits']} ({result['Cached']} checkpoint)  
+    """
+    )
+    if with_details:
+        with st.expander(
+            "Afficher les résultats de la Grid Search CV"
+            if st.session_state.lang.startswith("fr")
+            else "Display grid search results"
+        ):
+            st.dataframe(pd.DataFrame(result["cv_results"]))
 
-        y_pred = best_model.predict(X_test)
 
-        # On récupère les résultats de la GridSearch sous forme de DataFrame
-        cv_results = pd.DataFrame(grid.cv_results_)
-        # Sélection de la ligne avec le meilleur rang (1)
-        best_result = cv_results[cv_results["rank_test_score"] == 1]
-        # Récupération du score moyen de test (balanced accuracy ici)
-        best_mean_score = best_result["mean_test_score"].values[0]
+# état du job relu toutes les secondes, sans réexécuter la page
+@st.fragment(run_every=1.0)
+def job_progress():
+    job = read_job(job_id)
+    if job["status"] in ("done", "failed"):
+        st.rerun()
 
-        st.markdown(
-            f"""
-        - **{name}**  
-            Best Params : {grid.best_params_}  
-            Best Mean Balanced Accuracy : **{round(100*best_mean_score,2)} %**  
-        """
+    state = job["state"]
+    if state is None:
+        st.info(
+            "Optimisation en attente de démarrage..."
+            if st.session_state.lang.startswith("fr")
+            else "Optimisation waiting to start...",
+            icon="⏳",
         )
+        return
 
-        assert y_test is not None
-        # y_test is not none with preprocess_data(df, split=True)
+    n_done = len(state["results"])
+    st.progress(n_done / len(param_grids), text=f"{n_done}/{len(param_grids)}")
+    # une barre de progression et des résultats par modèle, dans l'ordre de la
+    # liste quel que soit l'ordre de fin des recherches
+    for name in param_grids:
+        show_model(name, state, with_details=False)
 
-        bal_acc = round(100 * balanced_accuracy_score(y_test, y_pred), 2)
 
-        results.append(
-            {
-                "Model": name,
-                "Balanced Accuracy": bal_acc,
-                "Best Params": grid.best_params_,
-            }
-        )
-        with st.expander(
-            "Afficher les résultats de la Grid Search CV"
-            if st.session_state.lang.startswith("fr")
-            else "Display grid search results"
-        ):
-            st.dataframe(pd.DataFrame(grid.cv_results_))
+job = read_job(job_id)
+if job["status"] == "failed":
+    st.error(
+        "L'optimisation a échoué"
+        if st.session_state.lang.startswith("fr")
+        else "The optimisation failed",
+        icon="🚨",
+    )
+    st.code(job["error"])
+    if st.button(
+        "Relancer l'optimisation"
+        if st.session_state.lang.startswith("fr")
+        else "Run the optimisation again"
+    ):
+        submit("tuning", job_params, retry=True)
+        st.rerun()
+    st.stop()
 
-duration = round(time.time() - start_total_time, 1)
+if job["status"] != "done":
+    with st.spinner("Optimizing", show_time=True):
+        job_progress()
+    st.stop()
 
-progress_bar.progress(1.0)
-status_placeholder.text("")
+state = job["state"]
+duration = round(job["finished_at"] - job["started_at"], 1)
 
-success_placeholder.success(
+st.success(
     (
-        f"Les {len(models)} modèles ont été optimisés en {duration} s"
+        f"Les {len(param_grids)} modèles ont été optimisés en {duration} s"
         if st.session_state.lang.startswith("fr")
-        else f"The {len(models)} models were optimized in {duration} seconds."
+        else f"The {len(param_grids)} models were optimized in {duration} seconds."
     ),
     icon="✅",
 )
 
+for name in param_grids:
+    show_model(name, state, with_details=True)
+
+results = [
+    {
+        "Model": name,
+        "Balanced Accuracy": result["Balanced Accuracy"],
+        "Best Params": result["Best Params"],
+    }
+    for name, result in state["results"].items()
+]
+
 st.subheader(
     (
         "🏆 :blue[Classement]"
@@ -174,9 +181,6 @@ st.dataframe(df_results)
 
 st.caption(f"seed de la session = {st.session_state.seed}")
 
-if "df_results" not in st.session_state:
-    st.session_state.df_results = df_results
-
 
 _, col, _ = st.columns(3)
 with col:
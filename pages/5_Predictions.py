@@ -1,13 +1,29 @@
 import streamlit as st
-from utils import set_seed, load_csv, preprocess_data, get_fare_bounds, to_display
+from utils import (
+    set_seed,
+    load_csv,
+    get_fare_bounds,
+    get_compiled_model,
+    get_preprocessor,
+    get_registered_model,
+    get_scored_manifest,
+    release,
+)
+from registry import list_models
+from scoring import score_passenger, sensitivity_curves
 import pandas as pd
+import plotly.express as px
+import time
 
 st.markdown(
     "<h2 style='text-align: center; color: #0366d6;'>🎯 Predictions</h2>",
     unsafe_allow_html=True,
 )
 
-if "df_results" not in st.session_state:
+# modèles optimisés (dans cette session ou une autre) lus dans le registre
+registered = {meta["name"]: meta for meta in list_models()}
+
+if not registered:
     st.info(
         """Les modèles doivent être optimisés avant de pouvoir réaliser des prédictions fiables.  
         Merci de bien vouloir exécuter l'étape 📈 Optimisation jusqu'à son terme.""",
@@ -63,46 +79,42 @@ model_choisi = st.selectbox(
         if st.session_state.lang.startswith("fr")
         else "Choose the model"
     ),
-    options=list(st.session_state.df_results.Model),
+    options=sorted(
+        registered,
+        key=lambda name: registered[name]["metrics"]["Balanced Accuracy"],
+        reverse=True,
+    ),
 )
 
 if model_choisi is None:
     st.error("Aucun modèle à choisir")
     st.stop()
 else:
-    model = st.session_state[model_choisi]
-
+    meta = registered[model_choisi]
+    # chargé une seule fois par processus, à la première sélection
+    model, preprocessor, _ = get_registered_model(model_choisi, meta["version"])
+    # prédicteur NumPy compilé (mêmes probabilités) pour le passager
+    # personnalisé, sans le coût fixe de predict_proba de Scikit-learn ; le
+    # modèle lui-même pour une famille non compilée
+    compiled = get_compiled_model(model_choisi, meta["version"])
+
+balanced_accuracy = meta["metrics"]["Balanced Accuracy"]
 st.write(
-    f"📌 balanced accuracy of {model_choisi} model = **{st.session_state.df_results.loc[st.session_state.df_results.Model == model_choisi, "Balanced Accuracy"
-].values[0]} %**"
+    f"📌 balanced accuracy of {model_choisi} model = **{balanced_accuracy} %**"
 )
 
 set_seed()
-df = load_csv(drop_outliers=True)
-X, _, y, _ = preprocess_data(df, split=False)
-
+df = load_csv(drop_outliers=True, compact=True)
 
-y_proba = model.predict_proba(X)
-y_pred = model.predict(X)
-
-df_display = to_display(df)
-
-df_display.insert(
-    loc=0, column="Chance de survie", value=(y_proba[:, 1] * 100).round(2)
-)
-df_display = df_display.sort_values(by="Chance de survie", ascending=False)
-df_display.insert(
-    loc=2,
-    column="Prédiction correcte ?",
-    value=y_pred == y,
-)
-df_display["Prédiction correcte ?"] = df_display["Prédiction correcte ?"].apply(
-    lambda x: "✔️" if x else "❌"
-)
+# tableau des prédictions mis en cache par empreinte du modèle
+df_display = get_scored_manifest(model, preprocessor)
 
 st.dataframe(df_display)
 
-st.caption(f"seed de la session = {st.session_state.seed}")
+st.caption(
+    f"version {meta['version']} - seed = {meta['seed']} - "
+    + time.strftime("%Y-%m-%d %H:%M", time.localtime(meta["created_at"]))
+)
 
 
 st.write(
@@ -153,118 +165,196 @@ st.write(
     La compagnie **DIDS** décline toute responsabilité en cas de prédiction peu rassurante... 🛟"""
 )
 
-col1, col2 = st.columns(2, border=True)
-
 bounds = get_fare_bounds(df)
 
-with col1:
 
-    st.markdown(
-        """<div style="text-align: center;"><em>Caractéristiques du passager</em></div>""",
-        unsafe_allow_html=True,
-    )
-    st.write("")
+# seul ce fragment est réexécuté quand un widget du formulaire change : la
+# vidéo, le chargement des données et le scoring du manifeste ne sont pas rejoués
+@st.fragment
+def custom_passenger(model_name, model, preprocessor, bounds):
 
-    st.radio(
-        "**Sexe**",
-        ("female", "male"),
-        format_func=lambda x: "Femme" if x == "female" else "Homme",
-        horizontal=True,
-        key="sexe",
-    )
+    col1, col2 = st.columns(2, border=True)
 
-    st.slider("**Age**", 0, 100, 50, key="age")
+    with col1:
 
-    st.radio("**Classe**", (1, 2, 3), index=1, horizontal=True, key="pclass")
+        st.markdown(
+            """<div style="text-align: center;"><em>Caractéristiques du passager</em></div>""",
+            unsafe_allow_html=True,
+        )
+        st.write("")
+
+        st.radio(
+            "**Sexe**",
+            ("female", "male"),
+            format_func=lambda x: "Femme" if x == "female" else "Homme",
+            horizontal=True,
+            key="sexe",
+        )
 
-    st.slider(
-        "**Tarif**",
-        int(bounds[st.session_state.pclass]["min"]),
-        int(bounds[st.session_state.pclass]["max"]),
-        int(bounds[st.session_state.pclass]["median"]),
-        key="fare",
-    )
+        st.slider("**Age**", 0, 100, 50, key="age")
 
-    st.caption("tarif par défaut = valeur médiane de la classe")
-
-    st.selectbox(
-        "**Port d'embarquement**",
-        options=["C", "Q", "S"],
-        index=0,
-        format_func=lambda x: {
-            "C": "🇫🇷 Cherbourg",
-            "Q": "🇮🇪 Queenstown",
-            "S": "🇬🇧 Southampton",
-        }[x],
-        key="embarked",
-    )
+        st.radio("**Classe**", (1, 2, 3), index=1, horizontal=True, key="pclass")
+
+        st.slider(
+            "**Tarif**",
+            int(bounds[st.session_state.pclass]["min"]),
+            int(bounds[st.session_state.pclass]["max"]),
+            int(bounds[st.session_state.pclass]["median"]),
+            key="fare",
+        )
 
+        st.caption("tarif par défaut = valeur médiane de la classe")
+
+        st.selectbox(
+            "**Port d'embarquement**",
+            options=["C", "Q", "S"],
+            index=0,
+            format_func=lambda x: {
+                "C": "🇫🇷 Cherbourg",
+                "Q": "🇮🇪 Queenstown",
+                "S": "🇬🇧 Southampton",
+            }[x],
+            key="embarked",
+        )
 
-with col2:
-    st.markdown(
-        """<div style="text-align: center;"><em>Famille du passager (à bord du Titanic)</em></div>""",
-        unsafe_allow_html=True,
-    )
-    st.write("")
+    with col2:
+        st.markdown(
+            """<div style="text-align: center;"><em>Famille du passager (à bord du Titanic)</em></div>""",
+            unsafe_allow_html=True,
+        )
+        st.write("")
+
+        st.radio(
+            "**Époux(se)**",
+            [1, 0],
+            index=1,
+            format_func=lambda x: "Oui" if x else "Non",
+            horizontal=True,
+            key="spouse",
+        )
+
+        st.slider("**Frères et sœurs**", 0, 10, 0, key="siblings")
+
+        st.radio("**Parents**", (0, 1, 2), horizontal=True, key="parents")
 
-    st.radio(
-        "**Époux(se)**",
-        [1, 0],
-        index=1,
-        format_func=lambda x: "Oui" if x else "Non",
-        horizontal=True,
-        key="spouse",
+        st.slider("**Enfants**", 0, 10, 0, key="children")
+
+    custom = pd.DataFrame(
+        [
+            [
+                st.session_state.pclass,
+                st.session_state.sexe,
+                st.session_state.age,
+                st.session_state.spouse + st.session_state.siblings,
+                st.session_state.parents + st.session_state.children,
+                st.session_state.fare,
+                st.session_state.embarked,
+            ]
+        ],
+        columns=["Pclass", "Sex", "Age", "SibSp", "Parch", "Fare", "Embarked"],
+    )
+    custom.index = pd.Index(["Passenger"])
+
+    passenger = {
+        "pclass": st.session_state.pclass,
+        "sex": st.session_state.sexe,
+        "age": st.session_state.age,
+        "sibsp": st.session_state.spouse + st.session_state.siblings,
+        "parch": st.session_state.parents + st.session_state.children,
+        "fare": st.session_state.fare,
+        "embarked": st.session_state.embarked,
+    }
+
+    # chemin rapide : features construites directement dans un vecteur NumPy
+    # (preprocessing appris sur l'ensemble d'entraînement), sans DataFrame
+    proba = score_passenger(model, preprocessor, **passenger)
+
+    chance = round(100 * proba)
+
+    st.metric(
+        "Survival chance predicted",
+        ("🟢" if chance >= 50 else "🔴") + f" {chance} %",
     )
 
-    st.slider("**Frères et sœurs**", 0, 10, 0, key="siblings")
+    custom.columns = [
+        "Classe",
+        "Sexe",
+        "Age",
+        "Fratrie & Conjoint(e)",
+        "Parents & Enfants",
+        "Tarif",
+        "Embarquement",
+    ]
 
-    st.radio("**Parents**", (0, 1, 2), horizontal=True, key="parents")
+    st.dataframe(custom)
 
-    st.slider("**Enfants**", 0, 10, 0, key="children")
+    what_if(model_name, model, preprocessor, passenger, bounds)
 
-custom = pd.DataFrame(
-    [
-        [
-            st.session_state.pclass,
-            st.session_state.sexe,
-            st.session_state.age,
-            st.session_state.spouse + st.session_state.siblings,
-            st.session_state.parents + st.session_state.children,
-            st.session_state.fare,
-            st.session_state.embarked,
-        ]
-    ],
-    columns=["Pclass", "Sex", "Age", "SibSp", "Parch", "Fare", "Embarked"],
-)
-custom.index = pd.Index(["Passenger"])
 
+def what_if(model_name, model, preprocessor, passenger, bounds):
+    fr = st.session_state.lang.startswith("fr")
+    st.markdown("**Et si... ?**" if fr else "**What if...?**")
+    st.caption(
+        "Chance de survie quand une seule caractéristique du passager varie, les autres restant fixes."
+        if fr
+        else "Survival chance when a single feature of the passenger varies, the others staying fixed."
+    )
+
+    compared = st.multiselect(
+        "Modèles comparés" if fr else "Compared models",
+        [name for name in registered if name != model_name],
+        key="what_if_models",
+    )
+    models = {model_name: (model, preprocessor)}
+    # un emplacement par position de la sélection : seuls le prédicteur
+    # compilé et le preprocessing sont chargés, sans l'estimateur complet
+    for i, name in enumerate(compared):
+        version = registered[name]["version"]
+        models[name] = (
+            get_compiled_model(name, version, slot=f"what-if/{i}/compiled"),
+            get_preprocessor(name, version, slot=f"what-if/{i}/preprocessor"),
+        )
+    # positions libérées quand la sélection se réduit
+    for i in range(len(compared), len(registered)):
+        release(f"what-if/{i}/compiled")
+        release(f"what-if/{i}/preprocessor")
+
+    # toutes les variantes du passager en un appel predict_proba par modèle
+    curves = sensitivity_curves(models, passenger, bounds)
+    curves["Probability"] = (100 * curves["Probability"]).round(1)
+
+    labels = {
+        "age": "Age",
+        "fare": "Tarif" if fr else "Fare",
+        "sibsp": "Fratrie & Conjoint(e)" if fr else "Siblings & Spouse",
+        "parch": "Parents & Enfants" if fr else "Parents & Children",
+        "pclass": "Classe" if fr else "Class",
+        "sex": "Sexe" if fr else "Sex",
+        "embarked": "Embarquement" if fr else "Port",
+    }
+    columns = st.columns(2)
+    for i, (feature, label) in enumerate(labels.items()):
+        curve = curves[curves["Feature"] == feature]
+        axes = {
+            "x": "Value",
+            "y": "Probability",
+            "color": "Model",
+            "labels": {"Value": label, "Probability": "%"},
+            "range_y": [0, 100],
+        }
+        if feature in ("pclass", "sex", "embarked"):
+            fig = px.bar(curve.astype({"Value": str}), barmode="group", **axes)
+        else:
+            fig = px.line(curve, **axes)
+            # valeur actuelle du passager
+            fig.add_vline(x=passenger[feature], line_dash="dot")
+        fig.update_layout(
+            height=250, margin=dict(t=10, b=10), showlegend=len(models) > 1
+        )
+        columns[i % 2].plotly_chart(fig, key=f"what_if_{feature}")
 
-set_seed()
-# st.write(st.session_state.columns)
-X, _, _, _ = preprocess_data(custom, split=False)
-X = X.reindex(columns=st.session_state["columns"], fill_value=0)
-# st.dataframe(X)
-model = st.session_state[model_choisi]
-y_prob = model.predict_proba(X)
-
-chance = round(100 * y_prob[0, 1])
-
-st.metric(
-    "Survival chance predicted",
-    ("🟢" if chance >= 50 else "🔴") + f" {chance} %",
-)
 
-custom.columns = [
-    "Classe",
-    "Sexe",
-    "Age",
-    "Fratrie & Conjoint(e)",
-    "Parents & Enfants",
-    "Tarif",
-    "Embarquement",
-]
-
-st.dataframe(custom)
+custom_passenger(model_choisi, compiled, preprocessor, bounds)
 
 _, col, _ = st.columns(3)
 with col:
@@ -0,0 +1,273 @@
+"""Préparation des features, en mémoire ou par blocs pour les gros manifestes."""
+
+from collections.abc import Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from dataset import iter_passenger_chunks
+
+# variables numériques mises à l'échelle
+num_cols = ["Age", "Fare", "SibSp", "Parch", "Pclass", "Family"]
+
+# variables encodées en one-hot, avec la modalité supprimée pour chacune
+categorical_cols = {"Sex": "female", "Embarked": "C"}
+
+
+def remove_outliers(X: pd.DataFrame) -> pd.DataFrame:
+    return X[X["Fare"] < 500]
+
+
+def split_data(
+    df: pd.DataFrame, split: bool, seed: int | None = None
+) -> tuple[pd.DataFrame, pd.DataFrame | None, pd.Series | None, pd.Series | None]:
+    """drops outliers, separates the target and splits raw passengers 80/20"""
+    X = remove_outliers(df)
+
+    # target
+    if "Survived" in X.columns:
+        y = X.pop("Survived")
+    else:  # custom passenger doesn't have "survived"
+        y = None
+
+    if not split:
+        return X, None, y, None
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, stratify=y, random_state=seed
+    )
+    return X_train, X_test, y_train, y_test
+
+
+def engineer_features(X: pd.DataFrame) -> pd.DataFrame:
+    """drops the text columns and adds Family and IsAlone"""
+    # drop "Name", "Ticket" and Cabin except for custom passenger who doesn't have
+    cols_to_drop = {"Name", "Ticket", "Cabin"}.intersection(X.columns)
+    X = X.drop(list(cols_to_drop), axis=1)
+
+    X["Family"] = X["SibSp"] + X["Parch"] + 1
+    X["IsAlone"] = (X["Family"] == 1).astype(int)
+    return X
+
+
+class PassengerPreprocessor(TransformerMixin, BaseEstimator):
+    """Fitted preprocessing of raw passenger frames.
+
+    Learns the imputation values (Age median, Embarked mode), the scaler of
+    the numerical columns and the one-hot vocabulary once, then transforms any
+    passenger frame (full manifest, chunk or single custom passenger) into the
+    same fixed column layout. The object is picklable and can be shared across
+    sessions.
+    """
+
+    def fit(self, X: pd.DataFrame, y=None):
+        return self.fit_chunks([X])
+
+    def fit_chunks(self, chunks: Iterable[pd.DataFrame]):
+        """fits on raw passenger chunks in a single pass
+
+        Only the non-missing ages are kept in memory (float32) to get the
+        exact median; the scaler is fitted incrementally and its Age
+        statistics are then corrected as if missing ages had been imputed with
+        that median.
+        """
+        scaler = StandardScaler()
+        ages = []
+        n_missing_age = 0
+        embarked_counts = pd.Series(dtype="float64")
+        categories = {col: set() for col in categorical_cols}
+        base_cols = None
+
+        for X in chunks:
+            X = engineer_features(X.drop(columns="Survived", errors="ignore"))
+            if base_cols is None:
+                base_cols = [c for c in X.columns if c not in categorical_cols]
+            ages.append(X["Age"].dropna().to_numpy(dtype=np.float32))
+            n_missing_age += int(X["Age"].isna().sum())
+            embarked_counts = embarked_counts.add(
+                X["Embarked"].value_counts(), fill_value=0
+            )
+            for col in categorical_cols:
+                categories[col].update(X[col].dropna().unique())
+            # les NaN de Age sont ignorés par partial_fit
+            scaler.partial_fit(X[num_cols])
+
+        if base_cols is None:
+            raise ValueError("Aucun passager à traiter")
+
+        self.age_median_ = float(np.median(np.concatenate(ages)))
+        # mode : modalité la plus fréquente, la plus petite en cas d'égalité
+        modes = embarked_counts[embarked_counts == embarked_counts.max()].index
+        self.embarked_mode_ = sorted(modes)[0]
+
+        # correction des statistiques de Age pour les valeurs imputées
+        i = num_cols.index("Age")
+        n_seen = float(np.atleast_1d(scaler.n_samples_seen_)[i])
+        n = n_seen + n_missing_age
+        mean = (n_seen * scaler.mean_[i] + n_missing_age * self.age_median_) / n
+        var = (
+            n_seen * (scaler.var_[i] + scaler.mean_[i] ** 2)
+            + n_missing_age * self.age_median_**2
+        ) / n - mean**2
+        scaler.mean_[i], scaler.var_[i], scaler.scale_[i] = mean, var, np.sqrt(var)
+        self.scaler_ = scaler
+
+        self.base_cols_ = base_cols
+        # vocabulaire one-hot figé, sans la modalité de référence
+        self.categories_ = {
+            col: [v for v in sorted(categories[col]) if v != dropped]
+            for col, dropped in categorical_cols.items()
+        }
+        self.feature_names_ = base_cols + [
+            f"{col}_{value}"
+            for col, values in self.categories_.items()
+            for value in values
+        ]
+
+        # positions et statistiques précalculées pour passenger_vector
+        self.feature_index_ = {name: i for i, name in enumerate(self.feature_names_)}
+        self.num_index_ = np.array([self.feature_index_[c] for c in num_cols])
+        self.num_mean_ = scaler.mean_.copy()
+        self.num_scale_ = scaler.scale_.copy()
+        return self
+
+    def transform(self, X: pd.DataFrame) -> pd.DataFrame:
+        """returns the features of X in the fitted column order"""
+        X = engineer_features(X.drop(columns="Survived", errors="ignore"))
+        X["Age"] = X["Age"].fillna(self.age_median_)
+        embarked = X["Embarked"]
+        if isinstance(embarked.dtype, pd.CategoricalDtype) and (
+            self.embarked_mode_ not in embarked.cat.categories
+        ):
+            # bloc dont les catégories ne contiennent pas le mode appris
+            embarked = embarked.cat.add_categories([self.embarked_mode_])
+        X["Embarked"] = embarked.fillna(self.embarked_mode_)
+        X[num_cols] = self.scaler_.transform(X[num_cols])
+
+        # encodage one-hot direct sur le vocabulaire appris : pas de
+        # get_dummies ni de reindex, les modalités absentes valent False
+        features = X[self.base_cols_]
+        dummies = {
+            f"{col}_{value}": X[col].to_numpy() == value
+            for col, values in self.categories_.items()
+            for value in values
+        }
+        return features.assign(**dummies)[self.feature_names_]
+
+    def passenger_vector(
+        self,
+        pclass: int,
+        sex: str,
+        age: float,
+        sibsp: int,
+        parch: int,
+        fare: float,
+        embarked: str,
+        out: np.ndarray | None = None,
+    ) -> np.ndarray:
+        """returns the (1, n_features) feature row of a single passenger
+
+        Same features as transform, built straight into a NumPy buffer (reused
+        when out is given) without any DataFrame. A None or NaN age or port
+        gets the learned value.
+        """
+        if out is None:
+            out = np.empty((1, len(self.feature_names_)))
+        row = out[0]
+        row[:] = 0.0
+
+        family = sibsp + parch + 1
+        raw = {
+            "Age": self.age_median_ if pd.isna(age) else age,
+            "Fare": fare,
+            "SibSp": sibsp,
+            "Parch": parch,
+            "Pclass": pclass,
+            "Family": family,
+        }
+        row[self.num_index_] = (
+            np.array([raw[c] for c in num_cols], dtype=float) - self.num_mean_
+        ) / self.num_scale_
+        row[self.feature_index_["IsAlone"]] = family == 1
+
+        values = {
+            "Sex": sex,
+            "Embarked": self.embarked_mode_ if pd.isna(embarked) else embarked,
+        }
+        for col, value in values.items():
+            # modalité de référence ou inconnue : toutes les colonnes à 0
+            i = self.feature_index_.get(f"{col}_{value}")
+            if i is not None:
+                row[i] = 1.0
+        return out
+
+    def passenger_matrix(
+        self,
+        pclass: np.ndarray,
+        sex: np.ndarray,
+        age: np.ndarray,
+        sibsp: np.ndarray,
+        parch: np.ndarray,
+        fare: np.ndarray,
+        embarked: np.ndarray,
+    ) -> np.ndarray:
+        """returns the (n, n_features) feature rows of n passengers
+
+        Vectorized passenger_vector: one array per argument (NaN age and
+        None port for the learned values), filled column by column.
+        """
+        pclass, sibsp, parch, fare = (
+            np.asarray(a, dtype=float) for a in (pclass, sibsp, parch, fare)
+        )
+        age = np.asarray(age, dtype=float)
+        family = sibsp + parch + 1
+        raw = {
+            "Age": np.where(np.isnan(age), self.age_median_, age),
+            "Fare": fare,
+            "SibSp": sibsp,
+            "Parch": parch,
+            "Pclass": pclass,
+            "Family": family,
+        }
+        X = np.zeros((len(age), len(self.feature_names_)))
+        X[:, self.num_index_] = (
+            np.column_stack([raw[c] for c in num_cols]) - self.num_mean_
+        ) / self.num_scale_
+        X[:, self.feature_index_["IsAlone"]] = family == 1
+
+        embarked = np.asarray(embarked, dtype=object)
+        embarked = np.where(pd.isna(embarked), self.embarked_mode_, embarked)
+        values = {"Sex": np.asarray(sex, dtype=object), "Embarked": embarked}
+        for col, categories in self.categories_.items():
+            for value in categories:
+                X[:, self.feature_index_[f"{col}_{value}"]] = values[col] == value
+        return X
+
+    def get_feature_names_out(self, input_features=None):
+        return np.asarray(self.feature_names_, dtype=object)
+
+
+def iter_feature_blocks(
+    source: str,
+    chunksize: int = 100_000,
+    preprocessor: PassengerPreprocessor | None = None,
+) -> Iterator[tuple[pd.DataFrame, pd.Series | None]]:
+    """yields (X, y) feature blocks of a manifest read chunk by chunk
+
+    Without a fitted preprocessor, a first pass over the source fits one.
+    Peak memory is bounded by the chunk size.
+    """
+
+    def chunks():
+        for chunk in iter_passenger_chunks(source, chunksize):
+            yield remove_outliers(chunk)
+
+    if preprocessor is None:
+        preprocessor = PassengerPreprocessor().fit_chunks(chunks())
+
+    for chunk in chunks():
+        y = chunk["Survived"] if "Survived" in chunk.columns else None
+        yield preprocessor.transform(chunk), y
@@ -0,0 +1,170 @@
+"""Registre local des modèles optimisés, partagé entre sessions et processus.
+
+Chaque version d'un modèle est un dossier ``data/cache/models/<modèle>/<n>``
+contenant l'estimateur, le preprocessing ajusté (joblib) et ses métadonnées
+(ordre des features, paramètres, métriques, données et seed d'entraînement).
+Un index JSON donne les versions disponibles et la dernière de chaque modèle.
+"""
+
+import os
+import re
+import time
+
+import joblib
+import sklearn
+
+from compiled import CompiledModel, compile_model
+from preprocessing import PassengerPreprocessor
+from scoring import model_fingerprint
+from store import atomic_write, cache_dir, file_lock, make_key, read_json, write_json
+
+registry_dir = os.path.join(cache_dir, "models")
+index_path = os.path.join(registry_dir, "index.json")
+
+
+def _version_dir(name: str, version: int) -> str:
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", name).strip("-").lower()
+    return os.path.join(registry_dir, slug, str(version))
+
+
+def register(
+    name: str,
+    estimator,
+    preprocessor: PassengerPreprocessor,
+    metrics: dict,
+    **info,
+) -> int:
+    """stores a new version of a model and returns its version number
+
+    info (params, seed, dataset hash...) is kept in the metadata. Registering
+    the same configuration (estimator class and params, info) as the latest
+    version, e.g. a best model read back from a tuning checkpoint, creates no
+    new version.
+    """
+    entry = (read_json(index_path) or {}).get(name, {"latest": None, "versions": []})
+    spec = make_key(
+        type(estimator).__name__,
+        repr(sorted(estimator.get_params().items())),
+        info,
+        sklearn.__version__,
+    )
+    if entry["latest"] is not None:
+        latest = read_json(
+            os.path.join(_version_dir(name, entry["latest"]), "meta.json")
+        )
+        if latest is not None and latest["spec"] == spec:
+            return entry["latest"]
+
+    # numéro réservé par la création de son dossier : deux enregistrements
+    # simultanés (jobs de deux processus serveurs) n'écrivent jamais dans le
+    # même dossier
+    version = max(entry["versions"], default=0) + 1
+    while True:
+        path = _version_dir(name, version)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            os.mkdir(path)
+            break
+        except FileExistsError:
+            version += 1
+    atomic_write(
+        os.path.join(path, "model.joblib"),
+        lambda tmp_path: joblib.dump(estimator, tmp_path),
+    )
+    atomic_write(
+        os.path.join(path, "preprocessor.joblib"),
+        lambda tmp_path: joblib.dump(preprocessor, tmp_path),
+    )
+    # prédicteur NumPy compilé (export), pour les familles prises en charge
+    try:
+        compiled = compile_model(estimator)
+    except ValueError:
+        compiled = None
+    if compiled is not None:
+        atomic_write(
+            os.path.join(path, "compiled.joblib"),
+            lambda tmp_path: joblib.dump(compiled, tmp_path),
+        )
+    # métadonnées écrites en dernier : une version sans meta.json est ignorée
+    write_json(
+        os.path.join(path, "meta.json"),
+        {
+            "name": name,
+            "version": version,
+            "spec": spec,
+            "fingerprint": model_fingerprint(estimator),
+            "created_at": int(time.time()),
+            "sklearn": sklearn.__version__,
+            "features": list(preprocessor.feature_names_),
+            "metrics": metrics,
+            **info,
+        },
+    )
+
+    # index relu et réécrit sous verrou : aucune version concurrente perdue
+    with file_lock(index_path + ".lock"):
+        index = read_json(index_path) or {}
+        entry = index.setdefault(name, {"latest": None, "versions": []})
+        entry["versions"] = sorted({*entry["versions"], version})
+        entry["latest"] = entry["versions"][-1]
+        write_json(index_path, index)
+    return version
+
+
+def list_models() -> list[dict]:
+    """returns the metadata of the latest version of every registered model"""
+    models = []
+    for name, entry in (read_json(index_path) or {}).items():
+        meta = read_json(os.path.join(_version_dir(name, entry["latest"]), "meta.json"))
+        if meta is not None:
+            models.append(meta)
+    return models
+
+
+def load_model(name: str, version: int | None = None):
+    """returns (estimator, preprocessor, metadata) of a registered model
+
+    Latest version by default. Raises KeyError for an unknown model and
+    ValueError if the estimator was fitted on another number of features.
+    """
+    if version is None:
+        version = (read_json(index_path) or {})[name]["latest"]
+    path = _version_dir(name, version)
+    meta = read_json(os.path.join(path, "meta.json"))
+    if meta is None:
+        raise KeyError(f"{name} v{version}")
+
+    estimator = joblib.load(os.path.join(path, "model.joblib"))
+    preprocessor = joblib.load(os.path.join(path, "preprocessor.joblib"))
+    # estimateurs ajustés sur des tableaux NumPy, dans l'ordre des features
+    # du preprocessing (meta["features"]) : seul leur nombre est vérifiable
+    n_features = getattr(estimator, "n_features_in_", None)
+    if n_features is not None and n_features != len(meta["features"]):
+        raise ValueError(f"Nombre de features incohérent pour {name} v{version}")
+    return estimator, preprocessor, meta
+
+
+def load_preprocessor(name: str, version: int | None = None) -> PassengerPreprocessor:
+    """returns the fitted preprocessor of a registered model, without its estimator"""
+    if version is None:
+        version = (read_json(index_path) or {})[name]["latest"]
+    return joblib.load(os.path.join(_version_dir(name, version), "preprocessor.joblib"))
+
+
+def load_compiled(name: str, version: int | None = None) -> CompiledModel:
+    """returns the compiled NumPy predictor of a registered model
+
+    Versions registered before the export step are compiled on the fly.
+    Raises ValueError for a model family without compiled predictor.
+    """
+    if version is None:
+        version = (read_json(index_path) or {})[name]["latest"]
+    path = os.path.join(_version_dir(name, version), "compiled.joblib")
+    if os.path.exists(path):
+        try:
+            return joblib.load(path)
+        except AttributeError:
+            # export d'une famille qui n'est plus compilée (k plus proches
+            # voisins) : compile_model la refuse
+            pass
+    return compile_model(load_model(name, version)[0])
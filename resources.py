@@ -0,0 +1,135 @@
+"""Ressources partagées par toutes les sessions du processus.
+
+Modèles, jeux de données et folds identiques ne sont chargés qu'une fois par
+processus, quel que soit le nombre de sessions. Chaque ressource est comptée
+tant qu'une session la référence ; au-delà du plafond mémoire, les ressources
+qui ne sont plus référencées sont évincées, la moins récemment utilisée
+d'abord.
+"""
+
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+
+import numpy as np
+import pandas as pd
+
+# plafond mémoire des ressources partagées (Mo), réglable par variable
+# d'environnement
+max_mb = float(os.environ.get("TITANIC_RESOURCES_MAX_MB", 1024))
+
+
+def sizeof(obj) -> int:
+    """returns the approximate memory size of obj in bytes"""
+    if obj is None:
+        return 0
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, (tuple, list)):
+        return sum(sizeof(item) for item in obj)
+    # modèles et autres objets : taille sérialisée, proche de leur empreinte
+    try:
+        return len(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 0
+
+
+class ResourceStore:
+    """Process-wide store of shared objects with reference counts and a cap.
+
+    get(key, loader) returns the cached object or loads it once, even when
+    several threads (sessions) ask for it at the same time. Held objects
+    (hold=True, until release) are never evicted; the others are evicted in
+    least recently used order whenever the total size exceeds max_bytes.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # ordre LRU : le plus récent à la fin
+        self._lock = threading.RLock()
+        self._loading = {}  # verrou de chargement par clé
+
+    def get(self, key: Hashable, loader: Callable, hold: bool = False):
+        with self._lock:
+            value = self._hit(key, hold)
+            if value is not None:
+                return value
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        # chargement hors du verrou global : les autres clés restent servies
+        with key_lock:
+            with self._lock:
+                value = self._hit(key, hold)
+                if value is not None:
+                    return value
+            value = loader()
+            size = sizeof(value)
+            with self._lock:
+                self._entries[key] = {
+                    "value": value,
+                    "size": size,
+                    "refs": int(hold),
+                    "last_used": time.time(),
+                }
+                self._loading.pop(key, None)
+                self._evict()
+            return value
+
+    def _hit(self, key: Hashable, hold: bool):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        entry["last_used"] = time.time()
+        entry["refs"] += int(hold)
+        return entry["value"]
+
+    def release(self, key: Hashable) -> None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["refs"] > 0:
+                entry["refs"] -= 1
+            self._evict()
+
+    def _evict(self) -> None:
+        total = sum(entry["size"] for entry in self._entries.values())
+        for key in list(self._entries):
+            if total <= self.max_bytes:
+                break
+            entry = self._entries[key]
+            if entry["refs"] == 0:
+                total -= entry["size"]
+                del self._entries[key]
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(entry["size"] for entry in self._entries.values())
+
+    def report(self) -> pd.DataFrame:
+        """returns the size, reference count and last use of every resource"""
+        with self._lock:
+            rows = [
+                {
+                    "Resource": " / ".join(map(str, key)),
+                    "Size (KiB)": round(entry["size"] / 1024, 1),
+                    "Refs": entry["refs"],
+                    "Last used": time.strftime(
+                        "%H:%M:%S", time.localtime(entry["last_used"])
+                    ),
+                }
+                for key, entry in reversed(self._entries.items())
+            ]
+        return pd.DataFrame(
+            rows, columns=["Resource", "Size (KiB)", "Refs", "Last used"]
+        )
+
+
+# instance unique du processus : le module n'est importé qu'une fois
+resources = ResourceStore(int(max_mb * 2**20))
@@ -0,0 +1,108 @@
+"""Calcul des probabilités de survie à partir des modèles entraînés."""
+
+import hashlib
+import pickle
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from preprocessing import PassengerPreprocessor
+
+
+def score_passenger(
+    model,
+    preprocessor: PassengerPreprocessor,
+    pclass: int,
+    sex: str,
+    age: float,
+    sibsp: int,
+    parch: int,
+    fare: float,
+    embarked: str,
+    out: np.ndarray | None = None,
+) -> float:
+    """returns the survival probability of a single passenger
+
+    Fast path for the custom passenger form: the features are built straight
+    into a NumPy row (see PassengerPreprocessor.passenger_vector) and scored
+    with a single predict_proba call.
+    """
+    x = preprocessor.passenger_vector(
+        pclass, sex, age, sibsp, parch, fare, embarked, out=out
+    )
+    return float(model.predict_proba(x)[0, 1])
+
+
+# empreinte mémorisée par objet modèle : le pickle n'est haché qu'une fois
+_fingerprints = weakref.WeakKeyDictionary()
+
+
+def model_fingerprint(model) -> str:
+    """returns a short hash of the fitted model (parameters and learned state)"""
+    try:
+        return _fingerprints[model]
+    except KeyError:
+        fingerprint = hashlib.sha256(pickle.dumps(model)).hexdigest()[:16]
+        _fingerprints[model] = fingerprint
+        return fingerprint
+
+
+def predict_with_proba(model, X) -> tuple[np.ndarray, np.ndarray]:
+    """returns P(survived) and the predicted class from one predict_proba call"""
+    # modèles ajustés sur des tableaux NumPy, comme les folds de la CV
+    proba = model.predict_proba(np.asarray(X, dtype=np.float64))
+    return proba[:, 1], model.classes_[proba.argmax(axis=1)]
+
+
+def what_if_grid(
+    passenger: dict, fare_bounds: dict, n_points: int = 101
+) -> pd.DataFrame:
+    """returns the variants of passenger sweeping one feature at a time
+
+    passenger holds the score_passenger arguments (pclass, sex, age, sibsp,
+    parch, fare, embarked). Each row changes a single feature (Feature,
+    Value) over its whole range: age 0-100, every class, sex and port, the
+    fare range of the passenger's class (fare_bounds, see
+    utils.get_fare_bounds) and the family sizes of the form.
+    """
+    fare = fare_bounds[passenger["pclass"]]
+    sweeps = {
+        "age": np.linspace(0, 100, n_points),
+        "pclass": [1, 2, 3],
+        "fare": np.linspace(fare["min"], fare["max"], n_points),
+        "sex": ["female", "male"],
+        "embarked": ["C", "Q", "S"],
+        "sibsp": range(12),  # conjoint(e) + 0 à 10 frères et sœurs
+        "parch": range(13),  # 2 parents + 0 à 10 enfants
+    }
+    rows = [
+        {**passenger, feature: value, "Feature": feature, "Value": value}
+        for feature, values in sweeps.items()
+        for value in values
+    ]
+    return pd.DataFrame(rows)
+
+
+def sensitivity_curves(
+    models: dict, passenger: dict, fare_bounds: dict, n_points: int = 101
+) -> pd.DataFrame:
+    """returns the what-if curves of passenger for every model at once
+
+    models maps a name to a (model, preprocessor) pair. All the variants of
+    what_if_grid are scored with a single predict_proba call per model; the
+    result has one row per model and variant (Model, Feature, Value,
+    Probability).
+    """
+    grid = what_if_grid(passenger, fare_bounds, n_points)
+    arguments = [
+        grid[column].to_numpy()
+        for column in ("pclass", "sex", "age", "sibsp", "parch", "fare", "embarked")
+    ]
+    curves = []
+    for name, (model, preprocessor) in models.items():
+        # matrice de features remplie colonne par colonne, sans DataFrame
+        X = preprocessor.passenger_matrix(*arguments)
+        proba = model.predict_proba(X)[:, 1]
+        curves.append(grid[["Feature", "Value"]].assign(Model=name, Probability=proba))
+    return pd.concat(curves, ignore_index=True)
@@ -0,0 +1,402 @@
+"""Service HTTP local de prédiction, avec regroupement dynamique des requêtes.
+
+Les modèles du registre (dernière version, sous forme de prédicteurs NumPy
+compilés quand c'est possible) et leur preprocessing ajusté sont chargés une
+fois au démarrage. Les requêtes unitaires concurrentes sur un même
+modèle sont regroupées en micro-lots : un lot part dès qu'il atteint max_batch
+passagers ou que la fenêtre de latence (window_ms) du premier est écoulée, et
+chaque lot est scoré par un seul appel à predict_proba.
+
+Serveur HTTP/1.1 minimal sur asyncio (bibliothèque standard uniquement) :
+
+    GET  /health                    état du service
+    GET  /models                    modèles servis (version, métriques)
+    GET  /metrics                   débit, latences et taille des lots
+    POST /predict/<modèle>          un passager        -> probabilité
+    POST /predict/<modèle>/batch    liste de passagers -> probabilités
+
+Un passager est un objet JSON {"pclass", "sex", "age", "sibsp", "parch",
+"fare", "embarked"} ; age et embarked sont facultatifs (valeurs apprises),
+sex et embarked doivent faire partie des modalités vues à l'entraînement.
+
+    python main.py serve --port 8000 --window-ms 5
+    python main.py serve-bench --model SVC --requests 2000 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import traceback
+from collections import deque
+from urllib.parse import unquote
+
+import numpy as np
+
+from preprocessing import PassengerPreprocessor, categorical_cols
+from registry import list_models, load_compiled, load_model
+
+
+def _features(preprocessor: PassengerPreprocessor, passengers: list[dict]):
+    # une ligne de features par passager, écrite directement dans la matrice
+    X = np.empty((len(passengers), len(preprocessor.feature_names_)))
+    # modalités apprises, y compris celle de référence (sans colonne one-hot) :
+    # une valeur inconnue serait sinon scorée comme la référence
+    known = {
+        col: sorted([dropped, *preprocessor.categories_[col]])
+        for col, dropped in categorical_cols.items()
+    }
+    for i, passenger in enumerate(passengers):
+        missing = {"pclass", "sex", "sibsp", "parch", "fare"} - passenger.keys()
+        if missing:
+            raise ValueError(f"missing fields: {sorted(missing)}")
+        # embarked facultatif (mode appris), sex obligatoire
+        for field, col, allowed in (
+            ("sex", "Sex", known["Sex"]),
+            ("embarked", "Embarked", [*known["Embarked"], None]),
+        ):
+            if passenger.get(field) not in allowed:
+                raise ValueError(
+                    f"unknown {field} {passenger.get(field)!r} "
+                    f"(expected one of {known[col]})"
+                )
+        preprocessor.passenger_vector(
+            int(passenger["pclass"]),
+            passenger["sex"],
+            passenger.get("age"),
+            int(passenger["sibsp"]),
+            int(passenger["parch"]),
+            float(passenger["fare"]),
+            passenger.get("embarked"),
+            out=X[i : i + 1],
+        )
+    return X
+
+
+class Metrics:
+    """request, batch and latency counters of one served model"""
+
+    def __init__(self, window: int = 10_000):
+        self.started_at = time.time()
+        self.requests = 0
+        self.rows = 0
+        self.batches = 0
+        self.latencies = deque(maxlen=window)  # ms, dernières requêtes
+
+    def record_batch(self, n_rows: int) -> None:
+        self.batches += 1
+        self.rows += n_rows
+
+    def record_request(self, latency: float) -> None:
+        self.requests += 1
+        self.latencies.append(1000 * latency)
+
+    def report(self) -> dict:
+        elapsed = time.time() - self.started_at
+        report = {
+            "requests": self.requests,
+            "rows": self.rows,
+            "batches": self.batches,
+            "mean batch size": (
+                round(self.rows / self.batches, 2) if self.batches else None
+            ),
+            "rows/s": round(self.rows / elapsed, 1),
+        }
+        if self.latencies:
+            p50, p95, p99 = np.percentile(self.latencies, [50, 95, 99])
+            report["latency ms"] = {
+                "p50": round(p50, 2),
+                "p95": round(p95, 2),
+                "p99": round(p99, 2),
+            }
+        return report
+
+
+class MicroBatcher:
+    """scores concurrent single-passenger requests in micro-batches
+
+    predict(passenger) waits for at most window_ms after the first request of
+    a batch, or until max_batch requests are waiting, then the whole batch is
+    scored with one predict_proba call in a worker thread.
+    """
+
+    def __init__(
+        self,
+        model,
+        preprocessor: PassengerPreprocessor,
+        max_batch: int = 64,
+        window_ms: float = 5.0,
+    ):
+        self.model = model
+        self.preprocessor = preprocessor
+        self.max_batch = max_batch
+        self.window = window_ms / 1000
+        self.metrics = Metrics()
+        self._rows = []
+        self._futures = []
+        self._timer = None
+
+    async def predict(self, passenger: dict) -> float:
+        start = time.perf_counter()
+        # features calculées à l'arrivée : une requête invalide échoue seule
+        row = _features(self.preprocessor, [passenger])
+        future = asyncio.get_running_loop().create_future()
+        self._rows.append(row)
+        self._futures.append(future)
+        if len(self._rows) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.window, self._flush
+            )
+        proba = await future
+        self.metrics.record_request(time.perf_counter() - start)
+        return proba
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        rows, futures = self._rows, self._futures
+        self._rows, self._futures = [], []
+        if rows:
+            asyncio.get_running_loop().create_task(self._score(rows, futures))
+
+    async def _score(self, rows: list[np.ndarray], futures: list) -> None:
+        try:
+            # hors de la boucle d'événements : les requêtes suivantes
+            # continuent d'être reçues pendant le calcul
+            proba = await asyncio.to_thread(self.predict_proba, np.vstack(rows))
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future, p in zip(futures, proba):
+            if not future.done():
+                future.set_result(float(p))
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        self.metrics.record_batch(len(X))
+        return self.model.predict_proba(X)[:, 1]
+
+
+class PredictionService:
+    """HTTP front end of the micro-batchers of the registered models"""
+
+    def __init__(self, max_batch: int = 64, window_ms: float = 5.0):
+        self.batchers = {}
+        self.models = {}
+        for meta in list_models():
+            model, preprocessor, meta = load_model(meta["name"])
+            # prédicteur NumPy compilé quand la famille le permet
+            try:
+                model = load_compiled(meta["name"], meta["version"])
+            except ValueError:
+                pass
+            self.models[meta["name"]] = meta
+            self.batchers[meta["name"]] = MicroBatcher(
+                model, preprocessor, max_batch, window_ms
+            )
+
+    async def handle(self, method: str, path: str, body: bytes) -> tuple[int, dict]:
+        parts = [unquote(part) for part in path.strip("/").split("/")]
+        if method == "GET" and parts == ["health"]:
+            return 200, {"status": "ok", "models": len(self.batchers)}
+        if method == "GET" and parts == ["models"]:
+            return 200, {
+                name: {"version": meta["version"], "metrics": meta["metrics"]}
+                for name, meta in self.models.items()
+            }
+        if method == "GET" and parts == ["metrics"]:
+            return 200, {
+                name: batcher.metrics.report()
+                for name, batcher in self.batchers.items()
+            }
+        if method == "POST" and parts[0] == "predict" and len(parts) in (2, 3):
+            batcher = self.batchers.get(parts[1])
+            if batcher is None:
+                return 404, {"error": f"unknown model {parts[1]!r}"}
+            try:
+                payload = json.loads(body)
+                if len(parts) == 2:
+                    return 200, self._answer(parts[1], await batcher.predict(payload))
+                if parts[2] == "batch":
+                    return 200, await self._predict_batch(parts[1], payload)
+            except (ValueError, TypeError, KeyError, AttributeError) as e:
+                return 400, {"error": str(e)}
+            except Exception as e:
+                # erreur du service (modèle, preprocessing) : la connexion
+                # reste ouverte et le client reçoit une réponse
+                traceback.print_exc()
+                return 500, {"error": f"{type(e).__name__}: {e}"}
+        return 404, {"error": f"no route for {method} {path}"}
+
+    def _answer(self, name: str, proba: float) -> dict:
+        return {
+            "model": name,
+            "version": self.models[name]["version"],
+            "probability": proba,
+            "survived": int(proba >= 0.5),
+        }
+
+    async def _predict_batch(self, name: str, passengers) -> dict:
+        # un lot explicite est déjà un lot : scoré directement, sans fenêtre
+        if isinstance(passengers, dict):
+            passengers = passengers["passengers"]
+        batcher = self.batchers[name]
+        start = time.perf_counter()
+        X = _features(batcher.preprocessor, passengers)
+        proba = await asyncio.to_thread(batcher.predict_proba, X)
+        batcher.metrics.record_request(time.perf_counter() - start)
+        return {
+            "model": name,
+            "version": self.models[name]["version"],
+            "probabilities": proba.tolist(),
+            "survived": (proba >= 0.5).astype(int).tolist(),
+        }
+
+    async def serve_connection(self, reader, writer) -> None:
+        # HTTP/1.1 avec keep-alive : plusieurs requêtes par connexion
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                status, payload = await self.handle(method, path, body)
+                data = json.dumps(payload).encode()
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(
+                    (
+                        f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                        "Content-Type: application/json\r\n"
+                        f"Content-Length: {len(data)}\r\n"
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+                        "\r\n"
+                    ).encode("latin-1")
+                    + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    max_batch: int = 64,
+    window_ms: float = 5.0,
+) -> None:
+    service = PredictionService(max_batch, window_ms)
+    server = await asyncio.start_server(service.serve_connection, host, port)
+    print(f"serving {list(service.batchers)} on http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+async def _request(reader, writer, method: str, path: str, payload=None) -> dict:
+    body = b"" if payload is None else json.dumps(payload).encode()
+    writer.write(
+        (
+            f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+        ).encode("latin-1")
+        + body
+    )
+    await writer.drain()
+    await reader.readline()
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        key, _, value = line.decode("latin-1").partition(":")
+        headers[key.strip().lower()] = value.strip()
+    return json.loads(await reader.readexactly(int(headers["content-length"])))
+
+
+async def bench(
+    model: str,
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    n_requests: int = 2000,
+    concurrency: int = 64,
+) -> dict:
+    """sends n_requests single-passenger requests from concurrency clients
+
+    Returns the client-side throughput and the server metrics of model.
+    """
+    rng = random.Random(0)
+    passengers = [
+        {
+            "pclass": rng.choice([1, 2, 3]),
+            "sex": rng.choice(["male", "female"]),
+            "age": rng.uniform(1, 80),
+            "sibsp": rng.randint(0, 3),
+            "parch": rng.randint(0, 2),
+            "fare": rng.uniform(5, 200),
+            "embarked": rng.choice(["C", "Q", "S"]),
+        }
+        for _ in range(n_requests)
+    ]
+    path = f"/predict/{model.replace(' ', '%20')}"
+
+    async def client(queue: list) -> None:
+        reader, writer = await asyncio.open_connection(host, port)
+        while queue:
+            answer = await _request(reader, writer, "POST", path, queue.pop())
+            if "error" in answer:
+                raise RuntimeError(answer["error"])
+        writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(passengers) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection(host, port)
+    metrics = await _request(reader, writer, "GET", "/metrics")
+    writer.close()
+    return {
+        "requests": n_requests,
+        "seconds": round(elapsed, 2),
+        "requests/s": round(n_requests / elapsed, 1),
+        "server": metrics[model],
+    }
+
+
+def main(argv: list[str] | None = None, command: str = "serve") -> None:
+    parser = argparse.ArgumentParser(prog=f"main.py {command}")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    if command == "serve":
+        parser.add_argument("--max-batch", type=int, default=64)
+        parser.add_argument(
+            "--window-ms", type=float, default=5.0, help="micro-batch latency window"
+        )
+        args = parser.parse_args(argv)
+        try:
+            asyncio.run(serve(args.host, args.port, args.max_batch, args.window_ms))
+        except KeyboardInterrupt:
+            pass
+    else:
+        parser.add_argument("--model", required=True)
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--concurrency", type=int, default=64)
+        args = parser.parse_args(argv)
+        report = asyncio.run(
+            bench(args.model, args.host, args.port, args.requests, args.concurrency)
+        )
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
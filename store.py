@@ -0,0 +1,77 @@
+"""Stockage local des caches persistants de l'application (dossier data/cache)."""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+dir_path = os.path.dirname(os.path.realpath(__file__))
+cache_dir = os.path.join(dir_path, "data", "cache")
+
+
+def atomic_write(path: str, write) -> None:
+    """calls write(tmp_path) then renames tmp_path to path"""
+    # un lecteur concurrent ne voit jamais un fichier à moitié écrit, et
+    # chaque écriture (processus ou thread) a son propre fichier temporaire
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=f"{os.path.basename(path)}.", suffix=".tmp", dir=directory
+    )
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+@contextmanager
+def file_lock(path: str, stale_after: float = 60.0):
+    """holds the lock file path, exclusive across threads and processes
+
+    A lock older than stale_after seconds (holder killed) is broken.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    while True:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(path) > stale_after:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+            time.sleep(0.01)
+    try:
+        yield
+    finally:
+        os.close(fd)
+        os.remove(path)
+
+
+def make_key(*parts) -> str:
+    """returns a short stable hash of JSON-serializable parts"""
+    raw = json.dumps(parts, sort_keys=True, default=repr).encode()
+    return hashlib.sha256(raw).hexdigest()[:16]
+
+
+def read_json(path: str):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def write_json(path: str, obj) -> None:
+    def write(tmp_path):
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(obj, f, indent=2)
+
+    atomic_write(path, write)
@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import os
 import streamlit as st
 
 # from streamlit_javascript import st_javascript
@@ -50,7 +51,9 @@ if "google_credentials" not in st.secrets:
 #        time.sleep(0.1)
 #        st.rerun()
 
-languages_csv = "https://raw.githubusercontent.com/DidierFlamm/titanic-survival-predictor/refs/heads/main/data/languages.csv"
+languages_csv = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), "data", "languages.csv"
+)
 languages = pd.read_csv(languages_csv)
 
 index_FR = languages.query("lang == 'fr-FR'").index[0]
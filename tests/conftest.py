@@ -0,0 +1,101 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# modules à plat à la racine du dépôt
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_passengers(n: int = 300, seed: int = 0) -> pd.DataFrame:
+    """returns raw passengers (CSV schema) with a learnable survival signal"""
+    rng = np.random.default_rng(seed)
+    sex = rng.choice(["female", "male"], n)
+    pclass = rng.choice([1, 2, 3], n, p=[0.25, 0.25, 0.5])
+    age = rng.uniform(1, 80, n).round()
+    age[rng.random(n) < 0.2] = np.nan
+    embarked = rng.choice(["C", "Q", "S"], n, p=[0.2, 0.1, 0.7]).astype(object)
+    embarked[:2] = np.nan
+    survived = (
+        (sex == "female").astype(float) + (pclass == 1) - 0.5 + rng.normal(0, 0.4, n)
+        > 0
+    ).astype(int)
+    df = pd.DataFrame(
+        {
+            "Survived": survived,
+            "Pclass": pclass,
+            "Name": [f"Name {i}" for i in range(n)],
+            "Sex": sex,
+            "Age": age,
+            "SibSp": rng.integers(0, 4, n),
+            "Parch": rng.integers(0, 3, n),
+            "Ticket": [f"T{i}" for i in range(n)],
+            "Fare": rng.uniform(5, 300, n).round(2),
+            "Cabin": np.where(rng.random(n) < 0.2, "C85", None),
+            "Embarked": embarked,
+        },
+        index=pd.RangeIndex(1, n + 1, name="PassengerId"),
+    )
+    return df
+
+
+@pytest.fixture
+def passengers() -> pd.DataFrame:
+    return make_passengers()
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    """redirects every on-disk cache of the app to a temporary directory"""
+    import dataset
+    import evaluation
+    import jobs
+    import registry
+    import store
+    import tuning
+
+    root = str(tmp_path / "cache")
+    monkeypatch.setattr(store, "cache_dir", root)
+    monkeypatch.setattr(dataset, "cache_dir", root)
+    monkeypatch.setattr(dataset, "manifest_path", os.path.join(root, "manifest.json"))
+    monkeypatch.setattr(evaluation, "results_dir", os.path.join(root, "evaluation"))
+    monkeypatch.setattr(
+        evaluation,
+        "capabilities_path",
+        os.path.join(root, os.path.basename(evaluation.capabilities_path)),
+    )
+    monkeypatch.setattr(tuning, "checkpoint_dir", os.path.join(root, "tuning"))
+    monkeypatch.setattr(jobs, "jobs_dir", os.path.join(root, "jobs"))
+    monkeypatch.setattr(registry, "registry_dir", os.path.join(root, "models"))
+    monkeypatch.setattr(
+        registry, "index_path", os.path.join(root, "models", "index.json")
+    )
+    return root
+
+
+@pytest.fixture
+def cached_dataset(cache, passengers, tmp_path) -> str:
+    """caches passengers as the dataset of the app and returns its hash"""
+    import dataset
+
+    csv = tmp_path / "titanic.csv"
+    passengers.to_csv(csv)
+    return dataset.refresh_cache(csv.as_uri())
+
+
+@pytest.fixture
+def registered(cache, passengers):
+    """registers a LogisticRegression and returns (model, preprocessor)"""
+    from sklearn.linear_model import LogisticRegression
+
+    from preprocessing import PassengerPreprocessor, split_data
+    from registry import register
+
+    X, _, y, _ = split_data(passengers, split=False)
+    preprocessor = PassengerPreprocessor().fit(X)
+    # ajusté sur le tableau NumPy, comme les modèles optimisés
+    model = LogisticRegression().fit(preprocessor.transform(X).to_numpy(), y)
+    register("LogisticRegression", model, preprocessor, metrics={})
+    return model, preprocessor
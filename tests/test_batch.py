@@ -0,0 +1,52 @@
+import pandas as pd
+import pytest
+
+import batch
+from scoring import predict_with_proba
+
+
+@pytest.fixture
+def registered(registered, monkeypatch):
+    monkeypatch.setattr(batch, "_models", {})
+    return registered
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+def test_score_manifest_with_chunks_missing_a_port(
+    registered, passengers, tmp_path, suffix
+):
+    model, preprocessor = registered
+    # passagers sans port puis Cherbourg et Queenstown en tête : les premiers
+    # blocs n'ont aucun passager embarqué à Southampton
+    manifest = passengers.drop(columns="Survived").sort_values(
+        "Embarked", na_position="first"
+    )
+    source = tmp_path / "manifest.csv"
+    manifest.to_csv(source)
+    output = tmp_path / f"scores{suffix}"
+
+    progress = list(
+        batch.score_manifest(
+            str(source), "LogisticRegression", str(output), chunksize=40, n_jobs=1
+        )
+    )
+
+    assert progress[-1]["rows"] == len(manifest)
+    scores = (
+        pd.read_parquet(output)
+        if suffix == ".parquet"
+        else pd.read_csv(output, index_col="PassengerId")
+    )
+    expected, _ = predict_with_proba(model, preprocessor.transform(manifest))
+    assert scores.index.tolist() == manifest.index.tolist()
+    pd.testing.assert_series_equal(
+        scores["Probability"],
+        pd.Series(expected, index=manifest.index, name="Probability"),
+        atol=1e-6,
+    )
+    assert not (tmp_path / f"scores.part{suffix}").exists()
+
+
+def test_unknown_model_is_a_usage_error(cache, tmp_path):
+    with pytest.raises(SystemExit):
+        batch.main(["m.csv", "--model", "Nope", "--output", str(tmp_path / "o.csv")])
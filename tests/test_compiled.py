@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from compiled import CompiledModel, check_parity, compile_model
+from conftest import make_passengers
+from preprocessing import PassengerPreprocessor, split_data
+from tuning import param_grids, tuned_models
+
+
+def features(passengers):
+    X, _, y, _ = split_data(passengers, split=False)
+    preprocessor = PassengerPreprocessor().fit(X)
+    return preprocessor.transform(X).to_numpy(), y
+
+
+def tied_passengers():
+    # comme le vrai jeu de données : âges par décennie, tarif fixe par classe,
+    # donc beaucoup de lignes en double et de distances égales
+    passengers = make_passengers(400)
+    passengers["Age"] = passengers["Age"] // 10 * 10
+    passengers["Fare"] = passengers["Pclass"].map({1: 80.0, 2: 20.0, 3: 8.0})
+    return passengers
+
+
+@pytest.fixture(scope="module", params=["continuous", "tied"])
+def data(request):
+    if request.param == "tied":
+        return features(tied_passengers())
+    return features(make_passengers(400))
+
+
+def configurations():
+    # chaque famille optimisée, avec les réglages de sa grille qui changent
+    # le calcul compilé (noyau, pondération, profondeur...)
+    overrides = {
+        "Logistic Regression": [{"C": 0.1}],
+        "SVC": [{"kernel": "linear"}, {"kernel": "rbf", "gamma": "auto"}],
+        "Random Forest": [{"n_estimators": 20, "max_depth": None},
+                          {"n_estimators": 20, "max_depth": 5}],
+        "Gradient Boosting": [{"n_estimators": 30, "max_depth": 3}],
+    }  # fmt: skip
+    assert set(overrides) == set(param_grids) - {"K-Neighbors"}
+    for name, params in overrides.items():
+        for p in params:
+            yield pytest.param(name, p, id=f"{name}-{p}")
+
+
+@pytest.mark.parametrize("name, params", configurations())
+def test_compiled_probabilities_match_scikit_learn(data, name, params):
+    X, y = data
+    model = tuned_models()[name].set_params(**params)
+    if "random_state" in model.get_params():
+        model.set_params(random_state=0)
+    model.fit(X, y)
+
+    parity = check_parity(model, X, n_timings=3)
+
+    assert parity["Max abs diff"] < 1e-9
+    assert parity["Same predictions"]
+    compiled = compile_model(model)
+    np.testing.assert_array_equal(compiled.classes_, model.classes_)
+    # ligne unique comme matrice : le passager personnalisé
+    np.testing.assert_allclose(
+        compiled.predict_proba(X[:1]), model.predict_proba(X[:1])
+    )
+
+
+def test_unsupported_models_and_incomplete_predictors_are_refused(data):
+    from sklearn.tree import DecisionTreeClassifier
+
+    X, y = data
+    with pytest.raises(ValueError, match="DecisionTreeClassifier"):
+        compile_model(DecisionTreeClassifier().fit(X, y))
+
+    class NoProba(CompiledModel):
+        pass
+
+    with pytest.raises(TypeError):
+        NoProba([0, 1])
+
+
+@pytest.mark.parametrize("weights", ["uniform", "distance"])
+def test_neighbors_are_not_compiled(weights):
+    # le choix entre voisins à égale distance dépend de l'arbre de recherche
+    X, y = features(tied_passengers())
+    model = tuned_models()["K-Neighbors"].set_params(weights=weights).fit(X, y)
+
+    with pytest.raises(ValueError, match="KNeighborsClassifier"):
+        compile_model(model)
@@ -0,0 +1,79 @@
+import pandas as pd
+
+import dataset
+from dataset import iter_passenger_chunks, memory_report, to_compact
+
+
+def test_chunks_have_the_same_dtypes_whatever_their_values(passengers, tmp_path):
+    # premier bloc sans aucun passager embarqué à Southampton
+    ordered = pd.concat(
+        [passengers[passengers.Embarked != "S"], passengers[passengers.Embarked == "S"]]
+    )
+    for path in (tmp_path / "m.csv", tmp_path / "m.parquet"):
+        if path.suffix == ".csv":
+            ordered.to_csv(path)
+        else:
+            ordered.to_parquet(path)
+        chunks = list(iter_passenger_chunks(str(path), chunksize=50))
+
+        assert "S" not in set(chunks[0]["Embarked"].dropna())
+        assert {str(chunk.dtypes.to_dict()) for chunk in chunks} == {
+            str(chunks[0].dtypes.to_dict())
+        }
+        assert list(chunks[0]["Embarked"].cat.categories) == ["C", "Q", "S"]
+        assert sum(len(chunk) for chunk in chunks) == len(passengers)
+        assert pd.concat(chunks).index.tolist() == ordered.index.tolist()
+
+
+def test_manifests_without_passenger_id_are_numbered_in_order(passengers, tmp_path):
+    anonymous = passengers.reset_index(drop=True)
+    anonymous.to_csv(tmp_path / "m.csv", index=False)
+    anonymous.to_parquet(tmp_path / "m.parquet", index=False)
+
+    csv, parquet = (
+        pd.concat(iter_passenger_chunks(str(tmp_path / name), chunksize=70))
+        for name in ("m.csv", "m.parquet")
+    )
+
+    assert csv.index.tolist() == list(range(1, len(passengers) + 1))
+    pd.testing.assert_frame_equal(csv, parquet, check_index_type=False)
+
+
+def test_cache_is_keyed_by_content_and_read_without_network(
+    cached_dataset, passengers, tmp_path, monkeypatch
+):
+    csv = tmp_path / "titanic.csv"
+    assert cached_dataset == dataset.content_hash(csv.read_bytes())
+    assert dataset.dataset_hash() == cached_dataset
+
+    # plus aucun téléchargement une fois le Parquet en cache
+    monkeypatch.setattr(dataset, "urlopen", None)
+    pd.testing.assert_frame_equal(
+        dataset.read_passengers(), passengers, check_dtype=False
+    )
+
+
+def test_refresh_with_new_content_switches_version(
+    cached_dataset, passengers, tmp_path
+):
+    first = cached_dataset
+    csv = tmp_path / "titanic.csv"
+    passengers.iloc[:10].to_csv(csv)
+    second = dataset.refresh_cache(csv.as_uri())
+
+    assert second != first
+    assert dataset.dataset_hash() == second
+    assert len(dataset.read_passengers()) == 10
+    # l'ancienne version reste lisible par son empreinte
+    assert len(dataset.read_passengers(first)) == len(passengers)
+
+
+def test_compact_schema_keeps_values_and_saves_memory(passengers):
+    compact = to_compact(passengers)
+
+    assert compact["Sex"].dtype == pd.CategoricalDtype(["female", "male"])
+    assert compact["Pclass"].dtype == "int8"
+    assert compact["Fare"].dtype == "float32"
+    assert compact["Sex"].astype(str).tolist() == passengers["Sex"].tolist()
+    report = memory_report({"raw": passengers, "compact": compact})
+    assert report.loc["compact", "Memory (KiB)"] < report.loc["raw", "Memory (KiB)"]
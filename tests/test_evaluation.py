@@ -0,0 +1,294 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from sklearn.dummy import DummyClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import cross_val_score
+from sklearn.naive_bayes import GaussianNB
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.utils import all_estimators
+
+import evaluation
+from evaluation import (
+    Leaderboard,
+    capability_index,
+    evaluate_zoo,
+    evaluate_zoo_cached,
+    race_zoo,
+    racing_plan,
+    reset_failures,
+    runnable,
+)
+from folds import FoldStore
+from preprocessing import PassengerPreprocessor, split_data
+
+
+class Failing(DummyClassifier):
+    def fit(self, X, y):
+        raise ValueError("always fails")
+
+
+class FailingTogether(DummyClassifier):
+    def fit(self, X, y):
+        # barrière : attend qu'au moins deux folds soient en cours, puis
+        # échoue sur le même top d'horloge qu'eux
+        barrier = os.environ["BARRIER_DIR"]
+        open(os.path.join(barrier, str(os.getpid())), "w").close()
+        deadline = time.time() + 20
+        while len(os.listdir(barrier)) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.5 - time.time() % 0.5)
+        raise ValueError("always fails")
+
+
+class CountingFits(LogisticRegression):
+    def fit(self, X, y):
+        # un fichier par ajustement, dans le dossier partagé avec le test
+        open(os.path.join(os.environ["FITS_DIR"], f"{time.time_ns()}"), "w").close()
+        return super().fit(X, y)
+
+
+class Sleepy(DummyClassifier):
+    def fit(self, X, y):
+        time.sleep(30)
+
+
+@pytest.fixture
+def folds(passengers):
+    X, _, y, _ = split_data(passengers, split=False)
+    return FoldStore(PassengerPreprocessor().fit_transform(X), y, 5, 0)
+
+
+def test_zoo_reports_scores_errors_and_timeouts(folds):
+    estimators = [
+        ("LogisticRegression", LogisticRegression),
+        ("Failing", Failing),
+        ("Sleepy", Sleepy),
+    ]
+
+    results = {
+        result["Model"]: result
+        for result in evaluate_zoo(estimators, folds, n_jobs=2, time_limit=3)
+    }
+
+    assert results["LogisticRegression"]["Balanced Accuracy (%)"] > 60
+    assert isinstance(results["Failing"]["Error"], ValueError)
+    assert "Timeout" in results["Sleepy"]
+
+
+def test_scores_do_not_depend_on_how_folds_are_spread(folds):
+    estimators = [
+        ("LogisticRegression", LogisticRegression),
+        ("GaussianNB", GaussianNB),
+        ("KNeighborsClassifier", KNeighborsClassifier),
+    ]
+    timings = ["Time (ms)", "Fit (ms)", "Score (ms)"]
+
+    runs = []
+    for n_jobs in (1, 3):
+        results = list(evaluate_zoo(estimators, folds, n_jobs=n_jobs))
+        # une ligne par estimateur, dès qu'il est terminé
+        assert sorted(result["Model"] for result in results) == sorted(
+            name for name, _ in estimators
+        )
+        runs.append(
+            {
+                result["Model"]: {k: v for k, v in result.items() if k not in timings}
+                for result in results
+            }
+        )
+    # moyennes des folds dans leur ordre d'arrivée : égales à l'arrondi près
+    for name, _ in estimators:
+        assert runs[0][name] == pytest.approx(runs[1][name])
+
+
+def test_each_fold_is_fitted_once_for_all_metrics(folds, tmp_path, monkeypatch):
+    monkeypatch.setenv("FITS_DIR", str(tmp_path))
+
+    [result] = evaluate_zoo([("CountingFits", CountingFits)], folds, n_jobs=1)
+
+    assert len(os.listdir(tmp_path)) == folds.n_splits
+    # mêmes scores que trois cross_val_score sur les mêmes folds
+    for column, scoring in [
+        ("Balanced Accuracy (%)", "balanced_accuracy"),
+        ("ROC AUC", "roc_auc"),
+        ("f1-score", "f1"),
+    ]:
+        scores = cross_val_score(
+            LogisticRegression(), folds.X, folds.y, cv=folds, scoring=scoring
+        )
+        expected = scores.mean()
+        if column == "Balanced Accuracy (%)":
+            expected = round(100 * expected, 2)
+        assert result[column] == pytest.approx(expected)
+    assert result["Time (ms)"] == result["Fit (ms)"] + result["Score (ms)"]
+
+
+def test_racing_plan_narrows_down_to_a_full_cv():
+    plan = racing_plan(9, n_splits=5, eta=3)
+
+    assert [step["Candidates"] for step in plan] == [9, 3, 1]
+    assert [step["Folds"] for step in plan] == [2, 4, 5]
+    assert plan[-1]["Data (%)"] == 100.0
+    # coût : 9×1/9×2 + 3×1/3×4 + 1×1×5 fits complets, au lieu de 9×5
+    assert [step["Cost (%)"] for step in plan] == [4.4, 8.9, 11.1]
+
+
+def test_race_promotes_the_best_models_to_the_full_cv(cache, folds):
+    estimators = [
+        ("LogisticRegression", LogisticRegression),
+        ("GaussianNB", GaussianNB),
+        ("KNeighborsClassifier", KNeighborsClassifier),
+        ("DummyClassifier", DummyClassifier),
+        ("Failing", Failing),
+    ]
+
+    results = list(race_zoo(estimators, folds, eta=2, n_jobs=1))
+
+    rungs = {}
+    for result in results:
+        rungs.setdefault(result["Rung"], []).append(result)
+    assert [len(rungs[rung]) for rung in (1, 2, 3)] == [5, 3, 2]
+    assert {result["Folds"] for result in rungs[1]} == {2}
+
+    def best(rung, n):
+        # un modèle en échec n'est jamais promu
+        scored = [r for r in rungs[rung] if "Error" not in r]
+        scored.sort(key=lambda r: r["Balanced Accuracy (%)"], reverse=True)
+        return {r["Model"] for r in scored[:n]}
+
+    assert {r["Model"] for r in rungs[2]} == best(1, 3)
+    assert {r["Model"] for r in rungs[3]} == best(2, 2)
+
+    # dernier tour : la CV complète, partagée avec l'évaluation complète
+    final = {r["Model"]: r for r in rungs[3]}
+    for result in evaluate_zoo_cached(
+        [(n, c) for n, c in estimators if n in final], folds, n_jobs=0
+    ):
+        assert {**result, "Rung": 3, "Data (%)": 100.0, "Folds": 5} == final[
+            result["Model"]
+        ]
+
+
+def test_stopping_an_estimator_spares_workers_ready_in_the_same_wait(
+    folds, tmp_path, monkeypatch
+):
+    # folds échoués en même temps sur plusieurs workers : l'arrêt de
+    # l'estimateur remplace des workers dont la réponse est déjà prête
+    monkeypatch.setenv("BARRIER_DIR", str(tmp_path))
+    estimators = [
+        ("FailingTogether", FailingTogether),
+        ("LogisticRegression", LogisticRegression),
+    ]
+
+    results = list(evaluate_zoo(estimators, folds, n_jobs=4))
+
+    assert [result["Model"] for result in results] == [
+        "FailingTogether",
+        "LogisticRegression",
+    ]
+    assert "Balanced Accuracy (%)" in results[1]
+
+
+def test_cache_keeps_model_errors_but_not_host_failures(cache, folds):
+    # RSS d'un processus Python bien au-delà de 1 Mio : budget mémoire dépassé
+    [result] = evaluate_zoo_cached([("Sleepy", Sleepy)], folds, memory_limit=1)
+    assert isinstance(result["Error"], MemoryError)
+    assert not os.path.exists(evaluation.results_dir)
+    assert runnable([("Sleepy", Sleepy)])[0] == [("Sleepy", Sleepy)]
+
+    estimators = [("Failing", Failing), ("LogisticRegression", LogisticRegression)]
+
+    results = {
+        result["Model"]: result for result in evaluate_zoo_cached(estimators, folds)
+    }
+    assert isinstance(results["Failing"]["Error"], ValueError)
+    assert len(os.listdir(evaluation.results_dir)) == 2
+
+    # second passage : tout vient du cache, aucun processus démarré
+    cached = {
+        result["Model"]: result
+        for result in evaluate_zoo_cached(estimators, folds, n_jobs=0)
+    }
+    assert cached["Failing"]["Error"] == "ValueError: always fails"
+    assert cached["LogisticRegression"] == results["LogisticRegression"]
+
+
+class NeedsEstimator(DummyClassifier):
+    def __init__(self, estimator):
+        self.estimator = estimator
+
+
+class BrokenConstructor(DummyClassifier):
+    def __init__(self):
+        raise RuntimeError("broken")
+
+
+def test_runnable_skips_doomed_estimators_up_front(cache):
+    kept, skipped = runnable(
+        [
+            ("NeedsEstimator", NeedsEstimator),
+            ("BrokenConstructor", BrokenConstructor),
+            ("LogisticRegression", LogisticRegression),
+        ]
+    )
+
+    assert kept == [("LogisticRegression", LogisticRegression)]
+    assert skipped == [
+        {"Model": "NeedsEstimator", "Reason": "Arguments requis : estimator"},
+        {"Model": "BrokenConstructor", "Reason": "RuntimeError: broken"},
+    ]
+
+
+def test_fit_failures_are_tied_to_the_data_they_happened_on(cache, folds, passengers):
+    list(evaluate_zoo_cached([("Failing", Failing)], folds))
+
+    # toujours évaluable, sur d'autres données comme sur celles-ci (où
+    # l'erreur vient alors du cache, sans ajustement)
+    assert runnable([("Failing", Failing)])[0] == [("Failing", Failing)]
+    [cached] = evaluate_zoo_cached([("Failing", Failing)], folds, n_jobs=0)
+    assert cached["Error"] == "ValueError: always fails"
+
+    X, _, y, _ = split_data(passengers.iloc[:200], split=False)
+    other = FoldStore(PassengerPreprocessor().fit_transform(X), y, 5, 0)
+    [result] = evaluate_zoo_cached([("Failing", Failing)], other)
+    assert isinstance(result["Error"], ValueError)
+
+    reset_failures()
+    assert not os.listdir(evaluation.results_dir)
+
+
+def test_capability_index_keeps_every_concurrent_update(cache):
+    estimators = all_estimators(type_filter="classifier")
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda item: capability_index([item]), estimators))
+
+    assert set(capability_index([])) == {name for name, _ in estimators}
+
+
+def test_leaderboard_stays_sorted_as_rows_stream_in():
+    rng = np.random.default_rng(0)
+    board = Leaderboard(["Rung", "Balanced Accuracy (%)"])
+    latest = {}
+    for _ in range(300):
+        row = {
+            "Model": f"M{rng.integers(40)}",
+            "Rung": int(rng.integers(1, 4)),
+            "Balanced Accuracy (%)": float(rng.integers(50, 90)),
+        }
+        rank = board.add(row)
+        latest[row["Model"]] = row
+        assert board.rows()[rank] is row
+
+    # un modèle promu remplace sa ligne précédente
+    assert len(board) == len(latest)
+    expected = sorted(
+        latest.values(),
+        key=lambda r: (-r["Rung"], -r["Balanced Accuracy (%)"], r["Model"]),
+    )
+    assert board.rows() == expected
+    assert board.to_csv().decode().splitlines()[0] == "Model,Rung,Balanced Accuracy (%)"
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import StratifiedKFold, cross_val_score
+
+from folds import FoldStore
+from preprocessing import PassengerPreprocessor, split_data
+
+
+@pytest.fixture
+def training(passengers):
+    X, _, y, _ = split_data(passengers, split=False)
+    return PassengerPreprocessor().fit_transform(X), y
+
+
+def test_blocks_are_the_stratified_folds_materialized(training):
+    X, y = training
+    store = FoldStore(X, y, 5, seed=0)
+
+    skf = StratifiedKFold(n_splits=5, shuffle=True, random_state=0)
+    for (train, test), block in zip(skf.split(X, y), store.blocks):
+        np.testing.assert_array_equal(block[0], X.to_numpy()[train])
+        np.testing.assert_array_equal(block[1], y.to_numpy()[train])
+        np.testing.assert_array_equal(block[2], X.to_numpy()[test])
+        np.testing.assert_array_equal(block[3], y.to_numpy()[test])
+        assert all(array.flags.c_contiguous for array in block)
+    with pytest.raises(ValueError):
+        store.blocks[0][0][0, 0] = 1.0
+
+    # utilisable comme cv de Scikit-learn, avec les mêmes scores
+    np.testing.assert_array_equal(
+        cross_val_score(LogisticRegression(), X, y, cv=store),
+        cross_val_score(LogisticRegression(), X, y, cv=skf),
+    )
+
+
+def test_key_follows_the_data_and_the_split(training):
+    X, y = training
+    key = FoldStore(X, y, 5, seed=0).key
+
+    assert FoldStore(X.copy(), y.copy(), 5, seed=0).key == key
+    assert FoldStore(X, y, 5, seed=1).key != key
+    assert FoldStore(X, y, 3, seed=0).key != key
+    assert FoldStore(X.iloc[:-1], y.iloc[:-1], 5, seed=0).key != key
+
+
+def test_subsample_keeps_the_class_balance(training):
+    X, y = training
+    store = FoldStore(X, y, 5, seed=0)
+
+    small = store.subsample(1 / 3, 2)
+    assert small.n_splits == 2
+    assert len(small.y) == round(len(y) / 3)
+    assert small.y.mean() == pytest.approx(y.mean(), abs=0.01)
+    assert store.subsample(1 / 3, 2).key == small.key
@@ -0,0 +1,55 @@
+import jobs
+from jobs import evaluation_job, read_job, submit
+from store import write_json
+
+
+def params(digest, **overrides):
+    return {
+        "dataset": digest,
+        "seed": 0,
+        "models": ["DummyClassifier", "LogisticRegression"],
+        "racing": False,
+        "eta": None,
+        "time_limit": 60,
+        "memory_limit": None,
+        "total_budget": None,
+        **overrides,
+    }
+
+
+def test_evaluation_job_ranks_models_and_reports_the_best(cached_dataset):
+    reports = []
+
+    state = evaluation_job(params(cached_dataset), lambda state: reports.append(state))
+
+    assert state["done"] == state["total"] == 2 == len(reports)
+    assert [row["Model"] for row in state["results"]] == [
+        "LogisticRegression",
+        "DummyClassifier",
+    ]
+    assert state["best_model"] == "LogisticRegression"
+    assert sum(map(sum, state["holdout"]["confusion_matrix"])) == 60
+
+
+def test_evaluation_job_without_any_scored_model_has_no_best(cached_dataset):
+    # budget global déjà épuisé : tous les modèles sont interrompus
+    state = evaluation_job(params(cached_dataset, total_budget=0), lambda state: None)
+
+    assert state["results"] == []
+    assert len(state["timeouts"]) == state["host_failures"] == 2
+    assert state["best_model"] is None
+    assert state["holdout"] is None
+
+
+def test_retry_queues_a_finished_job_again(cache, monkeypatch):
+    # pas de répartiteur : les jobs restent dans l'état écrit par le test
+    monkeypatch.setattr(jobs, "_ensure_dispatcher", lambda: None)
+    job_id = submit("evaluation", {"seed": 0})
+    for status in ("done", "failed"):
+        write_json(jobs._path(job_id), {**read_job(job_id), "status": status})
+
+        assert submit("evaluation", {"seed": 0}) == job_id
+        assert read_job(job_id)["status"] == status
+
+        assert submit("evaluation", {"seed": 0}, retry=True) == job_id
+        assert read_job(job_id)["status"] == "queued"
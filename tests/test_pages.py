@@ -0,0 +1,110 @@
+import os
+
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+from sklearn.linear_model import LogisticRegression
+
+import evaluation as evaluation_module
+import jobs
+from preprocessing import PassengerPreprocessor, split_data
+from registry import register
+from scoring import score_passenger
+from store import write_json
+
+
+@pytest.fixture
+def predictions(cached_dataset, passengers, monkeypatch):
+    """returns the Predictions page (one registered model) with its model"""
+    X, _, y, _ = split_data(passengers, split=False)
+    preprocessor = PassengerPreprocessor().fit(X)
+    model = LogisticRegression().fit(preprocessor.transform(X).to_numpy(), y)
+    register("LogisticRegression", model, preprocessor,
+             metrics={"Balanced Accuracy": 80.0}, seed=0)  # fmt: skip
+    # lien vers la page suivante : résolu depuis le script principal, absent ici
+    monkeypatch.setattr(st, "Page", lambda *args, **kwargs: None)
+    monkeypatch.setattr(st, "page_link", lambda *args, **kwargs: None)
+    app = AppTest.from_file("../pages/5_Predictions.py", default_timeout=30)
+    app.session_state["lang"] = "fr"
+    return app, model, preprocessor
+
+
+def shown_chance(app) -> int:
+    return int(app.metric[0].value.split()[1])
+
+
+def test_custom_passenger_prediction_follows_the_form(predictions):
+    app, model, preprocessor = predictions
+    app.run()
+    assert not app.exception
+    table = app.dataframe[0].value
+
+    app.slider(key="age").set_value(5).run()
+    app.radio(key="sexe").set_value("male").run()
+    app.radio(key="pclass").set_value(3).run()
+
+    fare = app.slider(key="fare").value
+    expected = score_passenger(
+        model, preprocessor, pclass=3, sex="male", age=5, sibsp=0, parch=0,
+        fare=fare, embarked="C",
+    )  # fmt: skip
+    assert shown_chance(app) == round(100 * expected)
+    # le tableau du manifeste ne dépend pas du formulaire
+    assert app.dataframe[0].value.equals(table)
+
+
+@pytest.fixture
+def evaluation(cached_dataset, monkeypatch):
+    """returns the Evaluation page, its jobs left as the test writes them"""
+    monkeypatch.setattr(jobs, "_ensure_dispatcher", lambda: None)
+    monkeypatch.setattr(st, "Page", lambda *args, **kwargs: None)
+    monkeypatch.setattr(st, "page_link", lambda *args, **kwargs: None)
+    app = AppTest.from_file("../pages/3_Evaluation.py", default_timeout=60)
+    app.session_state["lang"] = "fr"
+    app.session_state["seed"] = 0
+    return app
+
+
+def finish(job_id, **state):
+    # job terminé avec l'état donné, sans aucun modèle évalué par défaut
+    state = {"total": 2, "done": 2, "current": None, "best_model": None,
+             "results": [], "errors": [], "timeouts": [], "holdout": None,
+             "host_failures": 0, **state}  # fmt: skip
+    job = {**jobs.read_job(job_id), "status": "done", "state": state}
+    write_json(jobs._path(job_id), {**job, "started_at": 0, "finished_at": 1})
+
+
+def submitted_job(app) -> str:
+    app.run()
+    [name] = os.listdir(jobs.jobs_dir)
+    return name.removesuffix(".json")
+
+
+def test_retrying_failed_models_runs_the_evaluation_again(evaluation, monkeypatch):
+    job_id = submitted_job(evaluation)
+    finish(job_id, errors=[{"Model": "SVC", "Error": "ValueError: boom"}])
+    resets = []
+    monkeypatch.setattr(evaluation_module, "reset_failures", lambda: resets.append(1))
+
+    evaluation.run()
+    assert not evaluation.exception
+    [retry] = [b for b in evaluation.button if b.label.startswith("Réessayer")]
+    retry.click().run()
+
+    assert resets == [1]
+    assert jobs.read_job(job_id)["status"] == "queued"
+
+
+def test_models_stopped_by_the_host_can_be_run_again(evaluation):
+    job_id = submitted_job(evaluation)
+    finish(job_id)
+    evaluation.run()
+    assert not [b for b in evaluation.button if b.label.startswith("Relancer")]
+
+    timeout = {"Model": "SVC", "Timeout": "60 s"}
+    finish(job_id, timeouts=[timeout], host_failures=1)
+    evaluation.run()
+    [again] = [b for b in evaluation.button if b.label.startswith("Relancer")]
+    again.click().run()
+
+    assert jobs.read_job(job_id)["status"] == "queued"
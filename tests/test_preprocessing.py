@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataset import to_compact
+from preprocessing import PassengerPreprocessor, iter_feature_blocks, split_data
+
+
+@pytest.fixture
+def fitted(passengers):
+    X_train, _, _, _ = split_data(passengers, split=False)
+    return PassengerPreprocessor().fit(X_train)
+
+
+def test_chunked_fit_matches_in_memory_fit(passengers, tmp_path, fitted):
+    csv = tmp_path / "manifest.csv"
+    passengers.to_csv(csv)
+    full = fitted.transform(passengers)
+
+    chunked = PassengerPreprocessor().fit_chunks(
+        to_compact(passengers.iloc[i : i + 50]) for i in range(0, len(passengers), 50)
+    )
+
+    assert chunked.feature_names_ == fitted.feature_names_
+    assert chunked.embarked_mode_ == fitted.embarked_mode_
+    # float32 du schéma compact
+    np.testing.assert_allclose(chunked.scaler_.mean_, fitted.scaler_.mean_, atol=1e-5)
+    np.testing.assert_allclose(chunked.scaler_.scale_, fitted.scaler_.scale_, atol=1e-5)
+    blocks = [X for X, _ in iter_feature_blocks(str(csv), 64, fitted)]
+    np.testing.assert_allclose(
+        pd.concat(blocks).to_numpy(dtype=float), full.to_numpy(dtype=float), atol=1e-5
+    )
+
+
+def test_transform_fills_embarked_when_chunk_lacks_the_mode(
+    passengers, tmp_path, fitted
+):
+    assert fitted.embarked_mode_ == "S"
+    # passagers sans port en tête, puis les autres ports : le premier bloc
+    # n'a aucun passager embarqué à Southampton
+    ordered = passengers.sort_values(
+        "Embarked", key=lambda s: s.map({"C": 1, "Q": 2, "S": 3}), na_position="first"
+    )
+    csv = tmp_path / "sorted.csv"
+    ordered.to_csv(csv)
+
+    X, _ = next(iter_feature_blocks(str(csv), 100, fitted))
+
+    assert len(X) == 100
+    missing = ordered.index[:100][ordered["Embarked"].iloc[:100].isna()]
+    # port manquant imputé par le mode appris
+    assert X.loc[missing, "Embarked_S"].all()
+    assert not X.loc[missing, "Embarked_Q"].any()
+
+    # même chose avec une catégorie « nue », sans S dans ses modalités
+    chunk = ordered.iloc[:100].astype({"Embarked": "category"})
+    np.testing.assert_allclose(
+        fitted.transform(chunk).to_numpy(dtype=float),
+        X.to_numpy(dtype=float),
+        atol=1e-5,
+    )
+
+
+def test_passenger_vector_matches_transform(passengers, fitted):
+    passenger = passengers.iloc[[5]].assign(Embarked="Q", Sex="male")
+    row = passenger.iloc[0]
+
+    vector = fitted.passenger_vector(
+        row.Pclass, row.Sex, row.Age, row.SibSp, row.Parch, row.Fare, row.Embarked
+    )
+
+    np.testing.assert_allclose(
+        vector, fitted.transform(passenger).to_numpy(dtype=float)
+    )
+
+
+def test_passenger_matrix_is_a_vectorized_passenger_vector(passengers, fitted):
+    rows = passengers.iloc[:50]
+    arguments = [
+        rows[c].to_numpy()
+        for c in ("Pclass", "Sex", "Age", "SibSp", "Parch", "Fare", "Embarked")
+    ]
+
+    X = fitted.passenger_matrix(*arguments)
+
+    expected = np.vstack([fitted.passenger_vector(*row) for row in zip(*arguments)])
+    np.testing.assert_array_equal(X, expected)
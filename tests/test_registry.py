@@ -0,0 +1,73 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+
+from preprocessing import split_data
+from registry import list_models, load_model, load_preprocessor, register
+
+
+def test_registered_model_is_loaded_back_with_its_preprocessing(registered, passengers):
+    model, preprocessor = registered
+    X, _, _, _ = split_data(passengers, split=False)
+
+    loaded, loaded_preprocessor, meta = load_model("LogisticRegression")
+
+    assert meta["version"] == 1
+    assert meta["features"] == list(preprocessor.feature_names_)
+    np.testing.assert_array_equal(
+        loaded.predict_proba(loaded_preprocessor.transform(X).to_numpy()),
+        model.predict_proba(preprocessor.transform(X).to_numpy()),
+    )
+    assert (
+        load_preprocessor("LogisticRegression")
+        .transform(X)
+        .equals(preprocessor.transform(X))
+    )
+    assert [meta["name"] for meta in list_models()] == ["LogisticRegression"]
+
+
+def test_a_new_version_only_for_a_new_configuration(registered):
+    model, preprocessor = registered
+
+    # même configuration (par exemple relue d'un point de reprise)
+    assert register("LogisticRegression", model, preprocessor, metrics={}) == 1
+
+    model.set_params(C=0.5)
+    assert register("LogisticRegression", model, preprocessor, metrics={}) == 2
+    assert load_model("LogisticRegression")[0].C == 0.5
+    assert load_model("LogisticRegression", 1)[0].C == 1.0
+    [latest] = list_models()
+    assert latest["version"] == 2
+
+
+def test_loading_checks_the_model(registered):
+    model, preprocessor = registered
+    with pytest.raises(KeyError):
+        load_model("SVC")
+
+    # ajusté sur 3 features quand le preprocessing en produit davantage
+    other = LogisticRegression().fit(np.eye(4)[:, :3], [0, 1, 0, 1])
+    register("Other", other, preprocessor, metrics={})
+    with pytest.raises(ValueError, match="Nombre de features"):
+        load_model("Other")
+
+
+def test_concurrent_registrations_each_get_their_own_version(registered):
+    _, preprocessor = registered
+    X = np.random.default_rng(0).normal(size=(20, len(preprocessor.feature_names_)))
+
+    def register_with(C):
+        # configurations différentes : une nouvelle version chacune
+        variant = LogisticRegression(C=C).fit(X, [0, 1] * 10)
+        return C, register("Concurrent", variant, preprocessor, metrics={"C": C})
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        versions = dict(executor.map(register_with, np.arange(1, 17) / 10))
+
+    assert sorted(versions.values()) == list(range(1, 17))
+    for C, version in versions.items():
+        assert load_model("Concurrent", version)[2]["metrics"] == {"C": C}
+    [latest] = [meta for meta in list_models() if meta["name"] == "Concurrent"]
+    assert latest["version"] == 16
@@ -0,0 +1,60 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from resources import ResourceStore
+
+
+def block(n: int = 100) -> np.ndarray:
+    return np.zeros(n, dtype=np.uint8)
+
+
+def test_concurrent_sessions_load_a_resource_once():
+    store = ResourceStore(max_bytes=10_000)
+    calls = []
+    lock = threading.Lock()
+
+    def loader():
+        with lock:
+            calls.append(1)
+        time.sleep(0.2)
+        return block()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        values = list(executor.map(lambda _: store.get("model", loader), range(8)))
+
+    assert len(calls) == 1
+    assert all(value is values[0] for value in values)
+
+
+def test_least_recently_used_unheld_resources_are_evicted_first():
+    store = ResourceStore(max_bytes=300)
+    store.get("a", block)
+    store.get("b", block)
+    store.get("c", block)
+    store.get("a", block)  # "b" devient le moins récemment utilisé
+
+    store.get("d", block)
+
+    assert set(store._entries) == {"a", "c", "d"}
+    assert store.total_bytes() == 300
+
+
+def test_held_resources_stay_until_released():
+    store = ResourceStore(max_bytes=100)
+    held = store.get(("model", "A", 1), block, hold=True)
+
+    store.get(("model", "B", 1), block)
+    # au-delà du plafond, seule la ressource non référencée est évincée
+    assert list(store._entries) == [("model", "A", 1)]
+    assert store.get(("model", "A", 1), block) is held
+
+    store.release(("model", "A", 1))
+    store.get(("model", "B", 1), block)
+    assert list(store._entries) == [("model", "B", 1)]
+
+    [row] = store.report().to_dict("records")
+    assert row["Resource"] == "model / B / 1"
+    assert (row["Size (KiB)"], row["Refs"]) == (0.1, 0)
@@ -0,0 +1,90 @@
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from compiled import compile_model
+from scoring import (
+    predict_with_proba,
+    score_passenger,
+    sensitivity_curves,
+    what_if_grid,
+)
+
+passenger = {"pclass": 3, "sex": "male", "age": 22.0, "sibsp": 1, "parch": 0,
+             "fare": 7.25, "embarked": "S"}  # fmt: skip
+
+
+def test_fast_path_matches_dataframe_scoring(registered, passengers):
+    model, preprocessor = registered
+    row = passengers.iloc[[10]]
+    r = row.iloc[0]
+
+    proba = score_passenger(
+        model, preprocessor, r.Pclass, r.Sex, r.Age, r.SibSp, r.Parch, r.Fare,
+        r.Embarked,
+    )  # fmt: skip
+
+    expected, _ = predict_with_proba(model, preprocessor.transform(row))
+    assert proba == pytest.approx(expected[0])
+
+
+def test_concurrent_scoring_leaves_warning_filters_alone(registered):
+    model, preprocessor = registered
+    filters = list(warnings.filters)
+
+    with warnings.catch_warnings(record=True) as caught:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            probas = list(
+                executor.map(
+                    lambda age: score_passenger(
+                        model, preprocessor, **{**passenger, "age": age}
+                    ),
+                    np.linspace(0, 80, 400),
+                )
+            )
+        assert warnings.filters == filters
+
+    assert not [w for w in caught if "feature names" in str(w.message)]
+    assert len(set(probas)) > 1
+
+
+bounds = {c: {"min": 5.0, "median": 20.0, "max": 100.0 * c} for c in (1, 2, 3)}
+
+
+def test_what_if_grid_sweeps_one_feature_at_a_time():
+    grid = what_if_grid(passenger, bounds, n_points=11)
+
+    sizes = grid.groupby("Feature", sort=False).size().to_dict()
+    assert sizes == {"age": 11, "pclass": 3, "fare": 11, "sex": 2, "embarked": 3,
+                     "sibsp": 12, "parch": 13}  # fmt: skip
+    for feature, rows in grid.groupby("Feature"):
+        assert (rows[feature] == rows["Value"]).all()
+        others = rows.drop(columns=[feature, "Feature", "Value"])
+        assert (others == pd.Series(passenger).drop(feature)).all().all()
+    fares = grid.loc[grid.Feature == "fare", "Value"]
+    assert (fares.min(), fares.max()) == (5.0, 300.0)
+
+
+def test_sensitivity_curves_score_every_variant_like_the_fast_path(registered):
+    model, preprocessor = registered
+    compiled = compile_model(model)
+    unknown_age = {**passenger, "age": None, "embarked": None}
+
+    curves = sensitivity_curves(
+        {"sklearn": (model, preprocessor), "compiled": (compiled, preprocessor)},
+        unknown_age,
+        bounds,
+    )
+
+    grid = what_if_grid(unknown_age, bounds)
+    expected = [
+        score_passenger(model, preprocessor, **row)
+        for row in grid.drop(columns=["Feature", "Value"]).to_dict("records")
+    ]
+    for name in ("sklearn", "compiled"):
+        curve = curves[curves.Model == name].reset_index(drop=True)
+        assert curve[["Feature", "Value"]].equals(grid[["Feature", "Value"]])
+        np.testing.assert_allclose(curve["Probability"], expected, atol=1e-12)
@@ -0,0 +1,99 @@
+import asyncio
+import json
+
+import pytest
+
+from scoring import score_passenger
+from serving import MicroBatcher, PredictionService, _request
+
+passenger = {"pclass": 1, "sex": "female", "age": 30, "sibsp": 0, "parch": 0,
+             "fare": 80.0, "embarked": "S"}  # fmt: skip
+
+
+@pytest.fixture
+def service(registered):
+    return PredictionService(max_batch=8, window_ms=1)
+
+
+def post(service, path, payload):
+    return asyncio.run(service.handle("POST", path, json.dumps(payload).encode()))
+
+
+def test_single_and_batch_predictions_agree(service):
+    status, single = post(service, "/predict/LogisticRegression", passenger)
+    assert status == 200
+
+    status, batch = post(
+        service, "/predict/LogisticRegression/batch", [passenger, passenger]
+    )
+    assert status == 200
+    assert batch["probabilities"] == pytest.approx([single["probability"]] * 2)
+    assert batch["survived"] == [single["survived"]] * 2
+
+
+def test_concurrent_requests_are_scored_in_micro_batches(registered):
+    model, preprocessor = registered
+    batcher = MicroBatcher(model, preprocessor, max_batch=8, window_ms=50)
+    passengers = [{**passenger, "age": age} for age in range(1, 21)]
+
+    async def scenario():
+        # toutes les requêtes arrivent dans la même fenêtre
+        return await asyncio.gather(*(batcher.predict(p) for p in passengers))
+
+    probas = asyncio.run(scenario())
+
+    report = batcher.metrics.report()
+    assert (report["requests"], report["rows"]) == (20, 20)
+    # lots pleins de max_batch, puis le reste à la fin de la fenêtre
+    assert report["batches"] == 3 < len(passengers)
+    assert probas == pytest.approx(
+        [score_passenger(model, preprocessor, **p) for p in passengers]
+    )
+
+
+@pytest.mark.parametrize(
+    "field, value",
+    [("sex", "Male"), ("sex", None), ("embarked", "X"), ("embarked", ["S"])],
+)
+def test_unknown_categories_are_rejected(service, field, value):
+    for path, payload in (
+        ("/predict/LogisticRegression", {**passenger, field: value}),
+        ("/predict/LogisticRegression/batch", [passenger, {**passenger, field: value}]),
+    ):
+        status, answer = post(service, path, payload)
+
+        assert status == 400
+        assert field in answer["error"]
+
+
+def test_missing_embarked_uses_the_fitted_mode(service):
+    without = {k: v for k, v in passenger.items() if k != "embarked"}
+    _, expected = post(service, "/predict/LogisticRegression", passenger)
+
+    assert post(service, "/predict/LogisticRegression", without) == (200, expected)
+
+
+def test_server_errors_answer_500_and_keep_the_connection(service, monkeypatch):
+    def broken(X):
+        raise RuntimeError("model exploded")
+
+    async def scenario():
+        server = await asyncio.start_server(service.serve_connection, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            path = "/predict/LogisticRegression"
+            with monkeypatch.context() as patch:
+                patch.setattr(
+                    service.batchers["LogisticRegression"], "predict_proba", broken
+                )
+                failed = await _request(reader, writer, "POST", path, passenger)
+            # même connexion (keep-alive) : le service répond toujours
+            answer = await _request(reader, writer, "POST", path, passenger)
+            writer.close()
+        return failed, answer
+
+    failed, answer = asyncio.run(scenario())
+
+    assert failed == {"error": "RuntimeError: model exploded"}
+    assert 0 <= answer["probability"] <= 1
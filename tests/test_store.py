@@ -0,0 +1,38 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from store import atomic_write, make_key, read_json, write_json
+
+
+def test_concurrent_writers_of_one_path_never_collide(tmp_path):
+    path = str(tmp_path / "shared.json")
+
+    def write(i):
+        write_json(path, {"writer": i, "payload": list(range(1000))})
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(write, range(200)))
+
+    assert read_json(path)["payload"] == list(range(1000))
+    assert os.listdir(tmp_path) == ["shared.json"]
+
+
+def test_failed_write_leaves_neither_file_nor_temporary(tmp_path):
+    path = str(tmp_path / "model.joblib")
+
+    def write(tmp_path):
+        with open(tmp_path, "w") as f:
+            f.write("partial")
+        raise RuntimeError("disk full")
+
+    with pytest.raises(RuntimeError):
+        atomic_write(path, write)
+    assert os.listdir(tmp_path) == []
+
+
+def test_keys_are_stable_and_order_independent_for_dicts():
+    assert make_key("a", {"x": 1, "y": 2}) == make_key("a", {"y": 2, "x": 1})
+    assert make_key("a", 1) != make_key("a", 2)
+    assert read_json("/nonexistent/file.json") is None
@@ -0,0 +1,161 @@
+import pickle
+
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import GridSearchCV
+from sklearn.tree import DecisionTreeClassifier
+
+from folds import FoldStore
+from preprocessing import PassengerPreprocessor, split_data
+import tuning
+from tuning import BudgetedSearch, tune_all
+
+
+class Failing(LogisticRegression):
+    def fit(self, X, y):
+        raise ValueError("always fails")
+
+
+@pytest.fixture
+def data(passengers):
+    X, _, y, _ = split_data(passengers, split=False)
+    return PassengerPreprocessor().fit_transform(X), y
+
+
+@pytest.fixture
+def folds(data):
+    return FoldStore(*data, 5, 0)
+
+
+grid = {"C": [0.001, 0.01, 0.1, 1, 10, 100]}
+
+
+def test_halving_search_scores_the_survivors_on_every_fold(cache, data, folds):
+    search = BudgetedSearch(LogisticRegression(), grid, cv=folds, strategy="halving")
+    search.fit(*data)
+
+    results = search.cv_results_
+    n_folds = np.sum(
+        [~np.isnan(results[f"split{f}_test_score"]) for f in range(5)], axis=0
+    )
+    # 6 candidats sur 1 fold, 2 sur 3 folds, 1 sur 5 folds
+    assert sorted(n_folds) == [1, 1, 1, 1, 3, 5]
+    assert search.n_fits_ == 6 + 2 * 2 + 2 == sum(n_folds)
+    assert n_folds[search.best_index_] == 5
+    assert search.best_params_ == {"C": grid["C"][search.best_index_]}
+    assert search.best_estimator_.C == search.best_params_["C"]
+
+
+def test_budget_bounds_the_number_of_fits(cache, data, folds):
+    search = BudgetedSearch(
+        LogisticRegression(), grid, cv=folds, strategy="grid", max_fits=8
+    )
+    search.fit(*data)
+
+    assert search.n_fits_ == 8
+    # budget épuisé : le meilleur des candidats évalués sur le plus de folds
+    assert search.best_index_ == 0
+
+
+@pytest.mark.parametrize(
+    "estimator, max_fits", [(LogisticRegression(), 0), (Failing(), None)]
+)
+def test_search_without_any_score_fails_clearly(
+    cache, data, folds, estimator, max_fits
+):
+    search = BudgetedSearch(estimator, grid, cv=folds, max_fits=max_fits)
+
+    with pytest.raises(ValueError, match="No candidate .* could be scored"):
+        search.fit(*data)
+
+
+def test_searches_run_together_match_grid_search(cache, data, folds):
+    trees = {"max_depth": [1, 3, None], "min_samples_leaf": [1, 5]}
+    searches = {
+        "LogisticRegression": (LogisticRegression(), grid),
+        "DecisionTreeClassifier": (DecisionTreeClassifier(random_state=0), trees),
+    }
+    budgeted = {
+        name: BudgetedSearch(estimator, param_grid, cv=folds, strategy="grid")
+        for name, (estimator, param_grid) in searches.items()
+    }
+
+    events = list(tune_all(budgeted, *data, n_jobs=2))
+
+    for name, (estimator, param_grid) in searches.items():
+        own = [event for event in events if event["Model"] == name]
+        # progression de chaque modèle, puis un seul événement final
+        assert [event["Done"] for event in own].count(True) == 1
+        assert own[-1]["Done"] and own[-1]["Fits"] == own[-1]["Max fits"]
+        assert [event["Fits"] for event in own] == sorted(
+            event["Fits"] for event in own
+        )
+
+        reference = GridSearchCV(
+            estimator, param_grid, cv=folds, scoring="balanced_accuracy"
+        ).fit(*data)
+        search = budgeted[name]
+        np.testing.assert_allclose(
+            search.cv_results_["mean_test_score"],
+            reference.cv_results_["mean_test_score"],
+        )
+        assert search.best_params_ == reference.best_params_
+        assert search.best_score_ == pytest.approx(reference.best_score_)
+
+
+def test_repeated_search_reads_everything_from_the_checkpoint(
+    cache, data, folds, monkeypatch
+):
+    first = BudgetedSearch(LogisticRegression(), grid, cv=folds, strategy="grid")
+    first.fit(*data)
+    assert first.n_cached_ == 0
+
+    saved = []
+    monkeypatch.setattr(
+        tuning._SearchRun,
+        "save_estimator",
+        lambda self, params, estimator: saved.append(params),
+    )
+    again = BudgetedSearch(LogisticRegression(), grid, cv=folds, strategy="grid")
+    again.fit(*data)
+
+    assert again.n_cached_ == again.n_fits_ == 30
+    # meilleur estimateur relu du point de reprise : aucun refit
+    assert saved == []
+    np.testing.assert_array_equal(
+        again.best_estimator_.coef_, first.best_estimator_.coef_
+    )
+    np.testing.assert_array_equal(
+        again.cv_results_["mean_test_score"], first.cv_results_["mean_test_score"]
+    )
+
+    # grille étendue : seules les nouvelles cellules sont évaluées
+    wider = {"C": [*grid["C"], 1000]}
+    extended = BudgetedSearch(LogisticRegression(), wider, cv=folds, strategy="grid")
+    extended.fit(*data)
+    assert (extended.n_fits_, extended.n_cached_) == (35, 30)
+
+
+def test_cells_send_the_fold_store_to_workers_once(cache, data, folds, monkeypatch):
+    sizes = []
+    get_executor = tuning.get_reusable_executor
+
+    class Recording:
+        def __init__(self, executor):
+            self.executor = executor
+
+        def submit(self, fn, *args):
+            sizes.append(len(pickle.dumps(args)))
+            return self.executor.submit(fn, *args)
+
+    monkeypatch.setattr(
+        tuning, "get_reusable_executor", lambda **kw: Recording(get_executor(**kw))
+    )
+    search = BudgetedSearch(LogisticRegression(), grid, cv=folds, strategy="grid")
+    search.fit(*data)
+
+    # 30 cellules et le refit, chacun plus léger qu'un seul bloc de fold
+    assert len(sizes) == 31
+    assert max(sizes) < folds.blocks[0][2].nbytes
+    assert search.best_estimator_.n_features_in_ == folds.X.shape[1]
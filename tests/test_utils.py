@@ -0,0 +1,143 @@
+import numpy as np
+import pytest
+from sklearn.neighbors import KNeighborsClassifier
+from streamlit.testing.v1 import AppTest
+
+import utils
+from compiled import CompiledModel
+from dataset import to_compact
+from preprocessing import split_data
+from registry import load_model, register
+from resources import resources
+from utils import to_display
+
+
+def compare_app():
+    # sélection de la section « Et si... ? » de la page Prédictions
+    import streamlit as st
+
+    from utils import get_compiled_model, get_preprocessor, release
+
+    compared = st.session_state.get("compared", [])
+    for i, name in enumerate(compared):
+        get_compiled_model(name, 1, slot=f"what-if/{i}/compiled")
+        get_preprocessor(name, 1, slot=f"what-if/{i}/preprocessor")
+    for i in range(len(compared), 3):
+        release(f"what-if/{i}/compiled")
+        release(f"what-if/{i}/preprocessor")
+
+
+def manifest_app():
+    # tableau de la page Prédictions, modèle relu du registre à chaque exécution
+    import streamlit as st
+
+    from registry import load_model
+    from utils import get_scored_manifest
+
+    model, preprocessor, _ = load_model(st.session_state.model)
+    st.session_state.table = get_scored_manifest(model, preprocessor)
+
+
+def refs(kind, name):
+    entry = resources._entries.get((kind, name, 1))
+    return None if entry is None else entry["refs"]
+
+
+@pytest.fixture
+def models(registered, monkeypatch):
+    model, preprocessor = registered
+    for name in ("A", "B"):
+        register(name, model, preprocessor, metrics={})
+    monkeypatch.setattr(resources, "_entries", type(resources._entries)())
+
+
+def test_compared_models_hold_one_slot_per_position(models):
+    app = AppTest.from_function(compare_app)
+    app.session_state["compared"] = ["A", "B"]
+    app.run()
+    assert not app.exception
+    assert [refs("compiled", n) for n in "AB"] == [1, 1]
+    assert [refs("preprocessor", n) for n in "AB"] == [1, 1]
+    # l'estimateur Scikit-learn complet n'est pas chargé
+    assert refs("model", "A") is None
+
+    app.session_state["compared"] = ["B"]
+    app.run()
+    assert [refs("compiled", n) for n in "AB"] == [0, 1]
+    assert [refs("preprocessor", n) for n in "AB"] == [0, 1]
+
+    app.session_state["compared"] = []
+    app.run()
+    assert [refs("compiled", n) for n in "AB"] == [0, 0]
+
+
+def test_families_without_compiled_predictor_fall_back_to_the_estimator(
+    models, passengers
+):
+    _, preprocessor, _ = load_model("A")
+    X, _, y, _ = split_data(passengers, split=False)
+    knn = KNeighborsClassifier().fit(preprocessor.transform(X).to_numpy(), y)
+    register("KNN", knn, preprocessor, metrics={})
+
+    app = AppTest.from_function(compare_app)
+    app.session_state["compared"] = ["A", "KNN"]
+    app.run()
+
+    assert not app.exception
+    assert isinstance(resources._entries["compiled", "A", 1]["value"], CompiledModel)
+    assert isinstance(
+        resources._entries["compiled", "KNN", 1]["value"], KNeighborsClassifier
+    )
+
+
+def test_display_table_is_the_same_from_the_compact_schema(passengers):
+    raw = to_display(passengers)
+    compact = to_display(to_compact(passengers))
+
+    assert compact["Sexe"].dtype == "category"
+    assert compact.astype(str).equals(raw.astype(str))
+    assert set(raw["Embarquement"].dropna()) <= {
+        "🇫🇷 Cherbourg",
+        "🇮🇪 Queenstown",
+        "🇬🇧 Southampton",
+    }
+
+
+def test_scored_manifest_is_computed_once_per_fitted_model(
+    models, cached_dataset, monkeypatch
+):
+    calls = []
+    scored_manifest = utils._scored_manifest
+    monkeypatch.setattr(
+        utils,
+        "_scored_manifest",
+        lambda *args: calls.append(1) or scored_manifest(*args),
+    )
+
+    tables = []
+    for name in ("A", "B", "A"):
+        app = AppTest.from_function(manifest_app)
+        app.session_state["model"] = name
+        app.run()
+        assert not app.exception
+        tables.append(app.session_state["table"])
+    # A et B ont les mêmes paramètres appris : une seule passe de scoring
+    assert len(calls) == 1
+    assert tables[2] is tables[0]
+
+    model, preprocessor, _ = load_model("A")
+    register("C", model.set_params(C=0.01), preprocessor, metrics={})
+    app = AppTest.from_function(manifest_app)
+    app.session_state["model"] = "C"
+    app.run()
+    assert len(calls) == 2
+
+    table = tables[0]
+    model, preprocessor, _ = load_model("A")
+    X, _, y, _ = split_data(utils.load_csv(True, compact=True), split=False)
+    proba = model.predict_proba(preprocessor.transform(X).to_numpy())[:, 1]
+    chance = table["Chance de survie"].reindex(X.index)
+    np.testing.assert_allclose(chance, (100 * proba).round(2))
+    correct = (proba > 0.5) == y.to_numpy()
+    assert (table["Prédiction correcte ?"].reindex(X.index) == "✔️").eq(correct).all()
+    assert table["Chance de survie"].is_monotonic_decreasing
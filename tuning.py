@@ -0,0 +1,513 @@
+"""Recherche d'hyperparamètres sous budget, en remplacement de GridSearchCV.
+
+Une recherche est décomposée en cellules (candidat, fold) évaluées sur les
+blocs du FoldStore partagé. La stratégie décide, tour après tour, quelles
+cellules évaluer : toutes (grid), un échantillon de candidats (random) ou des
+candidats de moins en moins nombreux évalués sur de plus en plus de folds
+(halving). Un budget global en nombre de fits borne le coût total.
+
+Plusieurs recherches peuvent être menées de front (tune_all) : toutes leurs
+cellules partagent un même pool de processus.
+"""
+
+import heapq
+import os
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import FIRST_COMPLETED, wait
+from itertools import count
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from joblib.externals.loky import get_reusable_executor
+from sklearn.base import clone
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import ParameterGrid, ParameterSampler
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.svm import SVC
+
+from folds import FoldStore
+from store import atomic_write, cache_dir, make_key, read_json, write_json
+
+# une stratégie reçoit le nombre de candidats, le nombre de folds et les scores
+# déjà obtenus ({(candidat, fold): score}, complété entre deux tours) et
+# renvoie successivement les cellules (candidat, fold) du tour suivant
+Strategy = Callable[[int, int, dict], Iterator[list[tuple[int, int]]]]
+
+# points de reprise : scores de chaque cellule et meilleurs modèles réajustés
+checkpoint_dir = os.path.join(cache_dir, "tuning")
+
+# modèles optimisés par la page Optimisation et leurs grilles de paramètres
+param_grids = {
+    "Logistic Regression": {
+        "C": [0.01, 0.1, 1, 10],
+        "penalty": ["l2"],
+        "solver": ["lbfgs"],
+    },
+    "K-Neighbors": {
+        "n_neighbors": [3, 5, 7],
+        "weights": ["uniform", "distance"],
+    },
+    "SVC": {
+        "C": [0.1, 1, 10],
+        "kernel": ["linear", "rbf"],
+        "gamma": ["scale", "auto"],
+    },
+    "Random Forest": {
+        "n_estimators": [50, 100],
+        "max_depth": [None, 5, 10],
+        "min_samples_split": [2, 5],
+    },
+    "Gradient Boosting": {
+        "n_estimators": [50, 100],
+        "learning_rate": [0.01, 0.1],
+        "max_depth": [3, 5],
+    },
+}
+
+
+def tuned_models() -> dict:
+    """returns a fresh estimator for every model of param_grids"""
+    return {
+        "Logistic Regression": LogisticRegression(),
+        "K-Neighbors": KNeighborsClassifier(),
+        "SVC": SVC(probability=True),
+        "Random Forest": RandomForestClassifier(),
+        "Gradient Boosting": GradientBoostingClassifier(),
+    }
+
+
+def exhaustive(n_candidates: int, n_splits: int, scores: dict):
+    """every candidate on every fold, in a single round"""
+    yield [(c, f) for c in range(n_candidates) for f in range(n_splits)]
+
+
+def successive_halving(
+    n_candidates: int, n_splits: int, scores: dict, eta: int = 3, min_folds: int = 1
+):
+    """successive halving with the folds as resource
+
+    All candidates are scored on min_folds folds, the best 1/eta are kept and
+    scored on eta times more folds, and so on until the survivors are scored
+    on every fold. Scores of earlier rounds are reused, never recomputed.
+    """
+    alive = list(range(n_candidates))
+    n_folds = min(min_folds, n_splits)
+    while True:
+        yield [(c, f) for c in alive for f in range(n_folds) if (c, f) not in scores]
+        if n_folds == n_splits:
+            return
+        # les meilleurs (moyenne sur les mêmes folds) passent au tour suivant
+        means = {
+            c: np.nan_to_num(np.mean([scores[c, f] for f in range(n_folds)]), nan=-1)
+            for c in alive
+        }
+        n_keep = max(1, -(-len(alive) // eta))
+        alive = sorted(alive, key=lambda c: means[c], reverse=True)[:n_keep]
+        n_folds = min(n_splits, n_folds * eta)
+
+
+strategies = {
+    "grid": exhaustive,
+    "random": exhaustive,  # sur un échantillon de candidats
+    "halving": successive_halving,
+}
+
+
+# FoldStore de chaque processus du pool, relus (en mémoire partagée) une fois
+# par fichier puis réutilisés par toutes les cellules qui les désignent
+_worker_folds = {}
+
+
+def _folds(path: str) -> FoldStore:
+    if path not in _worker_folds:
+        if len(_worker_folds) >= 8:
+            _worker_folds.clear()
+        _worker_folds[path] = joblib.load(path, mmap_mode="r")
+    return _worker_folds[path]
+
+
+def _fit_and_score(
+    estimator, folds_path: str, fold_index: int, scorer
+) -> tuple[float, float]:
+    X_train, y_train, X_test, y_test = _folds(folds_path).blocks[fold_index]
+    start_time = time.time()
+    try:
+        estimator.fit(X_train, y_train)
+    except Exception:
+        # comme error_score=np.nan de GridSearchCV : le candidat est écarté
+        return np.nan, time.time() - start_time
+    fit_time = time.time() - start_time
+    return scorer(estimator, X_test, y_test), fit_time
+
+
+class BudgetedSearch:
+    """Hyperparameter search with pluggable strategies and a budget of fits.
+
+    Drop-in for the part of GridSearchCV used by the app: fit(X, y) then
+    best_params_, best_score_, best_estimator_ (refitted on X, y, as held
+    by the fold store: a FoldStore cv is built on the same X, y) and
+    cv_results_ in the Scikit-learn format. strategy is "grid", "random"
+    (n_candidates sampled from the grid), "halving" (on the grid or on
+    n_candidates sampled ones) or any Strategy function. max_fits bounds the
+    number of CV fits: once reached, the best candidate among those scored on
+    the most folds wins. fit raises ValueError when no candidate could be
+    scored (every fit failed, or max_fits=0).
+    """
+
+    def __init__(
+        self,
+        estimator,
+        param_grid: dict,
+        cv: FoldStore | int = 5,
+        strategy: str | Strategy = "halving",
+        n_candidates: int | None = None,
+        max_fits: int | None = None,
+        scoring: str = "balanced_accuracy",
+        n_jobs: int | None = None,
+        random_state: int | None = None,
+    ):
+        self.estimator = estimator
+        self.param_grid = param_grid
+        self.cv = cv
+        self.strategy = strategy
+        self.n_candidates = n_candidates
+        self.max_fits = max_fits
+        self.scoring = scoring
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+
+    def candidates(self) -> list[dict]:
+        """returns the parameter sets the strategy will choose from"""
+        grid = ParameterGrid(self.param_grid)
+        if self.strategy == "random" or (
+            self.n_candidates is not None and self.n_candidates < len(grid)
+        ):
+            n_iter = min(self.n_candidates or 10, len(grid))
+            return list(
+                ParameterSampler(
+                    self.param_grid, n_iter, random_state=self.random_state
+                )
+            )
+        return list(grid)
+
+    def fit(self, X: pd.DataFrame, y: pd.Series):
+        for _ in tune_all({"search": self}, X, y, n_jobs=self.n_jobs):
+            pass
+        return self
+
+
+class _SearchRun:
+    """state of a search while the scheduler runs it"""
+
+    def __init__(self, search: BudgetedSearch, X: pd.DataFrame, y: pd.Series):
+        self.search = search
+        self.folds = search.cv
+        if not isinstance(self.folds, FoldStore):
+            self.folds = FoldStore(X, y, self.folds, search.random_state)
+        strategy = search.strategy
+        if isinstance(strategy, str):
+            strategy = strategies[strategy]
+
+        self.candidates = search.candidates()
+        self.scorer = get_scorer(search.scoring)
+        self.scores, self.fit_times = {}, {}
+        self.rounds = strategy(len(self.candidates), self.folds.n_splits, self.scores)
+        self.n_fits = 0
+        self.n_cached = 0  # cellules relues depuis le point de reprise
+        self.running = 0  # cellules soumises et non terminées
+        self.refitting = False
+        self.refit_params = None
+        self.done = False
+
+        # point de reprise : une recherche est identifiée par les folds
+        # (données et seed), l'estimateur de base, le scoring et la version de
+        # Scikit-learn ; chaque cellule par ses paramètres et son fold, si bien
+        # qu'une grille modifiée réutilise les cellules qu'elle a en commun
+        estimator = search.estimator
+        self.key = make_key(
+            self.folds.key,
+            type(estimator).__name__,
+            repr(sorted(estimator.get_params(deep=False).items())),
+            search.scoring,
+            sklearn.__version__,
+        )
+        self.checkpoint_path = os.path.join(checkpoint_dir, f"{self.key}.json")
+        self.checkpoint = read_json(self.checkpoint_path) or {"cells": {}}
+
+        # folds écrits une fois sur disque : une cellule n'envoie au pool que
+        # le chemin de ce fichier et le numéro de son fold, jamais ses blocs
+        self.folds_path = os.path.join(checkpoint_dir, f"folds-{self.folds.key}.pkl")
+        if not os.path.exists(self.folds_path):
+            atomic_write(
+                self.folds_path, lambda tmp_path: joblib.dump(self.folds, tmp_path)
+            )
+
+    def _cell_key(self, cell: tuple[int, int]) -> str:
+        c, f = cell
+        return f"{make_key(self.candidates[c])}/{f}"
+
+    def _estimator_path(self, params: dict) -> str:
+        return os.path.join(checkpoint_dir, f"{self.key}-{make_key(params)}.pkl")
+
+    def next_round(self) -> list[tuple[int, int]]:
+        """returns the cells of the next round, [] once the search is over"""
+        budget = self.search.max_fits
+        while budget is None or self.n_fits < budget:
+            try:
+                cells = next(self.rounds)
+            except StopIteration:
+                return []
+            if budget is not None:
+                cells = cells[: budget - self.n_fits]
+
+            missing = []
+            for cell in cells:
+                saved = self.checkpoint["cells"].get(self._cell_key(cell))
+                if saved is None:
+                    missing.append(cell)
+                else:
+                    self.scores[cell], self.fit_times[cell] = saved
+                    self.n_fits += 1
+                    self.n_cached += 1
+            # tour entièrement relu : on passe directement au suivant
+            if missing:
+                return missing
+        return []
+
+    def record(self, cell: tuple[int, int], score: float, fit_time: float) -> None:
+        """stores the result of a cell, in memory and in the checkpoint"""
+        self.scores[cell], self.fit_times[cell] = score, fit_time
+        self.n_fits += 1
+        self.checkpoint["cells"][self._cell_key(cell)] = [score, fit_time]
+        write_json(self.checkpoint_path, self.checkpoint)
+
+    def saved_estimator(self, params: dict):
+        """returns the refitted estimator of params from the checkpoint, if any"""
+        path = self._estimator_path(params)
+        if not os.path.exists(path):
+            return None
+        return joblib.load(path)
+
+    def save_estimator(self, params: dict, estimator) -> None:
+        atomic_write(
+            self._estimator_path(params),
+            lambda tmp_path: joblib.dump(estimator, tmp_path),
+        )
+
+    def cost(self, cell: tuple[int, int], model_costs: dict) -> float:
+        """estimated fit time of a cell, to dispatch the slowest first"""
+        c, _ = cell
+        known = [t for (other, _), t in self.fit_times.items() if other == c]
+        if known:
+            return float(np.mean(known))
+        if self.fit_times:
+            base = float(np.mean(list(self.fit_times.values())))
+        else:
+            # modèle encore jamais mesuré : supposé aussi lent que le plus lent
+            base = max(model_costs.values(), default=1.0)
+        return base * _relative_cost(self.candidates[c]) / self.mean_relative_cost
+
+    @property
+    def mean_relative_cost(self) -> float:
+        return float(np.mean([_relative_cost(p) for p in self.candidates]))
+
+    def finish(self, best_estimator) -> None:
+        search = self.search
+        search.n_fits_ = self.n_fits
+        search.n_cached_ = self.n_cached
+        search.cv_results_ = _cv_results(
+            self.candidates, self.folds.n_splits, self.scores, self.fit_times
+        )
+        search.best_index_ = self.best_index()
+        search.best_params_ = self.candidates[search.best_index_]
+        search.best_score_ = float(
+            search.cv_results_["mean_test_score"][search.best_index_]
+        )
+        search.best_estimator_ = best_estimator
+        self.done = True
+
+    def best_index(self) -> int:
+        results = _cv_results(
+            self.candidates, self.folds.n_splits, self.scores, self.fit_times
+        )
+        # aucun score : le candidat 0 serait choisi sans avoir été évalué
+        if np.isnan(results["mean_test_score"]).all():
+            raise ValueError(
+                f"No candidate of {type(self.search.estimator).__name__} could be "
+                f"scored: {self.n_fits} fits done (max_fits="
+                f"{self.search.max_fits}), all failed or none was run"
+            )
+        return int(np.argmin(results["rank_test_score"]))
+
+
+def _relative_cost(params: dict) -> float:
+    # a priori : le coût des ensembles d'arbres croît avec le nombre et la
+    # profondeur des arbres (None = profondeur non bornée)
+    depth = params.get("max_depth", 1)
+    return params.get("n_estimators", 1) * (32 if depth is None else depth)
+
+
+def _refit(estimator, folds_path: str):
+    # sur le tableau NumPy, comme les cellules de la CV : le modèle n'a pas de
+    # noms de features et se score sans avertissement sur des lignes NumPy
+    # (tableaux ordinaires : le modèle renvoyé ne référence pas le fichier)
+    folds = _folds(folds_path)
+    return estimator.fit(np.asarray(folds.X), np.asarray(folds.y))
+
+
+def tune_all(
+    searches: dict[str, BudgetedSearch],
+    X: pd.DataFrame,
+    y: pd.Series,
+    n_jobs: int | None = -1,
+) -> Iterator[dict]:
+    """runs several searches at once in a single pool of worker processes
+
+    Every (model, candidate, fold) cell of every search goes through one
+    shared queue, the slowest estimated first, so cores stay busy until the
+    very end instead of idling at the tail of each search. Yields progress
+    events {"Model": name, "Fits": n, "Max fits": bound, "Done": bool}; a
+    search has its fitted attributes once its "Done" event is yielded.
+    """
+    n_workers = (os.cpu_count() or 1) if n_jobs == -1 else (n_jobs or 1)
+    # pool loky réutilisable : pas de redémarrage des processus à chaque
+    # rerun, et le __main__ (script de la page) n'est pas réexécuté
+    executor = get_reusable_executor(max_workers=n_workers)
+
+    runs = {name: _SearchRun(search, X, y) for name, search in searches.items()}
+    queue = []  # tas de (-coût estimé, ordre, modèle, cellule)
+    order = count()
+    running = {}  # future -> (modèle, cellule), cellule None pour le refit
+    ready = []  # recherches terminées sans refit (modèle relu du point de reprise)
+
+    def event(name: str) -> dict:
+        run = runs[name]
+        return {
+            "Model": name,
+            "Fits": run.n_fits,
+            "Max fits": len(run.candidates) * run.folds.n_splits,
+            "Done": run.done,
+        }
+
+    def model_costs() -> dict:
+        return {
+            name: float(np.mean(list(run.fit_times.values())))
+            for name, run in runs.items()
+            if run.fit_times
+        }
+
+    def schedule(name: str) -> None:
+        run = runs[name]
+        cells = run.next_round()
+        if cells:
+            costs = model_costs()
+            for cell in cells:
+                heapq.heappush(queue, (-run.cost(cell, costs), next(order), name, cell))
+            run.running += len(cells)
+            return
+
+        params = run.candidates[run.best_index()]
+        saved = run.saved_estimator(params)
+        if saved is not None:
+            run.finish(saved)
+            ready.append(name)
+        else:
+            # recherche terminée : le refit du meilleur candidat passe en tête
+            run.refitting = True
+            run.refit_params = params
+            estimator = clone(run.search.estimator).set_params(**params)
+            heapq.heappush(queue, (-np.inf, next(order), name, estimator))
+
+    for name in runs:
+        schedule(name)
+
+    try:
+        while queue or running or ready:
+            while ready:
+                yield event(ready.pop(0))
+
+            while queue and len(running) < n_workers:
+                _, _, name, task = heapq.heappop(queue)
+                run = runs[name]
+                if run.refitting:
+                    future = executor.submit(_refit, task, run.folds_path)
+                    task = None
+                else:
+                    c, f = task
+                    future = executor.submit(
+                        _fit_and_score,
+                        clone(run.search.estimator).set_params(**run.candidates[c]),
+                        run.folds_path,
+                        f,
+                        run.scorer,
+                    )
+                running[future] = (name, task)
+
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, cell = running.pop(future)
+                run = runs[name]
+                if cell is None:
+                    estimator = future.result()
+                    run.save_estimator(run.refit_params, estimator)
+                    run.finish(estimator)
+                    yield event(name)
+                    continue
+
+                run.record(cell, *future.result())
+                run.running -= 1
+                yield event(name)
+                if run.running == 0:
+                    schedule(name)
+    finally:
+        # page interrompue : les tâches pas encore démarrées sont abandonnées
+        for future in running:
+            future.cancel()
+
+
+def _cv_results(
+    candidates: list[dict], n_splits: int, scores: dict, fit_times: dict
+) -> dict:
+    n = len(candidates)
+    split_scores = np.full((n, n_splits), np.nan)
+    times = np.full((n, n_splits), np.nan)
+    for (c, f), score in scores.items():
+        split_scores[c, f] = score
+        times[c, f] = fit_times[c, f]
+
+    n_folds = np.sum(~np.isnan(split_scores), axis=1)
+    evaluated = n_folds > 0
+    mean = np.full(n, np.nan)
+    std = np.full(n, np.nan)
+    mean[evaluated] = np.nanmean(split_scores[evaluated], axis=1)
+    std[evaluated] = np.nanstd(split_scores[evaluated], axis=1)
+
+    # rang : d'abord les candidats évalués sur le plus de folds, puis la
+    # moyenne ; candidats non évalués en dernier
+    order = np.lexsort((-np.nan_to_num(mean, nan=-np.inf), -n_folds))
+    rank = np.empty(n, dtype=np.int32)
+    rank[order] = np.arange(1, n + 1)
+
+    results = {"params": candidates}
+    for name in sorted({key for params in candidates for key in params}):
+        results[f"param_{name}"] = np.ma.masked_array(
+            [params.get(name) for params in candidates],
+            mask=[name not in params for params in candidates],
+            dtype=object,
+        )
+    for f in range(n_splits):
+        results[f"split{f}_test_score"] = split_scores[:, f]
+    results["mean_test_score"] = mean
+    results["std_test_score"] = std
+    results["rank_test_score"] = rank
+    results["n_folds"] = n_folds
+    results["mean_fit_time"] = np.full(n, np.nan)
+    results["mean_fit_time"][evaluated] = np.nanmean(times[evaluated], axis=1)
+    return results
@@ -4,14 +4,14 @@ import random
 import numpy as np
 import pandas as pd
 import time
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
 import json
 from google.oauth2 import service_account
-
-csv_url = (
-    "https://raw.githubusercontent.com/datasciencedojo/datasets/master/titanic.csv"
-)
+from dataset import dataset_hash, read_passengers, to_compact
+import weakref
+from resources import resources
+from registry import load_compiled, load_model, load_preprocessor
+from preprocessing import PassengerPreprocessor, split_data
+from scoring import model_fingerprint, predict_with_proba
 
 
 # Récupère le dict des credentials depuis st.secrets
@@ -51,12 +51,68 @@ def set_seed():
     np.random.seed(seed)
 
 
-@st.cache_data
-def load_csv(drop_outliers: bool):
-    df = pd.read_csv(csv_url, index_col="PassengerId")
+class _SessionResources:
+    """shared resources referenced by one session, released when it ends"""
+
+    def __init__(self):
+        self.slots = {}  # emplacement -> clé de la ressource détenue
+        # la session_state d'une session fermée est libérée par Streamlit : ses
+        # références sur les ressources partagées le sont avec elle
+        weakref.finalize(self, _release_all, self.slots)
+
+
+def _release_all(slots: dict) -> None:
+    for key in slots.values():
+        resources.release(key)
+
+
+def shared(key: tuple, loader, slot: str | None = None):
+    """returns the process-wide resource key, loading it once with loader
+
+    The current session holds a reference on it (so it is never evicted
+    while in use) until the session ends or, with a slot, until another
+    resource is requested for the same slot.
+    """
+    if "_resources" not in st.session_state:
+        st.session_state._resources = _SessionResources()
+    slots = st.session_state._resources.slots
+    slot = key if slot is None else slot
+
+    if slots.get(slot) == key:
+        return resources.get(key, loader)
+    value = resources.get(key, loader, hold=True)
+    previous = slots.get(slot)
+    slots[slot] = key
+    if previous is not None:
+        resources.release(previous)
+    return value
+
+
+def release(slot: str) -> None:
+    """releases the resource held by the current session in slot, if any"""
+    if "_resources" in st.session_state:
+        key = st.session_state._resources.slots.pop(slot, None)
+        if key is not None:
+            resources.release(key)
+
+
+def load_csv(drop_outliers: bool, compact: bool = False):
+    # le hash du contenu fait partie de la clé : après un refresh-data, les
+    # sessions relisent automatiquement la nouvelle version
+    digest = dataset_hash()
+    return shared(
+        ("passengers", digest, drop_outliers, compact),
+        lambda: _load_passengers(drop_outliers, compact, digest),
+    )
+
+
+def _load_passengers(drop_outliers: bool, compact: bool, digest: str):
+    df = read_passengers(digest)
     df.index.name = "#"
     if drop_outliers:
         df = df[df.Fare < 500]
+    if compact:
+        df = to_compact(df)
     return df
 
 
@@ -82,79 +138,12 @@ def get_fare_bounds(df):
     }
 
 
-@st.cache_data
-def preprocess_data(
-    df: pd.DataFrame, split: bool
-) -> tuple[pd.DataFrame, pd.DataFrame | None, pd.Series | None, pd.Series | None]:
-    # features
-    X = df.copy()
-
-    # drop outliers
-    X = X[X["Fare"] < 500]
-
-    # drop "Name", "Ticket" and Cabin except for custom passenger who doesn't have
-    cols_to_drop = {"Name", "Ticket", "Cabin"}.intersection(X.columns)
-    X = X.drop(list(cols_to_drop), axis=1)
-
-    # feature engineering
-    X["Family"] = X["SibSp"] + X["Parch"] + 1
-    X["IsAlone"] = (X["Family"] == 1).astype(int)
-
-    # target
-    if "Survived" in X.columns:
-        y = X.pop("Survived")
-    else:  # custom passenger doesn't have "survived"
-        y = None
-
-    # Train/test split
-    if split:
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, stratify=y
-        )
-    else:
-        X_train, X_test, y_train, y_test = X, None, y, None
-
-    # gestion des valeurs manquantes (age : médiane, embarked : mode)
-    age_median = X_train["Age"].median()
-    embarked_mode = X_train["Embarked"].mode()[0]
-
-    X_train["Age"] = X_train["Age"].fillna(age_median)
-    X_train["Embarked"] = X_train["Embarked"].fillna(embarked_mode)
-
-    if X_test is not None:
-        X_test["Age"] = X_test["Age"].fillna(age_median)
-        X_test["Embarked"] = X_test["Embarked"].fillna(embarked_mode)
-
-    # scaling des variables numériques
-    num_cols = ["Age", "Fare", "SibSp", "Parch", "Pclass", "Family"]
-
-    # memorize le scaler
-    if "scaler" not in st.session_state:
-        scaler = StandardScaler()
-        X_train[num_cols] = scaler.fit_transform(X_train[num_cols])
-        st.session_state.scaler = scaler
-    else:
-        X_train[num_cols] = st.session_state.scaler.transform(X_train[num_cols])
-
-    if X_test is not None:
-        X_test[num_cols] = st.session_state.scaler.transform(X_test[num_cols])
-
-    # encodage des variables catégorielles
-    categorical_cols = ["Sex", "Embarked"]
-    X_train = pd.get_dummies(X_train, columns=categorical_cols, drop_first=False)
-
-    # on a choisi drop_first = False car sinon les colonnes OH de la prediction du custom sont droped car unique
-    # donc on supprime manuellement 1 colonne de Sex et Embarked
-    cols_to_drop = {"Sex_female", "Embarked_C"}
-    cols_to_drop = cols_to_drop.intersection(X_train.columns)
-    X_train = X_train.drop(columns=cols_to_drop)
-
-    if X_test is not None:
-        X_test = pd.get_dummies(X_test, columns=categorical_cols, drop_first=False)
-        # Réindexation pour garantir les mêmes colonnes dans X_test et X_train (ordre pas garanti apres oh encodage)
-        X_test = X_test.reindex(columns=X_train.columns, fill_value=0)
-
-    return X_train, X_test, y_train, y_test
+def _relabel(s: pd.Series, mapping: dict) -> pd.Series:
+    # sur une colonne catégorielle (schéma compact) seules les catégories sont
+    # renommées, les codes ne sont pas recopiés
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return s.cat.rename_categories(lambda c: mapping.get(c, c))
+    return s.replace(mapping)
 
 
 @st.cache_data
@@ -173,16 +162,101 @@ def to_display(df) -> pd.DataFrame:
         "Cabine",
         "Embarquement",
     ]
-    df_display["Survie"].replace({1: "🟢 Oui", 0: "🔴 Non"}, inplace=True)
-    df_display["Sexe"].replace({"male": "♂️ Homme", "female": "♀️ Femme"}, inplace=True)
-    df_display["Embarquement"].replace(
-        {"C": "🇫🇷 Cherbourg", "Q": "🇮🇪 Queenstown", "S": "🇬🇧 Southampton"}, inplace=True
+    df_display["Survie"] = _relabel(df_display["Survie"], {1: "🟢 Oui", 0: "🔴 Non"})
+    df_display["Sexe"] = _relabel(
+        df_display["Sexe"], {"male": "♂️ Homme", "female": "♀️ Femme"}
+    )
+    df_display["Embarquement"] = _relabel(
+        df_display["Embarquement"],
+        {"C": "🇫🇷 Cherbourg", "Q": "🇮🇪 Queenstown", "S": "🇬🇧 Southampton"},
+    )
+    df_display["Classe"] = _relabel(
+        df_display["Classe"], {1: "1ère", 2: "2ème", 3: "3ème"}
     )
-    df_display["Classe"].replace({1: "1ère", 2: "2ème", 3: "3ème"}, inplace=True)
     df_display["Age"] = df_display["Age"].round().astype("Int64")
     return df_display
 
 
+def get_registered_model(name: str, version: int, slot: str = "model"):
+    """returns (estimator, preprocessor, metadata) of a registered model
+
+    Loaded from the registry on first use only, then shared by every session
+    of the process; a session only holds the model it has selected (one per
+    slot).
+    """
+    return shared(
+        ("model", name, version), lambda: load_model(name, version), slot=slot
+    )
+
+
+def get_preprocessor(name: str, version: int, slot: str = "preprocessor"):
+    """returns the fitted preprocessor of a registered model
+
+    Loaded without the estimator, for views that score with the compiled
+    predictor only; shared like get_registered_model.
+    """
+    return shared(
+        ("preprocessor", name, version),
+        lambda: load_preprocessor(name, version),
+        slot=slot,
+    )
+
+
+def get_compiled_model(name: str, version: int, slot: str = "compiled"):
+    """returns the compiled NumPy predictor of a registered model
+
+    Falls back to the Scikit-learn estimator for a family without compiled
+    predictor (K-Neighbors). Same sharing as get_registered_model: one copy
+    per process, held by the sessions that selected the model.
+    """
+    return shared(
+        ("compiled", name, version),
+        lambda: _compiled_or_estimator(name, version),
+        slot=slot,
+    )
+
+
+def _compiled_or_estimator(name: str, version: int):
+    try:
+        return load_compiled(name, version)
+    except ValueError:
+        return load_model(name, version)[0]
+
+
+def get_scored_manifest(model, preprocessor: PassengerPreprocessor) -> pd.DataFrame:
+    """returns the display table of all passengers scored by model
+
+    Shared across sessions by the fingerprints of the fitted model and
+    preprocessor and the dataset hash: revisiting a model already scored
+    costs nothing.
+    """
+    key = (
+        "scored",
+        model_fingerprint(model),
+        model_fingerprint(preprocessor),
+        dataset_hash(),
+    )
+    return shared(key, lambda: _scored_manifest(model, preprocessor), slot="scored")
+
+
+def _scored_manifest(model, preprocessor: PassengerPreprocessor) -> pd.DataFrame:
+    df = load_csv(drop_outliers=True, compact=True)
+    X, _, y, _ = split_data(df, split=False)
+    X = preprocessor.transform(X)
+
+    # un seul passage : la prédiction est déduite des probabilités
+    proba, pred = predict_with_proba(model, X)
+
+    df_display = to_display(df)
+    df_display.insert(loc=0, column="Chance de survie", value=(proba * 100).round(2))
+    df_display.insert(
+        loc=2,
+        column="Prédiction correcte ?",
+        value=pd.Series(np.where(pred == y.to_numpy(), "✔️", "❌"), index=y.index),
+    )
+    return df_display.sort_values(by="Chance de survie", ascending=False)
+
+
 # Fonction de stream
 def stream_data(text):
     for word in text.split(" "):